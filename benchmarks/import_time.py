@@ -0,0 +1,94 @@
+"""
+Import-time benchmark for agentic_patterns.
+
+Imports each module in a fresh interpreter, measures the wall-clock import time and checks
+that heavy third-party dependencies are not pulled in eagerly.
+
+Usage (from the repository root):
+    python benchmarks/import_time.py --budget-ms 50 --repeat 5
+
+Exits with a non-zero status if a module exceeds the budget or imports a heavy dependency.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+MODULES = [
+    "agentic_patterns",
+    "agentic_patterns.tool_pattern.tool",
+    "agentic_patterns.tool_pattern.tool_agent",
+    "agentic_patterns.planning_pattern.react_agent",
+    "agentic_patterns.reflection_pattern.reflection_agent",
+    "agentic_patterns.multi_agent_pattern.agent",
+    "agentic_patterns.multi_agent_pattern.crew",
+    "agentic_patterns.multi_agent_pattern.map_reduce",
+    "agentic_patterns.serving.server",
+]
+
+HEAVY_DEPENDENCIES = ["groq", "dotenv", "colorama", "graphviz", "numpy", "matplotlib"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1000, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module: str, repeat: int, src_dir: str) -> tuple[float, list[str]]:
+    """
+    Imports a module `repeat` times, each in a new interpreter.
+
+    Args:
+        module (str): The dotted module name to import.
+        repeat (int): Number of fresh interpreters to measure.
+        src_dir (str): Directory added to PYTHONPATH so `agentic_patterns` is importable.
+
+    Returns:
+        tuple[float, list[str]]: The median import time in milliseconds and the heavy
+            dependencies found in `sys.modules` after the import.
+    """
+    env = dict(os.environ, PYTHONPATH=src_dir + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    timings, heavy = [], []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_DEPENDENCIES)],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        timings.append(result["ms"])
+        heavy = result["heavy"]
+    return statistics.median(timings), heavy
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="Maximum median import time per module.")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per module.")
+    args = parser.parse_args()
+
+    src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+    failed = False
+    for module in MODULES:
+        median_ms, heavy = measure(module, args.repeat, src_dir)
+        ok = median_ms <= args.budget_ms and not heavy
+        failed |= not ok
+        print(
+            f"{'OK  ' if ok else 'FAIL'} {module:<55} {median_ms:8.1f} ms"
+            + (f"  heavy imports: {', '.join(heavy)}" if heavy else "")
+        )
+
+    print(f"\nBudget: {args.budget_ms:.0f} ms per module")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""
+Agentic patterns implemented from scratch: tool use, planning (ReAct), reflection and multi-agent crews.
+
+The canonical import root is `agentic_patterns` (e.g. `from agentic_patterns import ReactAgent`).
+Modules inside the package only use relative imports, so importing it through another root
+(such as `src.agentic_patterns` from the repository root) still works, but mixing both roots in
+one process loads every module - and the active Crew context - twice.
+
+Public classes are exported lazily: heavy dependencies (groq, dotenv, colorama, graphviz) are only
+imported when the corresponding feature is first used.
+"""
+
+import importlib
+import sys
+import warnings
+
+_EXPORTS = {
+    "Tool": ".tool_pattern.tool",
+    "tool": ".tool_pattern.tool",
+    "ToolAgent": ".tool_pattern.tool_agent",
+    "ReactAgent": ".planning_pattern.react_agent",
+    "ReflectionAgent": ".reflection_pattern.reflection_agent",
+    "Agent": ".multi_agent_pattern.agent",
+    "MapReduceAgent": ".multi_agent_pattern.map_reduce",
+    "Crew": ".multi_agent_pattern.crew",
+    "CrewExecutor": ".multi_agent_pattern.executor",
+    "AgentEvent": ".multi_agent_pattern.events",
+    "AgentServer": ".serving.server",
+    "MultiBackendClient": ".utils.backends",
+    "TokenBudget": ".utils.usage",
+    "GenerationConfig": ".utils.routing",
+}
+
+__all__ = list(_EXPORTS)
+
+if {"agentic_patterns", "src.agentic_patterns"} <= sys.modules.keys():
+    warnings.warn(
+        "agentic_patterns was imported both as 'agentic_patterns' and 'src.agentic_patterns'; "
+        "use a single import root so modules and the active Crew are not loaded twice.",
+        ImportWarning,
+        stacklevel=2,
+    )
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value  # Cache lại để lần truy cập sau không qua __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -1,8 +1,45 @@
+from dataclasses import asdict
 from textwrap import dedent
 
-from src.agentic_patterns.multi_agent_pattern.crew import Crew
-from src.agentic_patterns.planning_pattern.react_agent import ReactAgent
-from src.agentic_patterns.tool_pattern.tool import Tool
+from .crew import Crew
+from ..planning_pattern.react_agent import ReactAgent
+from ..tool_pattern.observations import ObservationPolicy
+from ..tool_pattern.tool import Tool
+from ..tool_pattern.tool import resolve_tool
+from ..tool_pattern.tool import tool_reference
+from ..utils.deadlines import Deadline
+from ..utils.routing import GenerationConfig
+from ..utils.routing import ModelRouter
+from ..utils.usage import TokenBudget
+
+
+def generation_to_spec(generation: GenerationConfig | dict[str, GenerationConfig] | None):
+    """Converts an agent's generation settings to plain data (see `Agent.to_spec`)."""
+    if isinstance(generation, dict):
+        return {phase: asdict(config) for phase, config in generation.items()}
+    return asdict(generation) if generation else None
+
+
+def generation_from_spec(spec: dict | None) -> GenerationConfig | dict[str, GenerationConfig] | None:
+    """Re-creates generation settings converted by `generation_to_spec`."""
+    if not spec:
+        return None
+    if all(isinstance(value, dict) for value in spec.values()):
+        return {phase: GenerationConfig(**config) for phase, config in spec.items()}
+    return GenerationConfig(**spec)
+
+
+def agent_options_from_spec(spec: dict) -> dict:
+    """Re-creates the model, tool and limit settings of an agent serialized by `Agent.to_spec`."""
+    return {
+        "llm": spec.get("llm", "llama-3.3-70b-versatile"),
+        "router": ModelRouter.from_spec(spec["router"]) if spec.get("router") else None,
+        "tool_top_k": spec.get("tool_top_k"),
+        "observation_policy": ObservationPolicy(**spec["observation_policy"]) if spec.get("observation_policy") else None,
+        "native_tools": spec.get("native_tools", False),
+        "budget": TokenBudget(**spec["budget"]) if spec.get("budget") else None,
+        "generation": generation_from_spec(spec.get("generation")),
+    }
 
 
 class Agent:
@@ -29,6 +66,15 @@ class Agent:
         task_expected_output (str, optional): The expected format or content of the task output. Defaults to "".
         tools (list[Tool] | None, optional): A list of Tool instances available to the agent. Defaults to None.
         llm (str, optional): The name of the language model to use. Defaults to "llama-3.3-70b-versatile".
+        router (ModelRouter | None, optional): Per-phase model routing policy. Defaults to `llm` for every phase.
+        client (optional): Completion client (e.g. MultiBackendClient). Defaults to the shared Groq client.
+            A custom client cannot be serialized: such agents can only run in "thread" mode.
+        budget (TokenBudget | None, optional): Hard token / call / cost limits of each run of the agent.
+        generation (GenerationConfig | dict[str, GenerationConfig] | None, optional): Generation settings
+            (max_tokens, temperature, stop, seed...) for every phase, or keyed by phase.
+        tool_top_k (int | None, optional): Number of most relevant tools shown to the model per round (see `ReactAgent`).
+        observation_policy (ObservationPolicy | None, optional): Size limits of tool results (see `ReactAgent`).
+        native_tools (bool, optional): Use the provider's native function calling (see `ReactAgent`).
     """
 
     def __init__(
@@ -39,13 +85,27 @@ class Agent:
         task_expected_output: str = "",
         tools: list[Tool] | None = None,
         llm: str = "llama-3.3-70b-versatile",
+        router: ModelRouter | None = None,
+        client=None,
+        budget: TokenBudget | None = None,
+        generation: GenerationConfig | dict[str, GenerationConfig] | None = None,
+        tool_top_k: int | None = None,
+        observation_policy: ObservationPolicy | None = None,
+        native_tools: bool = False,
     ):
         self.name = name
         self.backstory = backstory
         self.task_description = task_description
         self.task_expected_output = task_expected_output
+        self.budget = budget
+        self.client = client
         self.react_agent = ReactAgent(
-            model=llm, system_prompt=self.backstory, tools=tools or []
+            model=llm, system_prompt=self.backstory, tools=tools or [], router=router, client=client,
+            budget=budget,
+            generation=generation,
+            tool_top_k=tool_top_k,
+            observation_policy=observation_policy,
+            native_tools=native_tools,
         )
 
         self.dependencies: list[Agent] = []  # Agents that this agent depends on
@@ -56,9 +116,87 @@ class Agent:
         # Automatically register this agent to the active Crew context if one exists
         Crew.register_agent(self)
 
+    @property
+    def last_usage(self):
+        """UsageTracker | None: Token usage and cost of the agent's most recent run."""
+        return self.react_agent.last_usage
+
+    @property
+    def last_partial(self) -> bool:
+        """
+        bool: Whether the agent's most recent run was cut short by a deadline or budget. Concurrent
+        runs overwrite it; read `utils.runs.last_run()` right after the run instead.
+        """
+        return self.react_agent.last_partial
+
     def __repr__(self):
         return f"{self.name}"
 
+    def to_spec(self) -> dict:
+        """
+        Serializes the agent into a plain dictionary that can be sent to another process or host.
+
+        Tools are stored as importable references (see `tool_reference`), dependencies by agent name.
+
+        Returns:
+            dict: The serializable description of the agent.
+
+        Raises:
+            ValueError: If the agent has a custom client, which cannot be sent to another process.
+        """
+        if self.client is not None:
+            raise ValueError(
+                f"Agent {self.name!r} has a custom client, which cannot be serialized; "
+                'run its crew with CrewExecutor(mode="thread")'
+            )
+
+        react_agent = self.react_agent
+        store = react_agent.observation_store
+        # Công cụ phân trang được tạo lại cùng store, không import được
+        tools = [tool for tool in react_agent.tools if store is None or tool is not store.paging_tool]
+        return {
+            "name": self.name,
+            "backstory": self.backstory,
+            "task_description": self.task_description,
+            "task_expected_output": self.task_expected_output,
+            "tools": [tool_reference(tool) for tool in tools],
+            "llm": react_agent.model,
+            "router": react_agent.router.to_spec(),
+            "tool_top_k": react_agent.tool_top_k,
+            "observation_policy": asdict(store.policy) if store else None,
+            "native_tools": react_agent.native_tools,
+            "dependencies": [dependency.name for dependency in self.dependencies],
+            "budget": asdict(self.budget) if self.budget else None,
+            "generation": generation_to_spec(react_agent.generation_config),
+        }
+
+    @classmethod
+    def from_spec(cls, spec: dict) -> "Agent":
+        """
+        Re-creates an agent from a dictionary produced by `to_spec`.
+
+        Dependencies are not restored here, since they refer to other agents; see `Crew.from_spec`.
+
+        Args:
+            spec (dict): The serializable description of the agent.
+
+        Returns:
+            Agent: The new agent instance (registered to the active Crew context, if any).
+        """
+        if cls is Agent and spec.get("type") == "map_reduce":
+            from .map_reduce import MapReduceAgent
+
+            return MapReduceAgent.from_spec(spec)
+
+        return cls(
+            name=spec["name"],
+            backstory=spec["backstory"],
+            task_description=spec["task_description"],
+            task_expected_output=spec.get("task_expected_output", ""),
+            tools=[resolve_tool(reference) for reference in spec.get("tools", [])],
+            **agent_options_from_spec(spec),
+        )
+
     def __rshift__(self, other):
         """
         Defines the '>>' operator. This operator is used to indicate agent dependency.
@@ -155,10 +293,16 @@ class Agent:
         """
         self.context += f"{self.name} received context: \n{input_data}"
 
-    def create_prompt(self):
+    def create_prompt(self, context: str | None = None, task_description: str | None = None):
         """
         Creates a prompt for the agent based on its task description, expected output, and context.
 
+        Args:
+            context (str | None, optional): The context to put in the prompt. Defaults to the context
+                received from the other agents.
+            task_description (str | None, optional): The task to put in the prompt. Defaults to the
+                agent's `task_description`.
+
         Returns:
             str: The formatted prompt string.
         """
@@ -174,7 +318,7 @@ class Agent:
         a meaningful response to complete the task.
 
         <task_description>
-        {self.task_description}
+        {self.task_description if task_description is None else task_description}
         </task_description>
 
         <task_expected_output>
@@ -182,7 +326,7 @@ class Agent:
         </task_expected_output>
 
         <context>
-        {self.context}
+        {self.context if context is None else context}
         </context>
 
         Your response:
@@ -191,17 +335,34 @@ class Agent:
 
         return prompt
 
-    def run(self):
+    def execute(self, deadline: float | Deadline | None = None) -> str:
+        """
+        Runs the agent's task without passing the output to the dependents (the crew executor
+        propagates it itself).
+
+        Args:
+            deadline (float | Deadline | None, optional): Wall-clock budget in seconds (or an absolute Deadline).
+
+        Returns:
+            str: The output generated by the agent.
+        """
+        return self.react_agent.run(user_msg=self.create_prompt(), deadline=deadline)
+
+    def run(self, deadline: float | Deadline | None = None):
         """
         Runs the agent's task and generates the output.
 
         This method creates a prompt, runs it through the ReactAgent, and passes the output to all dependent agents.
 
+        Args:
+            deadline (float | Deadline | None, optional): Wall-clock budget in seconds (or an absolute Deadline).
+                Defaults to the deadline of the enclosing run, if any.
+
         Returns:
-            str: The output generated by the agent.
+            str: The output generated by the agent (a partial answer if the deadline passed or the
+                budget was exceeded).
         """
-        msg = self.create_prompt()
-        output = self.react_agent.run(user_msg=msg)
+        output = self.execute(deadline=deadline)
 
         # Pass the output to all dependents
         for dependent in self.dependents:
@@ -1,9 +1,24 @@
+import contextvars
+import threading
+import time
 from collections import deque
+from collections.abc import AsyncIterator
+from collections.abc import Iterator
 
-from colorama import Fore
-from graphviz import Digraph  # type: ignore
+from ..utils.deadlines import Deadline
+from ..utils.deadlines import current_deadline
+from ..utils.logging import Fore
+from ..utils.logging import fancy_print
+from ..utils.runs import run_with_report
+from ..utils.usage import TokenBudget
+from ..utils.usage import UsageTracker
+from .events import AgentEvent
+from .events import finished_event
+from .events import run_context
+from .timeline import Timeline
 
-from agentic_patterns.utils.logging import fancy_print
+# Crew đang mở bằng `with`, riêng cho từng thread / asyncio task
+_current_crew: contextvars.ContextVar["Crew | None"] = contextvars.ContextVar("current_crew", default=None)
 
 
 class Crew:
@@ -13,15 +28,21 @@ class Crew:
     This class manages a group of agents, their dependencies, and provides methods
     for running the agents in a topologically sorted order.
 
+    The active crew (the one agents register to when created inside a `with crew:` block) is
+    tracked per thread and per asyncio task, so several crews can be built and run concurrently.
+    Crews can be nested: leaving the inner block makes the outer crew active again.
+
     Attributes:
-        current_crew (Crew): Class-level variable to track the active Crew context.
         agents (list): A list of agents in the crew.
+        timeline (Timeline | None): The execution timeline of the most recent run.
+        usage (UsageTracker | None): Token usage and cost of the most recent run.
     """
 
-    current_crew = None
-
     def __init__(self):
         self.agents = []
+        self._tokens: list[contextvars.Token] = []
+        self.timeline: Timeline | None = None
+        self.usage: UsageTracker | None = None
 
     def __enter__(self):
         """
@@ -30,19 +51,19 @@ class Crew:
         Returns:
             Crew: The current Crew instance.
         """
-        Crew.current_crew = self
+        self._tokens.append(_current_crew.set(self))
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         """
-        Exits the context manager, clearing the active context.
+        Exits the context manager, restoring the previously active context (the enclosing crew, if any).
 
         Args:
             exc_type: The exception type, if an exception was raised.
             exc_val: The exception value, if an exception was raised.
             exc_tb: The traceback, if an exception was raised.
         """
-        Crew.current_crew = None
+        _current_crew.reset(self._tokens.pop())
 
     def add_agent(self, agent):
         """
@@ -53,6 +74,14 @@ class Crew:
         """
         self.agents.append(agent)
 
+    @staticmethod
+    def current() -> "Crew | None":
+        """
+        Returns:
+            Crew | None: The active crew of the current thread or asyncio task, if any.
+        """
+        return _current_crew.get()
+
     @staticmethod
     def register_agent(agent):
         """
@@ -61,8 +90,9 @@ class Crew:
         Args:
             agent: The agent to be registered.
         """
-        if Crew.current_crew is not None:
-            Crew.current_crew.add_agent(agent)
+        crew = _current_crew.get()
+        if crew is not None:
+            crew.add_agent(agent)
 
     def topological_sort(self):
         """
@@ -95,6 +125,49 @@ class Crew:
 
         return sorted_agents
 
+    def to_spec(self) -> dict:
+        """
+        Serializes the crew into a plain dictionary describing its agents and their dependencies.
+
+        The result only contains JSON-compatible values, so it can be stored, sent to worker
+        processes or to workers on other hosts.
+
+        Returns:
+            dict: The serializable description of the crew.
+
+        Raises:
+            ValueError: If two agents share the same name.
+        """
+        names = [agent.name for agent in self.agents]
+        if len(names) != len(set(names)):
+            raise ValueError("Agent names must be unique to serialize a crew")
+
+        return {"agents": [agent.to_spec() for agent in self.agents]}
+
+    @classmethod
+    def from_spec(cls, spec: dict) -> "Crew":
+        """
+        Re-creates a crew (agents and dependencies) from a dictionary produced by `to_spec`.
+
+        Args:
+            spec (dict): The serializable description of the crew.
+
+        Returns:
+            Crew: The new crew.
+        """
+        from .agent import Agent
+
+        crew = cls()
+        with crew:
+            agents = {
+                agent_spec["name"]: Agent.from_spec(agent_spec)
+                for agent_spec in spec["agents"]
+            }
+        for agent_spec in spec["agents"]:
+            for dependency in agent_spec.get("dependencies", []):
+                agents[agent_spec["name"]].add_dependency(agents[dependency])
+        return crew
+
     def plot(self):
         """
         Plots the Directed Acyclic Graph (DAG) of agents in the crew using Graphviz.
@@ -102,6 +175,8 @@ class Crew:
         Returns:
             Digraph: A Graphviz Digraph object representing the agent dependencies.
         """
+        from graphviz import Digraph  # type: ignore
+
         dot = Digraph(format="png")  # Set format to PNG for inline display
 
         # Add nodes and edges for each agent in the crew
@@ -111,13 +186,170 @@ class Crew:
                 dot.edge(dependency.name, agent.name)
         return dot
 
-    def run(self):
+    def usage_report(self) -> dict:
+        """
+        Summarizes the token usage and cost of the most recent run, for the crew and per agent.
+
+        Returns:
+            dict: {"crew": {...}, "agents": {name: {...}}}, each with calls, tokens, cost and the
+                per-model breakdown. Agents that ran in other processes are missing.
+        """
+        return {
+            "crew": self.usage.to_dict() if self.usage else None,
+            "agents": {
+                agent.name: agent.last_usage.to_dict()
+                for agent in self.agents
+                if agent.last_usage is not None
+            },
+        }
+
+    def run(
+        self,
+        executor=None,
+        deadline: float | Deadline | None = None,
+        budget: TokenBudget | None = None,
+    ) -> dict[str, str]:
         """
         Runs all agents in the crew in topologically sorted order.
 
-        This method executes each agent's run method and prints the results.
+        This method executes each agent's run method and prints the results as they complete (see
+        `stream` to consume them instead). The execution timeline of the run is stored in `timeline`
+        (see `Timeline.plot` and `Timeline.export`).
+
+        Args:
+            executor (CrewExecutor, optional): Dispatches ready agents concurrently to a pool of
+                threads, worker processes or remote queue workers. If None, agents run one by one
+                in the calling thread.
+            deadline (float | Deadline | None, optional): Wall-clock budget for the whole crew, in
+                seconds (or an absolute Deadline). Agents running when it passes return their partial
+                answer, and agents that have not started yet are skipped.
+            budget (TokenBudget | None, optional): Token / call / cost limits for the whole crew. Like
+                the deadline, once it is exceeded the running agent returns its partial answer and the
+                remaining agents are skipped. Usage is recorded in `usage` (see `usage_report`).
+
+        Returns:
+            dict[str, str]: The output of each agent that ran, keyed by agent name, in completion order.
+        """
+        outputs = {}
+        for event in self.stream(executor, deadline, budget):
+            if event.output is not None:
+                outputs[event.agent] = event.output
+                print(Fore.RED + f"{event.output}")
+        return outputs
+
+    def stream(
+        self,
+        executor=None,
+        deadline: float | Deadline | None = None,
+        budget: TokenBudget | None = None,
+    ) -> Iterator[AgentEvent]:
+        """
+        Runs the crew like `run`, yielding the result of every agent as soon as it is known.
+
+        Every agent yields exactly one event: "completed" or "partial" with its output and timings,
+        or "skipped". The next agents keep running while the caller handles an event, but only the
+        events themselves are buffered. Closing the iterator early stops dispatching new agents
+        (the running ones finish first).
+
+        Args:
+            executor (CrewExecutor, optional): See `run`.
+            deadline (float | Deadline | None, optional): See `run`.
+            budget (TokenBudget | None, optional): See `run`.
+
+        Yields:
+            AgentEvent: One event per agent, in completion order.
         """
+        if executor is not None:
+            yield from executor.stream(self, deadline=deadline, budget=budget)
+            return
+
         sorted_agents = self.topological_sort()
+        timeline = self.timeline = Timeline()
+        usage = self.usage = UsageTracker("crew", budget)
+        context = run_context(deadline, usage)
+        active_deadline = context.run(current_deadline)
+        origin = time.perf_counter()
         for agent in sorted_agents:
+            if active_deadline is not None and active_deadline.expired:
+                fancy_print(f"DEADLINE EXCEEDED, SKIPPING: {agent}")
+                yield AgentEvent(agent.name, "skipped", reason="deadline")
+                continue
+            if usage.exceeded:
+                fancy_print(f"BUDGET EXCEEDED, SKIPPING: {agent}")
+                yield AgentEvent(agent.name, "skipped", reason="budget")
+                continue
             fancy_print(f"RUNNING AGENT: {agent}")
-            print(Fore.RED + f"{agent.run()}")
\ No newline at end of file
+            start = time.perf_counter()
+            output, partial = context.copy().run(self._run_agent, agent, timeline)
+            end = time.perf_counter()
+            timeline.record(agent.name, "agent", start, end)
+            yield finished_event(agent, output, partial, start - origin, end - origin, 0.0)
+
+    @staticmethod
+    def _run_agent(agent, timeline: Timeline) -> tuple[str, bool]:
+        # Đọc báo cáo trong chính context đã chạy agent (xem `run_with_report`)
+        with timeline.scope(agent.name):
+            output, report = run_with_report(agent.run)
+        return output, report is not None and report.partial
+
+    async def astream(
+        self,
+        executor=None,
+        deadline: float | Deadline | None = None,
+        budget: TokenBudget | None = None,
+        max_buffered: int = 16,
+        thread_pool=None,
+    ) -> AsyncIterator[AgentEvent]:
+        """
+        Async counterpart of `stream`: the crew runs in a worker thread and its events are handed
+        to the event loop through a queue of at most `max_buffered` events, so a slow consumer
+        pauses the dispatch of new agents instead of accumulating results.
+
+        Args:
+            executor (CrewExecutor, optional): See `run`.
+            deadline (float | Deadline | None, optional): See `run`.
+            budget (TokenBudget | None, optional): See `run`.
+            max_buffered (int, optional): Maximum number of events waiting for the consumer.
+            thread_pool (concurrent.futures.Executor | None, optional): The pool running the crew's
+                thread. Defaults to the event loop's default executor.
+
+        Yields:
+            AgentEvent: One event per agent, in completion order.
+        """
+        # asyncio chỉ được import khi dùng, để giữ thời gian import của package thấp
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue(max_buffered)
+        stopped = threading.Event()
+        done = object()
+
+        def produce():
+            events_iter = self.stream(executor, deadline, budget)
+            item = done
+            try:
+                for event in events_iter:
+                    if stopped.is_set():
+                        break
+                    asyncio.run_coroutine_threadsafe(events.put(event), loop).result()
+            except BaseException as exc:  # Chuyển lỗi về coroutine đang đọc
+                item = exc
+            finally:
+                events_iter.close()
+            asyncio.run_coroutine_threadsafe(events.put(item), loop).result()
+
+        producer = loop.run_in_executor(thread_pool, contextvars.copy_context().run, produce)
+        try:
+            while (item := await events.get()) is not done:
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # Consumer dừng sớm: ngừng gửi agent mới và xả hàng đợi để thread kết thúc
+            stopped.set()
+            while not producer.done():
+                try:
+                    await asyncio.wait_for(events.get(), 0.1)
+                except TimeoutError:
+                    pass
+            await producer
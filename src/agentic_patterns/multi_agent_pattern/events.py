@@ -0,0 +1,87 @@
+import contextvars
+from dataclasses import asdict
+from dataclasses import dataclass
+
+from ..utils.deadlines import Deadline
+from ..utils.deadlines import deadline_scope
+from ..utils.usage import UsageTracker
+from ..utils.usage import usage_scope
+
+
+@dataclass
+class AgentEvent:
+    """
+    The result of one agent of a crew run, yielded by `Crew.stream` as soon as it is known.
+
+    Attributes:
+        agent (str): The agent name.
+        status (str): "completed", "partial" (the agent was stopped by the crew's deadline or a
+            budget and returned its best partial answer) or "skipped" (the agent never ran).
+        output (str | None): The agent's output, None if skipped.
+        started (float | None): Start time, in seconds since the beginning of the run.
+        finished (float | None): End time, in seconds since the beginning of the run.
+        waited (float): Seconds the agent was ready but waiting for a free worker.
+        reason (str | None): Why the agent was skipped ("deadline", "budget" or "dependency skipped"),
+            or "deadline" for a partial event without output (a queue worker that never reported).
+        usage (dict | None): Token usage and cost of the agent (see `UsageTracker.to_dict`), when it
+            ran in this process.
+    """
+
+    agent: str
+    status: str
+    output: str | None = None
+    started: float | None = None
+    finished: float | None = None
+    waited: float = 0.0
+    reason: str | None = None
+    usage: dict | None = None
+
+    @property
+    def duration(self) -> float | None:
+        if self.started is None or self.finished is None:
+            return None
+        return self.finished - self.started
+
+    def to_dict(self) -> dict:
+        """Returns the event as plain (JSON-serializable) data."""
+        return {**asdict(self), "duration": self.duration}
+
+
+def finished_event(
+    agent, output: str, partial: bool, started: float, finished: float, waited: float,
+) -> AgentEvent:
+    """
+    Builds the event of an agent that returned. `partial` comes from the agent's own run (see
+    `utils.runs.last_run`), not from the state of the deadline when the event is built.
+    """
+    last_usage = agent.last_usage
+    return AgentEvent(
+        agent=agent.name,
+        status="partial" if partial else "completed",
+        output=output,
+        started=started,
+        finished=finished,
+        waited=waited,
+        usage=last_usage.to_dict() if last_usage is not None else None,
+    )
+
+
+def run_context(deadline: float | Deadline | None, usage: UsageTracker) -> contextvars.Context:
+    """
+    Returns a copy of the current context with the crew's deadline and usage tracker active.
+
+    Crew runs are generators: scopes entered with `with` inside them would leak into the caller's
+    context at every `yield`. Agents are run inside (a copy of) this context instead.
+
+    Args:
+        deadline (float | Deadline | None): The crew's deadline.
+        usage (UsageTracker): The crew's usage tracker.
+
+    Returns:
+        contextvars.Context: The context to run the agents in.
+    """
+    def capture():
+        with deadline_scope(deadline), usage_scope(usage):
+            return contextvars.copy_context()
+
+    return contextvars.copy_context().run(capture)
@@ -0,0 +1,453 @@
+import heapq
+import queue
+import threading
+import time
+import uuid
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from multiprocessing.managers import BaseManager
+
+from .events import AgentEvent
+from .events import finished_event
+from .events import run_context
+from .scheduling import SchedulePlan
+from .scheduling import StatsStore
+from .scheduling import estimate_tokens
+from .scheduling import plan_schedule
+from .timeline import Timeline
+from ..utils.deadlines import Deadline
+from ..utils.deadlines import DeadlineExceeded
+from ..utils.deadlines import current_deadline
+from ..utils.usage import TokenBudget
+from ..utils.usage import UsageTracker
+from ..utils.logging import Fore
+from ..utils.logging import fancy_print
+from ..utils.runs import run_with_report
+
+
+# Các hàng đợi này chỉ tồn tại trong process server của CrewQueueManager
+_task_queue: queue.Queue = queue.Queue()
+_result_queue: queue.Queue = queue.Queue()
+
+
+def _get_task_queue() -> queue.Queue:
+    return _task_queue
+
+
+def _get_result_queue() -> queue.Queue:
+    return _result_queue
+
+
+class CrewQueueManager(BaseManager):
+    """
+    A multiprocessing manager exposing a task queue and a result queue over the network.
+
+    The coordinator puts `(task_id, agent_spec, context, timeout)` tuples on the task queue, and
+    workers (possibly on other hosts) put `(task_id, ok, result)` tuples on the result queue, where
+    `result` is the `(output, partial)` pair of `run_agent_spec`, or the error message.
+    """
+
+
+CrewQueueManager.register("get_task_queue", callable=_get_task_queue)
+CrewQueueManager.register("get_result_queue", callable=_get_result_queue)
+
+
+def run_agent_spec(agent_spec: dict, context: str = "", timeout: float | None = None) -> tuple[str, bool]:
+    """
+    Runs a single agent described by `Agent.to_spec` and returns its output.
+
+    This is the entry point executed inside worker processes and queue workers.
+
+    Args:
+        agent_spec (dict): The serializable description of the agent.
+        context (str, optional): The context accumulated from the agent's dependencies.
+        timeout (float | None, optional): Seconds left in the crew's deadline, if any.
+
+    Returns:
+        tuple[str, bool]: The output generated by the agent, and whether it is a partial answer
+            (see `utils.runs.RunReport`).
+    """
+    from .agent import Agent
+
+    agent = Agent.from_spec(agent_spec)
+    agent.context = context
+    output, report = run_with_report(agent.run, deadline=timeout)
+    return output, report is not None and report.partial
+
+
+def run_queue_worker(
+    address: tuple[str, int] = ("127.0.0.1", 50000),
+    authkey: bytes = b"agentic-crew",
+) -> None:
+    """
+    Connects to a CrewQueueManager and runs agent tasks until a `None` task is received.
+
+    Start one or more of these on any host that can reach the coordinator's address.
+
+    Args:
+        address (tuple[str, int], optional): Host and port of the queue manager.
+        authkey (bytes, optional): The shared authentication key.
+    """
+    manager = CrewQueueManager(address=address, authkey=authkey)
+    manager.connect()
+    tasks = manager.get_task_queue()
+    results = manager.get_result_queue()
+
+    while True:
+        try:
+            task = tasks.get()
+        except (EOFError, OSError):  # Coordinator đã tắt queue manager
+            break
+        if task is None:
+            break
+
+        task_id, agent_spec, context, timeout = task
+        try:
+            results.put((task_id, True, run_agent_spec(agent_spec, context, timeout)))
+        except Exception as exc:  # Báo lỗi về cho coordinator thay vì làm chết worker
+            results.put((task_id, False, f"{type(exc).__name__}: {exc}"))
+
+
+class _QueueDispatcher:
+    """
+    Dispatches agent specs through a CrewQueueManager and resolves them as Futures.
+
+    A remote worker may die without reporting: the future of a task sent with a timeout fails
+    with DeadlineExceeded if no result arrives within the timeout plus `RESULT_GRACE` seconds
+    (the time for the worker to return its partial answer).
+    """
+
+    RESULT_GRACE = 5.0
+
+    def __init__(self, address: tuple[str, int], authkey: bytes, serve: bool):
+        self.manager = CrewQueueManager(address=address, authkey=authkey)
+        if serve:
+            self.manager.start()
+        else:
+            self.manager.connect()
+        self.serve = serve
+        self.tasks = self.manager.get_task_queue()
+        self.results = self.manager.get_result_queue()
+        self.pending: dict[str, tuple[Future, float | None]] = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.collector = threading.Thread(target=self._collect, daemon=True)
+        self.collector.start()
+
+    def submit(self, agent_spec: dict, context: str, timeout: float | None) -> Future:
+        task_id = uuid.uuid4().hex
+        future: Future = Future()
+        expires_at = None if timeout is None else time.monotonic() + timeout + self.RESULT_GRACE
+        with self.lock:
+            self.pending[task_id] = (future, expires_at)
+        self.tasks.put((task_id, agent_spec, context, timeout))
+        return future
+
+    def _collect(self) -> None:
+        while not self.stopped.is_set():
+            self._expire()
+            try:
+                task_id, ok, result = self.results.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+
+            with self.lock:
+                future, _ = self.pending.pop(task_id, (None, None))
+            if future is None:
+                continue
+            if ok:
+                future.set_result(result)
+            else:
+                future.set_exception(RuntimeError(result))
+
+    def _expire(self) -> None:
+        """Fails the tasks whose worker did not report before the deadline (plus the grace period)."""
+        now = time.monotonic()
+        with self.lock:
+            expired = [
+                task_id for task_id, (_, expires_at) in self.pending.items()
+                if expires_at is not None and now >= expires_at
+            ]
+            futures = [self.pending.pop(task_id)[0] for task_id in expired]
+        for future in futures:
+            future.set_exception(DeadlineExceeded("The queue worker running the agent did not report before the deadline"))
+
+    def shutdown(self) -> None:
+        self.stopped.set()
+        self.collector.join()
+        if self.serve:
+            self.manager.shutdown()
+
+
+def _run_local_agent(agent, timeline: Timeline | None = None) -> tuple[str, bool]:
+    """Runs an agent in the current process without propagating its output (see `run_agent_spec`)."""
+    if timeline is None:
+        output, report = run_with_report(agent.execute)
+    else:
+        with timeline.scope(agent.name):
+            output, report = run_with_report(agent.execute)
+    return output, report is not None and report.partial
+
+
+def _remaining_seconds() -> float | None:
+    deadline = current_deadline()
+    return deadline.remaining() if deadline is not None else None
+
+
+class CrewExecutor:
+    """
+    Runs the agents of a Crew concurrently, dispatching every agent whose dependencies
+    are satisfied to a pool of workers.
+
+    The calling thread acts as the coordinator: it keeps track of the dependency graph,
+    collects results as they complete and propagates each output to the dependents'
+    context before they are dispatched. When more agents are ready than there are free
+    workers, the ones with the longest remaining critical path (estimated from the
+    historical latency in `stats`) are started first.
+
+    Attributes:
+        max_workers (int | None): Maximum number of agents running at the same time.
+        mode (str): Where agents run: "thread" (in this process), "process" (a local process
+            pool) or "queue" (workers attached to a CrewQueueManager, possibly on other hosts).
+        address (tuple[str, int]): Address of the queue manager, used in "queue" mode.
+        authkey (bytes): Authentication key of the queue manager, used in "queue" mode.
+        serve (bool): In "queue" mode, whether the coordinator starts the queue manager itself
+            or connects to one that is already running.
+        stats (StatsStore): Per-agent latency and token history, updated after every agent run.
+
+    The execution timeline of every run (agent runs, time spent waiting for a worker and, in
+    "thread" mode, LLM and tool spans) is stored in the crew's `timeline` attribute, and its
+    token usage in the crew's `usage` attribute. Only agents running in the coordinator's process
+    ("thread" mode) are counted in the crew usage and budget; in "process" and "queue" mode use
+    per-agent budgets (`Agent(budget=...)`), which travel with the agent spec.
+    """
+
+    MODES = ("thread", "process", "queue")
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        mode: str = "process",
+        address: tuple[str, int] = ("127.0.0.1", 50000),
+        authkey: bytes = b"agentic-crew",
+        serve: bool = True,
+        stats: StatsStore | None = None,
+    ):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown mode {mode!r}, expected one of {self.MODES}")
+
+        self.max_workers = max_workers
+        self.mode = mode
+        self.address = address
+        self.authkey = authkey
+        self.serve = serve
+        self.stats = stats or StatsStore()
+
+    def _capacity(self, crew) -> int:
+        return self.max_workers or max(len(crew.agents), 1)
+
+    def plan(self, crew) -> SchedulePlan:
+        """
+        Predicts the critical path and makespan of the crew under this executor's worker cap.
+
+        Args:
+            crew (Crew): The crew to plan.
+
+        Returns:
+            SchedulePlan: The critical path, predicted makespan and dispatch priorities.
+        """
+        return plan_schedule(crew, self.stats, self.max_workers)
+
+    def run(
+        self,
+        crew,
+        deadline: float | Deadline | None = None,
+        budget: TokenBudget | None = None,
+    ) -> dict[str, str]:
+        """
+        Runs all agents in the crew, respecting their dependencies, and prints their outputs as
+        they complete (see `stream` to consume them instead).
+
+        Args:
+            crew (Crew): The crew to run.
+            deadline (float | Deadline | None, optional): Wall-clock budget for the whole crew, in
+                seconds (or an absolute Deadline). It is propagated to every worker; once it passes no
+                new agent is dispatched and running agents return their partial answers.
+            budget (TokenBudget | None, optional): Token / call / cost limits for the whole crew.
+                Once exceeded, no new agent is dispatched and running agents return their partial
+                answers ("thread" mode only).
+
+        Returns:
+            dict[str, str]: The output of each agent, keyed by agent name, in completion order.
+                Agents skipped because of the deadline or the budget are missing.
+
+        Raises:
+            ValueError: If there's a circular dependency among the agents.
+        """
+        outputs = {}
+        for event in self.stream(crew, deadline, budget):
+            if event.output is not None:
+                outputs[event.agent] = event.output
+                print(Fore.RED + f"{event.output}")
+        return outputs
+
+    def stream(
+        self,
+        crew,
+        deadline: float | Deadline | None = None,
+        budget: TokenBudget | None = None,
+    ) -> Iterator[AgentEvent]:
+        """
+        Runs the crew like `run`, yielding the result of every agent as soon as it completes.
+
+        Newly ready agents are dispatched before the events are handed to the caller, so a slow
+        consumer does not hold back the crew. Closing the iterator early stops dispatching new
+        agents and waits for the running ones.
+
+        Args:
+            crew (Crew): The crew to run.
+            deadline (float | Deadline | None, optional): See `run`.
+            budget (TokenBudget | None, optional): See `run`.
+
+        Yields:
+            AgentEvent: One event per agent ("completed", "partial" or "skipped"), in completion order.
+
+        Raises:
+            ValueError: If there's a circular dependency among the agents.
+        """
+        # Lập kế hoạch (đồng thời kiểm tra chu trình) trước khi gửi bất kỳ agent nào đi
+        plan = self.plan(crew)
+        fancy_print(
+            f"CRITICAL PATH: {' -> '.join(plan.critical_path)}\n"
+            f"PREDICTED MAKESPAN: {plan.makespan:.1f}s",
+            pause=0,
+        )
+
+        capacity = self._capacity(crew)
+        timeline = crew.timeline = Timeline(workers=capacity, critical_path=plan.critical_path)
+        usage = crew.usage = UsageTracker("crew", budget)
+        context = run_context(deadline, usage)
+        if self.mode == "thread":
+            pool = ThreadPoolExecutor(max_workers=capacity)
+            # Thread con nhận bản sao context để thấy deadline và ngân sách của coordinator
+            submit = lambda agent: pool.submit(
+                context.copy().run, _run_local_agent, agent, timeline
+            )
+        elif self.mode == "process":
+            pool = ProcessPoolExecutor(max_workers=capacity)
+            submit = lambda agent: pool.submit(
+                run_agent_spec, agent.to_spec(), agent.context, context.run(_remaining_seconds)
+            )
+        else:
+            pool = _QueueDispatcher(self.address, self.authkey, self.serve)
+            submit = lambda agent: pool.submit(
+                agent.to_spec(), agent.context, context.run(_remaining_seconds)
+            )
+
+        try:
+            yield from self._coordinate(
+                crew, submit, capacity, plan.priorities, context.run(current_deadline), timeline, usage
+            )
+        finally:
+            pool.shutdown()
+
+    def _coordinate(
+        self,
+        crew,
+        submit,
+        capacity: int,
+        priorities: dict[str, float],
+        deadline: Deadline | None,
+        timeline: Timeline,
+        usage: UsageTracker,
+    ) -> Iterator[AgentEvent]:
+        order = {agent: i for i, agent in enumerate(crew.agents)}
+        in_degree = {agent: len(agent.dependencies) for agent in crew.agents}
+        # Heap theo độ dài critical path còn lại (lớn nhất trước), hoà thì theo thứ tự khai báo
+        ready = [
+            (-priorities[agent.name], order[agent], agent)
+            for agent in crew.agents
+            if in_degree[agent] == 0
+        ]
+        heapq.heapify(ready)
+        origin = time.perf_counter()
+        ready_since = {agent: origin for _, _, agent in ready}
+        running: dict[Future, tuple] = {}
+        events: list[AgentEvent] = []
+        reported: set[str] = set()
+
+        while ready or running:
+            reason = None
+            if deadline is not None and deadline.expired and ready:
+                # Hết thời gian: không gửi thêm agent nào, chỉ chờ các agent đang chạy trả kết quả dở dang
+                fancy_print(f"DEADLINE EXCEEDED, SKIPPING: {[agent for _, _, agent in ready]}", pause=0)
+                reason = "deadline"
+            elif usage.exceeded and ready:
+                fancy_print(f"BUDGET EXCEEDED, SKIPPING: {[agent for _, _, agent in ready]}", pause=0)
+                reason = "budget"
+            if reason is not None:
+                events += [AgentEvent(agent.name, "skipped", reason=reason) for _, _, agent in ready]
+                ready.clear()
+
+            while ready and len(running) < capacity:
+                _, _, agent = heapq.heappop(ready)
+                # Không dừng sau khi in: coordinator phải gửi ngay các agent sẵn sàng tiếp theo
+                fancy_print(f"RUNNING AGENT: {agent}", pause=0)
+                started = time.perf_counter()
+                waited_since = ready_since.pop(agent)
+                timeline.record(agent.name, "wait", waited_since, started)
+                running[submit(agent)] = (agent, started, started - waited_since)
+
+            # Gửi agent mới đi trước rồi mới trả sự kiện, để consumer chậm không làm chậm crew
+            for event in events:
+                reported.add(event.agent)
+                yield event
+            events.clear()
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                agent, started, waited = running.pop(future)
+                try:
+                    output, partial = future.result()
+                except DeadlineExceeded:
+                    # Worker từ xa không trả kết quả trước deadline (ví dụ đã chết): không có câu trả lời dở dang
+                    finished = time.perf_counter()
+                    timeline.record(agent.name, "agent", started, finished)
+                    fancy_print(f"AGENT LOST: {agent}", pause=0)
+                    output = ""
+                    events.append(AgentEvent(
+                        agent.name, "partial", output, started - origin, finished - origin, waited, reason="deadline"
+                    ))
+                else:
+                    finished = time.perf_counter()
+                    timeline.record(agent.name, "agent", started, finished)
+                    self.stats.record(agent.name, finished - started, estimate_tokens(output))
+                    events.append(finished_event(
+                        agent, output, partial, started - origin, finished - origin, waited
+                    ))
+
+                for dependent in agent.dependents:
+                    dependent.receive_context(output)
+                    in_degree[dependent] -= 1
+                    if in_degree[dependent] == 0:
+                        ready_since[dependent] = finished
+                        heapq.heappush(
+                            ready,
+                            (-priorities[dependent.name], order[dependent], dependent),
+                        )
+
+        for event in events:
+            reported.add(event.agent)
+            yield event
+        # Agent phụ thuộc vào agent bị bỏ qua thì không bao giờ sẵn sàng
+        for agent in crew.agents:
+            if agent.name not in reported:
+                yield AgentEvent(agent.name, "skipped", reason="dependency skipped")
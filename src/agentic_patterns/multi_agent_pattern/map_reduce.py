@@ -0,0 +1,258 @@
+import contextvars
+import json
+from concurrent.futures import ThreadPoolExecutor
+from textwrap import dedent
+
+from .agent import Agent
+from .agent import agent_options_from_spec
+from ..tool_pattern.observations import ObservationPolicy
+from ..tool_pattern.tool import Tool
+from ..tool_pattern.tool import resolve_tool
+from ..utils.deadlines import Deadline
+from ..utils.deadlines import deadline_scope
+from ..utils.routing import GenerationConfig
+from ..utils.runs import RunReport
+from ..utils.runs import report_run
+from ..utils.runs import run_with_report
+from ..utils.routing import ModelRouter
+from ..utils.usage import TokenBudget
+from ..utils.usage import UsageTracker
+from ..utils.usage import usage_scope
+
+REDUCE_TASK = """
+Merge the partial results given in the context into a single result. Each partial result was
+produced for a different part of the input, for the following task:
+
+%s
+
+Keep every relevant piece of information, remove duplicates and resolve contradictions.
+"""
+
+
+def split_items(text: str, separator: str | None = None) -> list[str]:
+    """
+    Splits an agent output into a list of items.
+
+    Args:
+        text (str): The text to split.
+        separator (str | None, optional): The item separator. If None, a JSON array is used when
+            the text is one, otherwise every non-empty line is an item.
+
+    Returns:
+        list[str]: The items.
+    """
+    if separator is None:
+        try:
+            items = json.loads(text)
+        except ValueError:
+            items = None
+        if isinstance(items, list):
+            return [item if isinstance(item, str) else json.dumps(item, ensure_ascii=False) for item in items]
+        separator = "\n"
+    return [item.strip() for item in text.split(separator) if item.strip()]
+
+
+def chunked(items: list, size: int) -> list[list]:
+    """Splits `items` into consecutive chunks of at most `size` items."""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class MapReduceAgent(Agent):
+    """
+    An agent that fans the same task out over a list of items.
+
+    The items (given directly, or split from the outputs of the upstream agents) are grouped into
+    chunks of `chunk_size`, and the task runs once per chunk, with at most `max_concurrency` chunks
+    in flight. The partial results are then merged by a reduce step; with more than `reduce_fan_in`
+    partial results, the merge is a tree: groups of `reduce_fan_in` results are reduced
+    concurrently, then the results of those reductions, until a single output remains.
+
+    It is scheduled like any other agent of the crew: it starts when its dependencies are done,
+    and its final output is passed to its dependents.
+
+    Attributes:
+        items (list[str] | None): The items to process. If None, they are split from the upstream outputs.
+        separator (str | None): Separator used to split the upstream outputs (see `split_items`).
+        chunk_size (int): Number of items per map task.
+        max_concurrency (int): Maximum number of map or reduce tasks running at the same time.
+        reduce_fan_in (int): Maximum number of partial results merged by one reduce task.
+        reduce_description (str): The task of the reduce step.
+
+    Args:
+        name (str): The name of the agent.
+        backstory (str): The backstory or background of the agent.
+        task_description (str): The task run on every chunk.
+        task_expected_output (str, optional): The expected format of every chunk's output and of the final output.
+        items (list[str] | None, optional): The items to process. Defaults to splitting the upstream outputs.
+        separator (str | None, optional): Separator of the upstream outputs. Defaults to a JSON array or lines.
+        chunk_size (int, optional): Number of items per map task. Defaults to 10.
+        max_concurrency (int, optional): Maximum number of concurrent tasks. Defaults to 4.
+        reduce_fan_in (int, optional): Partial results merged per reduce task. Defaults to 4.
+        reduce_description (str | None, optional): The task of the reduce step. Defaults to merging
+            the partial results of `task_description`.
+        budget (TokenBudget | None, optional): Hard limits for the whole fan-out (map and reduce).
+        Other arguments are the same as `Agent`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        backstory: str,
+        task_description: str,
+        task_expected_output: str = "",
+        items: list[str] | None = None,
+        separator: str | None = None,
+        chunk_size: int = 10,
+        max_concurrency: int = 4,
+        reduce_fan_in: int = 4,
+        reduce_description: str | None = None,
+        tools: list[Tool] | None = None,
+        llm: str = "llama-3.3-70b-versatile",
+        router: ModelRouter | None = None,
+        client=None,
+        budget: TokenBudget | None = None,
+        generation: GenerationConfig | dict[str, GenerationConfig] | None = None,
+        tool_top_k: int | None = None,
+        observation_policy: ObservationPolicy | None = None,
+        native_tools: bool = False,
+    ):
+        if chunk_size < 1 or max_concurrency < 1 or reduce_fan_in < 2:
+            raise ValueError("chunk_size and max_concurrency must be >= 1 and reduce_fan_in >= 2")
+
+        # Ngân sách áp dụng cho toàn bộ fan-out, không phải cho từng chunk
+        super().__init__(
+            name, backstory, task_description, task_expected_output, tools, llm, router, client,
+            generation=generation,
+            tool_top_k=tool_top_k,
+            observation_policy=observation_policy,
+            native_tools=native_tools,
+        )
+        self.budget = budget
+        self.items = items
+        self.separator = separator
+        self.chunk_size = chunk_size
+        self.max_concurrency = max_concurrency
+        self.reduce_fan_in = reduce_fan_in
+        self.reduce_description = reduce_description or dedent(REDUCE_TASK % task_description).strip()
+        self._last_usage: UsageTracker | None = None
+        self._last_partial = False
+
+    @property
+    def inputs(self) -> list[str]:
+        """list[str]: The outputs received from the upstream agents."""
+        # Context được lưu dạng JSON để gửi được sang worker process / queue worker
+        return json.loads(self.context) if self.context else []
+
+    def receive_context(self, input_data):
+        """
+        Stores the output of an upstream agent.
+
+        Args:
+            input_data (str): The output to add.
+        """
+        self.context = json.dumps([*self.inputs, input_data], ensure_ascii=False)
+
+    @property
+    def last_usage(self):
+        """UsageTracker | None: Token usage and cost of the most recent fan-out."""
+        return self._last_usage
+
+    @property
+    def last_partial(self) -> bool:
+        """bool: Whether a map or reduce task of the most recent fan-out was cut short by a deadline or budget."""
+        return self._last_partial
+
+    def _run_task(self, prompt: str) -> str:
+        # Các task chạy đồng thời trên cùng ReactAgent: dùng báo cáo của chính lệnh gọi này, không dùng `last_partial`
+        output, report = run_with_report(self.react_agent.run, user_msg=prompt)
+        if report.partial:
+            self._last_partial = True
+        return output
+
+    def to_spec(self) -> dict:
+        return {
+            **super().to_spec(),
+            "type": "map_reduce",
+            "items": self.items,
+            "separator": self.separator,
+            "chunk_size": self.chunk_size,
+            "max_concurrency": self.max_concurrency,
+            "reduce_fan_in": self.reduce_fan_in,
+            "reduce_description": self.reduce_description,
+        }
+
+    @classmethod
+    def from_spec(cls, spec: dict) -> "MapReduceAgent":
+        return cls(
+            name=spec["name"],
+            backstory=spec["backstory"],
+            task_description=spec["task_description"],
+            task_expected_output=spec.get("task_expected_output", ""),
+            items=spec.get("items"),
+            separator=spec.get("separator"),
+            chunk_size=spec.get("chunk_size", 10),
+            max_concurrency=spec.get("max_concurrency", 4),
+            reduce_fan_in=spec.get("reduce_fan_in", 4),
+            reduce_description=spec.get("reduce_description"),
+            tools=[resolve_tool(reference) for reference in spec.get("tools", [])],
+            **agent_options_from_spec(spec),
+        )
+
+    def collect_items(self) -> list[str]:
+        """
+        Returns the items to process: `items` if given, otherwise the upstream outputs split with `separator`.
+        """
+        if self.items is not None:
+            return [str(item) for item in self.items]
+        return [item for output in self.inputs for item in split_items(output, self.separator)]
+
+    def _run_all(self, prompts: list[str]) -> list[str]:
+        if len(prompts) == 1:
+            return [self._run_task(prompts[0])]
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(prompts))) as pool:
+            # Mỗi task nhận bản sao context để thấy deadline, ngân sách và timeline của crew
+            futures = [
+                pool.submit(contextvars.copy_context().run, self._run_task, prompt)
+                for prompt in prompts
+            ]
+            return [future.result() for future in futures]
+
+    def _reduce_prompt(self, partials: list[str]) -> str:
+        context = "\n\n".join(
+            f"<partial_result index={i}>\n{partial}\n</partial_result>" for i, partial in enumerate(partials)
+        )
+        return self.create_prompt(context=context, task_description=self.reduce_description)
+
+    def execute(self, deadline: float | Deadline | None = None) -> str:
+        """
+        Runs the map tasks over the chunks, then tree-reduces their outputs.
+
+        Args:
+            deadline (float | Deadline | None, optional): Wall-clock budget in seconds (or an absolute Deadline).
+
+        Returns:
+            str: The merged output (an empty string if there is no item to process).
+        """
+        items = self.collect_items()
+        usage = self._last_usage = UsageTracker(self.name, self.budget)
+        self._last_partial = False
+        if not items:
+            report_run(RunReport(usage))
+            return ""
+
+        with deadline_scope(deadline), usage_scope(usage):
+            prompts = [
+                self.create_prompt(context="\n\n".join(chunk))
+                for chunk in chunked(items, self.chunk_size)
+            ]
+            partials = self._run_all(prompts)
+
+            # Tree-reduce: gộp từng nhóm reduce_fan_in kết quả cho tới khi còn một
+            while len(partials) > 1:
+                groups = chunked(partials, self.reduce_fan_in)
+                reduced = self._run_all([self._reduce_prompt(group) for group in groups if len(group) > 1])
+                # Nhóm cuối chỉ có một kết quả thì giữ nguyên, không cần gọi LLM
+                partials = reduced + [group[0] for group in groups if len(group) == 1]
+        # Báo cáo của cả fan-out thay cho báo cáo của task cuối cùng (xem `last_run`)
+        report_run(RunReport(usage, self._last_partial))
+        return partials[0]
@@ -0,0 +1,195 @@
+import heapq
+import json
+import os
+from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
+
+
+@dataclass
+class AgentStats:
+    """
+    Historical execution statistics of one agent.
+
+    Attributes:
+        runs (int): How many runs have been recorded.
+        mean_latency (float): Exponentially weighted mean wall-clock latency, in seconds.
+        mean_tokens (float): Exponentially weighted mean number of tokens produced.
+    """
+
+    runs: int = 0
+    mean_latency: float = 0.0
+    mean_tokens: float = 0.0
+
+    def update(self, latency: float, tokens: float, alpha: float) -> None:
+        """
+        Folds a new observation into the running means.
+
+        Args:
+            latency (float): Latency of the run, in seconds.
+            tokens (float): Tokens produced by the run.
+            alpha (float): Weight of the new observation (0 < alpha <= 1).
+        """
+        if self.runs == 0:
+            self.mean_latency, self.mean_tokens = latency, tokens
+        else:
+            self.mean_latency += alpha * (latency - self.mean_latency)
+            self.mean_tokens += alpha * (tokens - self.mean_tokens)
+        self.runs += 1
+
+
+class StatsStore:
+    """
+    Keeps per-agent latency and token statistics across crew runs, optionally persisted as JSON.
+
+    Agents are identified by name, so stats survive re-creating the crew.
+
+    Attributes:
+        path (str | None): JSON file the stats are loaded from and saved to. None keeps them in memory.
+        default_latency (float): Latency assumed for agents that have never run, in seconds.
+        alpha (float): Weight of the newest observation in the running means.
+        stats (dict[str, AgentStats]): The statistics, keyed by agent name.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        default_latency: float = 5.0,
+        alpha: float = 0.3,
+    ):
+        self.path = path
+        self.default_latency = default_latency
+        self.alpha = alpha
+        self.stats: dict[str, AgentStats] = {}
+
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.stats = {name: AgentStats(**data) for name, data in json.load(f).items()}
+
+    def record(self, name: str, latency: float, tokens: float) -> None:
+        """
+        Records one run of an agent and persists the store if it has a path.
+
+        Args:
+            name (str): The agent name.
+            latency (float): Latency of the run, in seconds.
+            tokens (float): Tokens produced by the run.
+        """
+        self.stats.setdefault(name, AgentStats()).update(latency, tokens, self.alpha)
+        if self.path:
+            self.save()
+
+    def estimate(self, name: str) -> float:
+        """
+        Predicts the latency of an agent from its history.
+
+        Args:
+            name (str): The agent name.
+
+        Returns:
+            float: The expected latency in seconds, or `default_latency` for unseen agents.
+        """
+        stats = self.stats.get(name)
+        return stats.mean_latency if stats else self.default_latency
+
+    def save(self) -> None:
+        """Writes the statistics to `path` as JSON."""
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({name: asdict(stats) for name, stats in self.stats.items()}, f, indent=2)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Roughly estimates the number of tokens in a text (about 4 characters per token).
+
+    Args:
+        text (str): The text to measure.
+
+    Returns:
+        int: The estimated token count.
+    """
+    return max(len(text) // 4, 1) if text else 0
+
+
+@dataclass
+class SchedulePlan:
+    """
+    The predicted schedule of a crew run.
+
+    Attributes:
+        critical_path (list[str]): Names of the agents on the longest dependency chain.
+        makespan (float): Predicted end-to-end latency with the given worker cap, in seconds.
+        priorities (dict[str, float]): Remaining critical path length of every agent (its own
+            latency plus the longest chain of dependents), used as its dispatch priority.
+    """
+
+    critical_path: list[str]
+    makespan: float
+    priorities: dict[str, float] = field(default_factory=dict)
+
+
+def plan_schedule(crew, stats: StatsStore, max_workers: int | None = None) -> SchedulePlan:
+    """
+    Computes agent priorities, the critical path and the predicted makespan of a crew.
+
+    Priorities are the "upward rank" of each agent: its expected latency plus the longest
+    expected chain of dependents after it. The makespan is predicted by simulating a list
+    scheduler that always starts the ready agent with the highest priority.
+
+    Args:
+        crew (Crew): The crew to plan.
+        stats (StatsStore): Historical statistics used to estimate each agent's latency.
+        max_workers (int | None, optional): Maximum number of agents running concurrently.
+            None means unlimited.
+
+    Returns:
+        SchedulePlan: The planned schedule.
+
+    Raises:
+        ValueError: If there's a circular dependency among the agents.
+    """
+    sorted_agents = crew.topological_sort()
+    cost = {agent: stats.estimate(agent.name) for agent in sorted_agents}
+
+    rank: dict = {}
+    successor: dict = {}
+    for agent in reversed(sorted_agents):
+        best = max(agent.dependents, key=lambda dependent: rank[dependent], default=None)
+        successor[agent] = best
+        rank[agent] = cost[agent] + (rank[best] if best is not None else 0.0)
+
+    critical_path = []
+    roots = [agent for agent in sorted_agents if not agent.dependencies]
+    current = max(roots, key=lambda agent: rank[agent], default=None)
+    while current is not None:
+        critical_path.append(current.name)
+        current = successor[current]
+
+    return SchedulePlan(
+        critical_path=critical_path,
+        makespan=_simulate(sorted_agents, cost, rank, max_workers or len(sorted_agents) or 1),
+        priorities={agent.name: rank[agent] for agent in sorted_agents},
+    )
+
+
+def _simulate(sorted_agents: list, cost: dict, rank: dict, capacity: int) -> float:
+    """Simulates priority list scheduling and returns the finish time of the last agent."""
+    order = {agent: i for i, agent in enumerate(sorted_agents)}
+    in_degree = {agent: len(agent.dependencies) for agent in sorted_agents}
+    ready = [(-rank[agent], order[agent], agent) for agent in sorted_agents if in_degree[agent] == 0]
+    heapq.heapify(ready)
+    running: list = []  # (finish_time, order, agent)
+    now = 0.0
+
+    while ready or running:
+        while ready and len(running) < capacity:
+            _, i, agent = heapq.heappop(ready)
+            heapq.heappush(running, (now + cost[agent], i, agent))
+
+        now, _, agent = heapq.heappop(running)
+        for dependent in agent.dependents:
+            in_degree[dependent] -= 1
+            if in_degree[dependent] == 0:
+                heapq.heappush(ready, (-rank[dependent], order[dependent], dependent))
+
+    return now
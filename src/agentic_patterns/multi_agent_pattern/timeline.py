@@ -0,0 +1,213 @@
+import json
+import threading
+import time
+from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
+
+from ..utils.profiling import profiling_scope
+
+
+@dataclass
+class Span:
+    """
+    One timed interval of a crew run.
+
+    Attributes:
+        agent (str): The agent the span belongs to.
+        kind (str): "agent" (the whole agent run), "wait" (ready but waiting for a free worker),
+            "llm" (a completion request) or "tool" (a round of tool calls).
+        start (float): Start time, in seconds since the beginning of the run.
+        end (float): End time, in seconds since the beginning of the run.
+        round (int | None): The agent loop round, for "llm" and "tool" spans.
+        meta (dict): Extra attributes (model, phase, tools...).
+    """
+
+    agent: str
+    kind: str
+    start: float
+    end: float
+    round: int | None = None
+    meta: dict = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+class Timeline:
+    """
+    The execution timeline of one crew run.
+
+    `Crew.run` and `CrewExecutor.run` record when every agent waited, started and finished; agents
+    running in this process also record their LLM requests and tool rounds. The timeline can be
+    summarized, rendered as a Gantt chart (`plot`) or exported as a JSON trace (`export`) that
+    chrome://tracing and Perfetto can open.
+
+    LLM and tool spans are only available for agents running in the coordinator's process
+    (sequential runs and the "thread" executor mode).
+
+    Attributes:
+        spans (list[Span]): The recorded spans.
+        workers (int): Number of agents that could run at the same time.
+        critical_path (list[str]): Agent names on the predicted critical path, if known.
+    """
+
+    def __init__(self, workers: int = 1, critical_path: list[str] | None = None):
+        self.spans: list[Span] = []
+        self.workers = workers
+        self.critical_path = critical_path or []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def record(self, agent: str, kind: str, start: float, end: float, round: int | None = None, **meta) -> None:
+        """
+        Records a span from two `time.perf_counter()` readings.
+
+        Args:
+            agent (str): The agent name.
+            kind (str): The span kind (see `Span`).
+            start (float): Start `time.perf_counter()` reading.
+            end (float): End `time.perf_counter()` reading.
+            round (int | None, optional): The agent loop round.
+            **meta: Extra attributes.
+        """
+        span = Span(agent, kind, start - self._origin, end - self._origin, round, meta)
+        with self._lock:
+            self.spans.append(span)
+
+    def scope(self, agent: str):
+        """Context manager recording the LLM and tool spans of `agent` (see `profiling_scope`)."""
+        return profiling_scope(self, agent)
+
+    @property
+    def makespan(self) -> float:
+        agent_spans = [span for span in self.spans if span.kind == "agent"]
+        if not agent_spans:
+            return 0.0
+        return max(span.end for span in agent_spans) - min(span.start for span in agent_spans)
+
+    def summary(self) -> dict:
+        """
+        Aggregates the spans per agent and for the whole run.
+
+        Per agent: total run time, LLM and tool time, idle time (running but neither waiting for
+        the model nor a tool: prompt building, parsing, logging...) and time spent waiting for a
+        worker. For the run: makespan, busy time, achieved parallelism and the worker time left
+        unused (`workers * makespan - busy`).
+
+        Returns:
+            dict: {"agents": {name: {...}}, "makespan", "busy", "parallelism", "unused_worker_time"}.
+        """
+        agents: dict[str, dict] = {}
+        for span in self.spans:
+            stats = agents.setdefault(
+                span.agent, {"total": 0.0, "llm": 0.0, "tool": 0.0, "wait": 0.0, "rounds": 0}
+            )
+            key = "total" if span.kind == "agent" else span.kind
+            stats[key] = stats.get(key, 0.0) + span.duration
+            if span.round is not None:
+                stats["rounds"] = max(stats["rounds"], span.round + 1)
+
+        for stats in agents.values():
+            stats["idle"] = max(stats["total"] - stats["llm"] - stats["tool"], 0.0)
+
+        makespan = self.makespan
+        busy = sum(stats["total"] for stats in agents.values())
+        return {
+            "agents": agents,
+            "makespan": makespan,
+            "busy": busy,
+            "parallelism": busy / makespan if makespan else 0.0,
+            "unused_worker_time": max(self.workers * makespan - busy, 0.0),
+            "critical_path": self.critical_path,
+        }
+
+    def to_trace(self) -> dict:
+        """
+        Converts the timeline to the Chrome trace event format (one row per agent).
+
+        Returns:
+            dict: The trace, with a "traceEvents" list and the `summary` under "metadata".
+        """
+        rows = {name: i for i, name in enumerate(dict.fromkeys(span.agent for span in self.spans))}
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": 0, "tid": tid, "args": {"name": name}}
+            for name, tid in rows.items()
+        ]
+        for span in sorted(self.spans, key=lambda span: span.start):
+            name = span.kind if span.round is None else f"{span.kind} #{span.round}"
+            events.append({
+                "name": name,
+                "cat": span.kind,
+                "ph": "X",
+                "ts": span.start * 1e6,
+                "dur": span.duration * 1e6,
+                "pid": 0,
+                "tid": rows[span.agent],
+                "args": {"agent": span.agent, "round": span.round, **span.meta},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms", "metadata": self.summary()}
+
+    def export(self, path: str) -> None:
+        """
+        Writes the JSON trace (see `to_trace`) to `path`.
+
+        Args:
+            path (str): The output file.
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_trace(), f, ensure_ascii=False, indent=2, default=str)
+
+    def to_dict(self) -> dict:
+        """Returns the raw spans and summary as plain data."""
+        return {"spans": [asdict(span) for span in self.spans], "summary": self.summary()}
+
+    def plot(self, ax=None):
+        """
+        Draws the timeline as a Gantt chart: one row per agent, with the agent run, its LLM
+        requests and tool rounds, and the time it waited for a worker. Agents on the critical
+        path are labelled in bold.
+
+        Args:
+            ax (matplotlib.axes.Axes, optional): Axes to draw on. A new figure is created if None.
+
+        Returns:
+            matplotlib.figure.Figure: The figure containing the chart.
+        """
+        import matplotlib.pyplot as plt
+        from matplotlib.patches import Patch
+
+        agents = list(dict.fromkeys(span.agent for span in self.spans))
+        if ax is None:
+            _, ax = plt.subplots(figsize=(10, 1 + 0.6 * max(len(agents), 1)))
+
+        styles = {
+            "agent": {"color": "#d9d9d9", "height": 0.7},
+            "wait": {"color": "#ffffff", "height": 0.7, "hatch": "//", "edgecolor": "#999999"},
+            "llm": {"color": "#4c72b0", "height": 0.4, "zorder": 3},
+            "tool": {"color": "#dd8452", "height": 0.4, "zorder": 3},
+        }
+        for span in self.spans:
+            style = styles.get(span.kind, {"color": "#55a868", "height": 0.4, "zorder": 3})
+            ax.barh(agents.index(span.agent), span.duration, left=span.start, **style)
+
+        ax.set_yticks(range(len(agents)), agents)
+        for label in ax.get_yticklabels():
+            if label.get_text() in self.critical_path:
+                label.set_fontweight("bold")
+        ax.invert_yaxis()
+        ax.set_xlabel("seconds")
+        summary = self.summary()
+        ax.set_title(
+            f"makespan {summary['makespan']:.2f}s, parallelism {summary['parallelism']:.2f}"
+        )
+        ax.legend(
+            handles=[
+                Patch(facecolor=style["color"], edgecolor=style.get("edgecolor"), hatch=style.get("hatch"), label=kind)
+                for kind, style in styles.items()
+            ],
+            loc="upper left",
+            bbox_to_anchor=(1.01, 1.0),
+        )
+        return ax.figure
@@ -0,0 +1,96 @@
+from ..tool_pattern.tool_calls import ToolCallError
+from ..tool_pattern.tool_calls import assign_tool_call_ids
+from ..tool_pattern.tool_calls import parse_tool_call
+from ..utils.single_flight import request_key
+
+
+def step_fingerprint(thought: str, name: str, arguments: dict) -> str:
+    """
+    Fingerprint của một bước ReAct: suy nghĩ (đã chuẩn hoá khoảng trắng và chữ hoa/thường),
+    tên công cụ và tham số.
+
+    Args:
+        thought (str): Suy nghĩ của vòng hiện tại.
+        name (str): Tên công cụ được gọi.
+        arguments (dict): Tham số của lệnh gọi.
+
+    Returns:
+        str: Chuỗi hex định danh bước.
+    """
+    return request_key(" ".join(thought.lower().split()), name, arguments)
+
+
+class LoopDetector:
+    """
+    Phát hiện vòng lặp ReAct không tiến triển: cùng suy nghĩ, cùng công cụ, cùng tham số.
+
+    Lệnh gọi lặp lại không được chạy lại; nó nhận kết quả quan sát trước đó. Sau `max_repeats`
+    lần lặp, `exhausted` báo cho agent biết cần dừng gọi công cụ và trả lời.
+
+    Attributes:
+        max_repeats (int): Số lệnh gọi lặp lại tối đa trước khi buộc agent trả lời.
+        repeats (int): Số lệnh gọi lặp lại đã gặp.
+    """
+
+    def __init__(self, max_repeats: int = 2):
+        self.max_repeats = max_repeats
+        self.repeats = 0
+        self._observations: dict[str, object] = {}
+
+    @property
+    def exhausted(self) -> bool:
+        return self.repeats >= self.max_repeats
+
+    def split(self, thought: str, tool_calls: list) -> tuple[list, list, dict, dict]:
+        """
+        Tách các lệnh gọi của một vòng thành lệnh gọi mới và lệnh gọi lặp lại.
+
+        Args:
+            thought (str): Suy nghĩ của vòng hiện tại.
+            tool_calls (list): Các tool call (chuỗi JSON hoặc dict) của vòng.
+
+        Returns:
+            tuple[list, list, dict, dict]: Các lệnh gọi mới cần chạy, id của chúng (gán một lần cho cả
+                vòng, truyền cho `run_tool_calls` để lệnh gọi hỏng không trùng id với lệnh gọi lặp lại),
+                kết quả cũ của các lệnh gọi lặp lại theo id, và fingerprint của các lệnh gọi mới theo id.
+        """
+        fresh = []
+        fresh_ids = []
+        repeated = {}
+        fingerprints = {}
+        parsed_calls = []
+        for tool_call in tool_calls:
+            try:
+                parsed_calls.append(parse_tool_call(tool_call))
+            except ToolCallError:
+                parsed_calls.append(None)
+
+        for tool_call, parsed, tool_call_id in zip(tool_calls, parsed_calls, assign_tool_call_ids(parsed_calls)):
+            if parsed is None:
+                # Lệnh gọi hỏng: để `process_tool_calls` báo lỗi như bình thường
+                fresh.append(tool_call)
+                fresh_ids.append(tool_call_id)
+                continue
+
+            parsed["id"] = tool_call_id
+            key = step_fingerprint(thought, parsed["name"], parsed["arguments"])
+            if key in self._observations:
+                repeated[tool_call_id] = self._observations[key]
+                self.repeats += 1
+            else:
+                fresh.append(parsed)
+                fresh_ids.append(tool_call_id)
+                fingerprints[tool_call_id] = key
+        return fresh, fresh_ids, repeated, fingerprints
+
+    def remember(self, fingerprints: dict, observations: dict) -> None:
+        """
+        Lưu kết quả quan sát của các lệnh gọi mới để trả lời những lần lặp lại sau.
+
+        Args:
+            fingerprints (dict): Fingerprint theo id, trả về từ `split`.
+            observations (dict): Kết quả của các lệnh gọi theo id.
+        """
+        for tool_call_id, key in fingerprints.items():
+            if tool_call_id in observations:
+                self._observations[key] = observations[tool_call_id]
@@ -1,20 +1,39 @@
-import json
-import re
-
-from colorama import Fore
-from dotenv import load_dotenv
-from groq import Groq
-
-from agentic_patterns.tool_pattern.tool import Tool
-from agentic_patterns.tool_pattern.tool import validate_arguments
-from agentic_patterns.utils.completions import build_prompt_structure
-from agentic_patterns.utils.completions import ChatHistory
-from agentic_patterns.utils.completions import completions_create
-from agentic_patterns.utils.completions import update_chat_history
-from agentic_patterns.utils.extractions import extract_tag_content
-
-
-load_dotenv()
+from contextlib import nullcontext
+
+from .loop_detection import LoopDetector
+from ..tool_pattern.observations import ObservationPolicy
+from ..tool_pattern.observations import ObservationStore
+from ..tool_pattern.observations import results_text
+from ..tool_pattern.tool import Tool
+from ..tool_pattern.tool_calls import native_tool_calls
+from ..tool_pattern.tool_calls import run_tool_calls
+from ..tool_pattern.tool_calls import tool_call_messages
+from ..tool_pattern.tool_index import ToolIndex
+from ..utils.completions import default_client
+from ..utils.completions import build_prompt_structure
+from ..utils.completions import ChatHistory
+from ..utils.completions import update_chat_history
+from ..utils.extractions import close_open_tags
+from ..utils.extractions import extract_tag_content
+from ..utils.extractions import remove_tag_content
+from ..utils.deadlines import Deadline
+from ..utils.deadlines import DeadlineExceeded
+from ..utils.deadlines import deadline_scope
+from ..utils.logging import Fore
+from ..utils.profiling import set_round
+from ..utils.routing import ModelRouter
+from ..utils.routing import GenerationConfig
+from ..utils.routing import Phase
+from ..utils.routing import generation_for
+from ..utils.runs import RunReport
+from ..utils.runs import report_run
+from ..utils.semantic_cache import SemanticCache
+from ..utils.semantic_cache import cache_namespace
+from ..utils.usage import BudgetExceeded
+from ..utils.usage import TokenBudget
+from ..utils.usage import UsageTracker
+from ..utils.usage import usage_scope
+from ..utils.sessions import SessionStore
 
 
 BASE_SYSTEM_PROMPT = ""
@@ -44,6 +63,26 @@ Các ràng buộc bổ sung:
 - Nếu người dùng hỏi bạn điều gì đó không liên quan đến bất kỳ công cụ nào ở trên, hãy trả lời tự do bằng cách đặt câu trả lời của bạn trong thẻ <response></response>.
 """
 
+# Dùng khi công cụ được truyền qua function calling gốc của provider: không cần nhúng chữ ký hay định dạng <tool_call>
+NATIVE_REACT_SYSTEM_PROMPT = """
+Bạn vận hành bằng cách chạy một vòng lặp với các bước sau: Suy nghĩ, Hành động, Quan sát.
+Ở mỗi bước, hãy viết suy nghĩ của bạn trong thẻ <thought></thought> rồi gọi một hoặc nhiều công cụ được cung cấp nếu cần.
+Đừng đưa ra giả định về giá trị cần truyền vào công cụ. Bạn sẽ được gọi lại với kết quả của các công cụ.
+Khi đã có đủ thông tin, hoặc nếu câu hỏi không liên quan đến công cụ nào, hãy trả lời trong thẻ <response></response>.
+"""
+
+# Nhắc mô hình khi nó gọi lại công cụ với cùng suy nghĩ và tham số
+REPEAT_NUDGE = """
+Bạn vừa lặp lại một lệnh gọi công cụ với cùng suy nghĩ và cùng tham số; kết quả ở trên được lấy lại từ quan sát trước đó.
+Đừng gọi lại: hãy dùng kết quả đã có, thử một cách khác, hoặc trả lời trong thẻ <response></response>.
+"""
+
+# Buộc mô hình trả lời khi đã lặp lại quá `max_repeats` lần
+FORCE_RESPONSE_PROMPT = """
+Bạn đang lặp lại cùng các lệnh gọi công cụ mà không có tiến triển. Không gọi thêm công cụ nào nữa.
+Hãy đưa ra câu trả lời cuối cùng tốt nhất dựa trên các quan sát đã có, trong thẻ <response></response>.
+"""
+
 
 class ReactAgent:
     """
@@ -52,66 +91,174 @@ class ReactAgent:
     thu thập chữ ký công cụ và xử lý nhiều lệnh gọi công cụ trong một vòng tương tác nhất định.
 
     Attributes:
-        client (Groq): Ứng dụng khách Groq trước đây xử lý việc hoàn thành dựa trên mô hình.
+        client (Groq): Client xử lý việc hoàn thành dựa trên mô hình: client Groq dùng chung, hoặc bất kỳ client nào
+            có `chat.completions.create` (vd. MultiBackendClient).
         model (str): Tên của mô hình được sử dụng để tạo ra các phản hồi. Mặc định là "llama-3.3-70b-versatile".
         tools (list[Tool]): Danh sách các phiên bản công cụ có sẵn để thực thi.
         tools_dict (dict): Một từ điển ánh xạ tên công cụ với các thể hiện công cụ tương ứng.
+        router (ModelRouter): Chọn mô hình cho từng giai đoạn (vòng suy nghĩ, phản hồi cuối cùng).
+        tool_top_k (int | None): Nếu được đặt, chỉ chữ ký của `tool_top_k` công cụ liên quan nhất tới câu hỏi
+            (và suy nghĩ gần nhất của agent) được đưa vào system prompt ở mỗi vòng.
+        tool_index (ToolIndex): Chỉ mục BM25 cục bộ trên tên và docstring của các công cụ.
+        cache (SemanticCache | None): Cache ngữ nghĩa (tùy chọn) cho phản hồi cuối cùng; câu hỏi đủ giống
+            một câu hỏi đã có trong cache sẽ được trả lời ngay mà không cần gọi mô hình hay công cụ.
+        observation_store (ObservationStore | None): Cắt bớt kết quả công cụ vượt giới hạn của `observation_policy`,
+            lưu bản đầy đủ ra file và cung cấp công cụ `read_observation` để mô hình đọc từng phần.
+            Các file này bị xoá khi lần chạy kết thúc.
+        session_store (SessionStore | None): Lưu lịch sử hội thoại theo session id để `run(..., session_id=...)`
+            tiếp tục cuộc trò chuyện trước đó.
+        native_tools (bool): Nếu True, công cụ được truyền qua tham số function calling gốc của provider
+            (xem `Tool.schema`) và các tool call có cấu trúc trong phản hồi được thực thi, thay vì nhúng chữ ký
+            vào prompt và tách thẻ <tool_call>.
+        generation_config (GenerationConfig | dict[str, GenerationConfig] | None): Thiết lập sinh văn bản
+            (max_tokens, temperature, stop, seed) cho mọi giai đoạn, hoặc theo từng giai đoạn. Mặc định, vòng ReAct
+            dừng ở </tool_call> hoặc </response> (xem `DEFAULT_GENERATION`), nên ở chế độ văn bản mỗi vòng chỉ gọi
+            một công cụ và các công cụ không bao giờ chạy đồng thời. Xem `parallel_tool_calls`.
+        parallel_tool_calls (bool): Nếu True, vòng ReAct ở chế độ văn bản không dừng ở </tool_call>: mô hình có thể
+            gọi nhiều công cụ trong một vòng và chúng được chạy đồng thời (xem `run_tool_calls`), đổi lại mô hình
+            có thể sinh thêm văn bản sau tool call. Không ảnh hưởng tới `native_tools` hay stop sequence đặt trong
+            `generation_config`.
+        max_repeats (int): Số lệnh gọi công cụ lặp lại (cùng suy nghĩ, công cụ và tham số) được chấp nhận trong một lần
+            `run`. Lệnh gọi lặp lại được trả lời bằng quan sát trước đó kèm lời nhắc; vượt giới hạn thì agent bị buộc
+            trả lời trong thẻ <response>.
+        budget (TokenBudget | None): Giới hạn token / số lần gọi / chi phí cho mỗi lần `run`. Khi vượt giới hạn,
+            vòng lặp dừng lại và trả về câu trả lời dở dang tốt nhất.
+        usage (UsageTracker): Tổng token và chi phí của mọi lần chạy của agent.
+        last_usage (UsageTracker | None): Token và chi phí của lần chạy gần nhất.
+        last_partial (bool): True nếu lần chạy gần nhất bị dừng bởi deadline hoặc `budget` và trả về câu trả lời dở dang.
+            `last_usage` và `last_partial` bị ghi đè bởi các lần chạy đồng thời trên cùng agent; khi agent được dùng
+            chung giữa nhiều thread, đọc `utils.runs.last_run()` ngay sau `run` thay vì hai thuộc tính này.
     """
 
-    def __init__(self, tools: Tool | list[Tool], model: str = "llama-3.3-70b-versatile", system_prompt: str="") -> None:
+    def __init__(
+        self,
+        tools: Tool | list[Tool],
+        model: str = "llama-3.3-70b-versatile",
+        system_prompt: str = "",
+        router: ModelRouter | None = None,
+        tool_top_k: int | None = None,
+        cache: SemanticCache | None = None,
+        observation_policy: ObservationPolicy | None = None,
+        session_store: SessionStore | None = None,
+        native_tools: bool = False,
+        client=None,
+        budget: TokenBudget | None = None,
+        generation: GenerationConfig | dict[str, GenerationConfig] | None = None,
+        max_repeats: int = 2,
+        parallel_tool_calls: bool = False,
+    ) -> None:
         """
         Khởi tạo ReactAgent với các công cụ và mô hình được cung cấp.
 
         Args:
             tools (Tool | list[Tool]): Một thể hiện duy nhất của Công cụ hoặc một danh sách các thể hiện của Công cụ
             model (str): Tên của mô hình sẽ được sử dụng để tạo ra các phản hồi.
+            system_prompt (str): Prompt hệ thống đặt trước hướng dẫn ReAct.
+            router (ModelRouter | None): Chính sách chọn mô hình theo giai đoạn. Mặc định dùng `model` cho mọi giai đoạn.
+            tool_top_k (int | None): Số công cụ tối đa được đưa vào prompt ở mỗi vòng. None nghĩa là tất cả.
+            cache (SemanticCache | None): Cache ngữ nghĩa cho phản hồi cuối cùng. None để tắt.
+            observation_policy (ObservationPolicy | None): Giới hạn kích thước kết quả công cụ. None để giữ nguyên kết quả.
+            session_store (SessionStore | None): Kho lưu phiên hội thoại. None nghĩa là mỗi lần `run` độc lập.
+            native_tools (bool): Dùng function calling gốc của provider thay cho tool call dạng văn bản.
+            client (optional): Client dùng để gọi mô hình. Mặc định là client Groq dùng chung.
+            budget (TokenBudget | None): Giới hạn cứng cho mỗi lần chạy. None nghĩa là không giới hạn.
+            generation (GenerationConfig | dict[str, GenerationConfig] | None): Thiết lập sinh văn bản của agent,
+                ghi đè thiết lập mặc định của giai đoạn và của router.
+            max_repeats (int): Số lệnh gọi công cụ lặp lại tối đa trước khi buộc agent trả lời.
+            parallel_tool_calls (bool): Cho phép nhiều tool call (chạy đồng thời) trong một vòng ở chế độ văn bản.
         """
-        self.client = Groq()
+        self.client = client or default_client()
         self.model = model
+        self.router = router or ModelRouter(model)
         self.system_prompt = system_prompt
         self.tools = tools if isinstance(tools, list) else [tools]
+        self.observation_store = None
+        if observation_policy is not None and self.tools:
+            self.observation_store = ObservationStore(observation_policy)
+            self.tools = [*self.tools, self.observation_store.paging_tool]
         self.tools_dict = {tool.name: tool for tool in self.tools}
+        self.tool_top_k = tool_top_k
+        self.tool_index = ToolIndex(self.tools)
+        self.cache = cache
+        self.session_store = session_store
+        self.native_tools = native_tools
+        self.budget = budget
+        self.generation_config = generation
+        self.max_repeats = max_repeats
+        self.parallel_tool_calls = parallel_tool_calls
+        self.usage = UsageTracker(type(self).__name__)
+        self.last_usage: UsageTracker | None = None
+        self.last_partial = False
+
+    def select_tools(self, query: str | None = None) -> list[Tool]:
+        """Chọn các công cụ được đưa cho mô hình.
 
-    def add_tool_signatures(self) -> str:
-        """Thu thập chữ ký hàm của tất cả các công cụ có sẵn.
+        Args:
+            query (str | None, optional): Văn bản dùng để chọn các công cụ liên quan nhất khi `tool_top_k` được đặt.
+                Nếu None, hoặc số công cụ không vượt quá `tool_top_k`, tất cả công cụ đều được đưa vào.
 
         Returns:
-            str: Một chuỗi kết hợp tất cả các chữ ký công cụ ở định dạng JSON.
+            list[Tool]: Các công cụ được chọn.
         """
-        return "".join([tool.fn_signature for tool in self.tools])
-    
-    def process_tool_calls(self, tool_calls_content: list) -> dict:
-        """Chương trình xử lý từng lệnh gọi công cụ, xác thực các tham số, thực thi các công cụ và thu thập kết quả.
+        if query and self.tool_top_k and len(self.tools) > self.tool_top_k:
+            return self.tool_index.search(query, self.tool_top_k)
+        return self.tools
+
+    def add_tool_signatures(self, query: str | None = None) -> str:
+        """Thu thập chữ ký hàm của các công cụ có sẵn.
 
         Args:
-            tool_calls_content (list): Danh sách các chuỗi ký tự, mỗi chuỗi đại diện cho một lệnh gọi công cụ ở định dạng JSON.
+            query (str | None, optional): Văn bản dùng để chọn công cụ (xem `select_tools`).
 
         Returns:
-            dict: Một từ điển trong đó khóa là ID lệnh gọi công cụ và giá trị là kết quả từ các công cụ đó.
+            str: Một chuỗi kết hợp các chữ ký công cụ ở định dạng JSON.
         """
-        observations = {}
-        for tool_call_str in tool_calls_content:
-            tool_call = json.loads(tool_call_str)
-            tool_name = tool_call["name"]
-            tool = self.tools_dict[tool_name]
+        return "".join([tool.fn_signature for tool in self.select_tools(query)])
 
-            print(Fore.GREEN + f"\nUsing Tool: {tool_name}")
+    def _cache_namespace(self) -> str:
+        # Câu trả lời phụ thuộc vào model, system prompt, công cụ và tham số sinh, không chỉ vào câu hỏi
+        return cache_namespace(
+            self.router.default, self.router.routes, self.system_prompt, self.generation_config,
+            [tool.fn_signature for tool in self.tools], self.native_tools,
+        )
 
-            # Validate and execute the tool call
-            validated_tool_call = validate_arguments(
-                tool_call, json.loads(tool.fn_signature)
-            )
-            print(Fore.GREEN + f"\nTool call dict: \n{validated_tool_call}")
+    def build_system_prompt(self, query: str | None = None) -> dict:
+        """Tạo system message gồm prompt của agent và hướng dẫn ReAct kèm chữ ký công cụ.
 
-            result = tool.run(**validated_tool_call["arguments"])
-            print(Fore.GREEN + f"\nTool result: \n{result}")
+        Args:
+            query (str | None, optional): Văn bản dùng để chọn công cụ (xem `add_tool_signatures`).
+
+        Returns:
+            dict: System message có cấu trúc.
+        """
+        system_prompt = self.system_prompt
+        if self.tools and self.native_tools:
+            system_prompt += "\n" + NATIVE_REACT_SYSTEM_PROMPT
+        elif self.tools:
+            system_prompt += "\n" + REACT_SYSTEM_PROMPT % self.add_tool_signatures(query)
+        return build_prompt_structure(prompt=system_prompt, role="system")
+    
+    def process_tool_calls(self, tool_calls_content: list, ids: list | None = None) -> dict:
+        """Chương trình xử lý từng lệnh gọi công cụ, xác thực các tham số, thực thi các công cụ và thu thập kết quả.
 
-            observations[validated_tool_call["id"]] = result
+        Args:
+            tool_calls_content (list): Danh sách các chuỗi ký tự, mỗi chuỗi đại diện cho một lệnh gọi công cụ ở định dạng JSON
+                (hoặc các dict tool call ở chế độ function calling gốc).
+            ids (list | None, optional): Id của các lệnh gọi, nếu đã được gán cho cả vòng (xem `LoopDetector.split`).
 
-        return observations
+        Returns:
+            dict: Một từ điển trong đó khóa là ID lệnh gọi công cụ và giá trị là kết quả từ các công cụ đó.
+        """
+        return run_tool_calls(self.tools_dict, tool_calls_content, self.observation_store, ids)
     
 
-    def run(self, user_msg: str, max_rounds: int = 10) -> str:
+    def run(
+        self,
+        user_msg: str,
+        max_rounds: int = 10,
+        deadline: float | Deadline | None = None,
+        session_id: str | None = None,
+    ) -> str:
         """
         Thực hiện một phiên tương tác với người dùng, trong đó agent xử lý đầu vào của người dùng, tạo phản hồi,
         xử lý các cuộc gọi tool và cập nhật lịch sử trò chuyện cho đến khi có phản hồi cuối cùng hoặc đạt đến số vòng tối đa.
@@ -119,51 +266,213 @@ class ReactAgent:
         Args:
             user_msg (str): Thông điệp do người dùng nhập vào để bắt đầu tương tác.
             max_rounds (int, optional): Số vòng tương tác tối đa mà Agent nên thực hiện. Mặc định là 10.
+            deadline (float | Deadline | None, optional): Ngân sách thời gian (giây) hoặc một Deadline tuyệt đối.
+                Các completion và tool đang chạy khi hết thời gian sẽ bị bỏ dở.
+            session_id (str | None, optional): Id phiên hội thoại trong `session_store`. Các tin nhắn trước đó của phiên
+                được đưa vào ngữ cảnh, và câu hỏi cùng câu trả lời của lượt này được ghi thêm vào phiên.
+                Cache ngữ nghĩa bị bỏ qua vì câu trả lời phụ thuộc vào lịch sử.
 
         Returns:
             str: Phản hồi cuối cùng được tạo ra bởi agent sau khi xử lý dữ liệu đầu vào của người dùng và bất kỳ lệnh gọi tool nào.
+                Nếu hết thời gian hoặc vượt `budget`, trả về câu trả lời dở dang tốt nhất (quan sát hoặc suy nghĩ gần nhất).
+        """
+        run_usage = self.last_usage = UsageTracker(type(self).__name__, self.budget)
+        report = RunReport(run_usage)
+        try:
+            with usage_scope(self.usage), usage_scope(run_usage):
+                if session_id is not None:
+                    if self.session_store is None:
+                        raise ValueError("session_id requires a session_store")
+                    return self._run_session(user_msg, max_rounds, deadline, session_id, report)
+
+                if self.cache is not None:
+                    cached = self.cache.get(user_msg, self._cache_namespace())
+                    if cached is not None:
+                        return cached
+
+                with deadline_scope(deadline), self._observation_scope():
+                    output = self._run(user_msg, max_rounds, report=report)
+
+            if self.cache is not None and not report.partial:
+                self.cache.put(user_msg, output, self._cache_namespace())
+            return output
+        finally:
+            # Báo cáo riêng của lần chạy này, không bị các lần chạy đồng thời ghi đè (xem `last_run`)
+            self.last_partial = report.partial
+            report_run(report)
+
+    def _run_session(
+        self,
+        user_msg: str,
+        max_rounds: int,
+        deadline: float | Deadline | None,
+        session_id: str,
+        report: RunReport,
+    ) -> str:
+        """Chạy `run` trong ngữ cảnh của một phiên và chỉ ghi thêm các tin nhắn mới của lượt này."""
+        history = self.session_store.get(session_id)
+        with deadline_scope(deadline), self._observation_scope():
+            output = self._run(user_msg, max_rounds, history, report)
+
+        self.session_store.append(
+            session_id,
+            [
+                build_prompt_structure(prompt=user_msg, role="user", tag="question"),
+                build_prompt_structure(prompt=str(output), role="assistant"),
+            ],
+        )
+        return output
+
+    def _thought_generation(self) -> GenerationConfig | None:
+        """Thiết lập sinh văn bản của một vòng ReAct ở chế độ văn bản."""
+        generation = generation_for(self.generation_config, Phase.REACT_THOUGHT)
+        if self.parallel_tool_calls and (generation is None or generation.stop is None):
+            # Chỉ dừng ở </response>: một vòng có thể chứa nhiều tool call
+            generation = GenerationConfig(stop=["</response>"]).merge(generation)
+        return generation
+
+    def _observation_scope(self):
+        # Các file spill chỉ cần trong lần chạy đã tạo ra chúng
+        return self.observation_store.run_scope() if self.observation_store else nullcontext()
+
+    def _run(
+        self, user_msg: str, max_rounds: int, history: list[dict] | None = None, report: RunReport | None = None
+    ) -> str:
+        """
+        Vòng lặp ReAct của `run`, không qua cache. `history` là các tin nhắn trước đó của phiên;
+        `report.partial` được đặt khi vòng lặp bị dừng bởi deadline hoặc ngân sách.
         """
         user_prompt = build_prompt_structure(
             prompt=user_msg,
             role="user",
             tag="question"
         )
-        if self.tools:
-            self.system_prompt += (
-                "\n" + REACT_SYSTEM_PROMPT % self.add_tool_signatures()
-            )
-
         chat_history = ChatHistory(
             [
-                build_prompt_structure(
-                    prompt=self.system_prompt,
-                    role="system"
-                ),
+                self.build_system_prompt(user_msg),
+                *(history or []),
                 user_prompt
             ]
         )
 
-        if self.tools:
-            for _ in range(max_rounds):
-                completion = completions_create(self.client, chat_history, self.model)
-
-                response = extract_tag_content(str(completion), "response")
-                if response.found:
-                    return response.content[0]
-                
-                thought = extract_tag_content(str(completion), "thought")
-                tool_calls = extract_tag_content(str(completion), "tool_call")
-
-                update_chat_history(chat_history, completion, role="assistant")
-
-                print(Fore.MAGENTA + f"\nAgent Thought: \n{thought.content[0]}")
-
-                if tool_calls.found:
-                    observations = self.process_tool_calls(tool_calls.content)
-
-                    print(Fore.BLUE + f"\nObservations: \n{observations}")
-                    
-                    update_chat_history(chat_history, f"{observations}", "user")
+        partial = ""    # Câu trả lời dở dang tốt nhất, trả về nếu hết thời gian
+        query = user_msg  # Văn bản dùng để chọn công cụ cho vòng tiếp theo
+        loop_detector = LoopDetector(self.max_repeats)
+        try:
+            if self.tools:
+                for round in range(max_rounds):
+                    set_round(round)
+                    if self.native_tools:
+                        message = self.router.complete_message(
+                            self.client,
+                            chat_history,
+                            Phase.REACT_THOUGHT,
+                            generation_for(self.generation_config, Phase.REACT_THOUGHT),
+                            tools=[tool.schema() for tool in self.select_tools(query)],
+                        )
+                        # Stop sequence bị provider cắt khỏi output: đóng lại các thẻ còn mở
+                        completion = close_open_tags(message.content or "")
+                        tool_calls = native_tool_calls(message)
+                        if not tool_calls:
+                            # Không còn tool call nào: nội dung chính là câu trả lời cuối cùng
+                            response = extract_tag_content(completion, "response")
+                            return response.content[0] if response.found else message.content or ""
+                    else:
+                        completion = close_open_tags(self.router.complete(
+                            self.client,
+                            chat_history,
+                            Phase.REACT_THOUGHT,
+                            self._thought_generation(),
+                        ))
+
+                        response = extract_tag_content(str(completion), "response")
+                        if response.found:
+                            return response.content[0]
+
+                        tool_calls = extract_tag_content(str(completion), "tool_call").content
+                        update_chat_history(chat_history, completion, role="assistant")
+
+                    thought = extract_tag_content(str(completion), "thought")
+                    thought_text = thought.content[0] if thought.found else ""
+                    if thought.found:
+                        partial = thought.content[0]
+                        print(Fore.MAGENTA + f"\nAgent Thought: \n{thought.content[0]}")
+
+                        # Chọn lại công cụ cho vòng sau dựa trên câu hỏi và suy nghĩ mới nhất
+                        if self.tool_top_k:
+                            query = f"{user_msg} {thought.content[0]}"
+                            if not self.native_tools:
+                                chat_history[0] = self.build_system_prompt(query)
+
+                    if tool_calls:
+                        # Lệnh gọi lặp lại được trả lời bằng quan sát cũ thay vì chạy lại công cụ
+                        fresh, fresh_ids, repeated, fingerprints = loop_detector.split(thought_text, tool_calls)
+                        observations = self.process_tool_calls(fresh, fresh_ids) if fresh else {}
+                        loop_detector.remember(fingerprints, observations)
+                        observations.update(repeated)
+                        partial = results_text(observations) or partial
+
+                        print(Fore.BLUE + f"\nObservations: \n{observations}")
+                        if repeated:
+                            print(Fore.YELLOW + f"\nRepeated tool calls {list(repeated)} answered from previous observations")
+
+                        # Nhắc nhở đi cùng tin nhắn quan sát, không thành một lượt user thứ hai liên tiếp
+                        notes = (REPEAT_NUDGE if repeated else "") + (
+                            FORCE_RESPONSE_PROMPT if loop_detector.exhausted else ""
+                        )
+                        if self.native_tools:
+                            chat_history.extend(tool_call_messages(message, observations))
+                            if notes:
+                                update_chat_history(chat_history, notes, "user")
+                        else:
+                            update_chat_history(chat_history, f"{observations}{notes}", "user")
+
+                        if loop_detector.exhausted:
+                            print(Fore.YELLOW + "\nRepetition limit reached, forcing a final response")
+                            break
+
+            if loop_detector.exhausted:
+                return self._forced_response(chat_history, query, partial)
+            if self.native_tools and self.tools:
+                # Lịch sử có tin nhắn "tool" nên vẫn truyền schema, nhưng không cho gọi thêm công cụ
+                return str(self.router.complete_message(
+                    self.client,
+                    chat_history,
+                    Phase.FINAL_RESPONSE,
+                    generation_for(self.generation_config, Phase.FINAL_RESPONSE),
+                    tools=[tool.schema() for tool in self.select_tools(query)],
+                    tool_choice="none",
+                ).content)
+            return self.router.complete(
+                self.client,
+                chat_history,
+                Phase.FINAL_RESPONSE,
+                generation_for(self.generation_config, Phase.FINAL_RESPONSE),
+            )
+        except (DeadlineExceeded, BudgetExceeded) as exc:
+            print(Fore.YELLOW + f"\n{exc}, returning the partial answer")
+            if report is not None:
+                report.partial = True
+            return partial
 
-        return completions_create(self.client, chat_history, self.model)
+    def _forced_response(self, chat_history: list, query: str, partial: str) -> str:
+        """
+        Yêu cầu câu trả lời cuối cùng sau khi agent lặp lại quá `max_repeats` lần, không cho gọi thêm công cụ.
 
+        Ở chế độ văn bản model vẫn có thể gọi công cụ: khi không có thẻ <response>, markup
+        <thought>/<tool_call> bị bỏ đi, và nếu không còn gì thì trả về `partial` (kết quả công cụ gần nhất).
+        """
+        params = {}
+        if self.native_tools:
+            params = {"tools": [tool.schema() for tool in self.select_tools(query)], "tool_choice": "none"}
+        completion = close_open_tags(str(self.router.complete_message(
+            self.client,
+            chat_history,
+            Phase.FINAL_RESPONSE,
+            generation_for(self.generation_config, Phase.FINAL_RESPONSE),
+            **params,
+        ).content))
+        response = extract_tag_content(completion, "response")
+        if response.found:
+            return response.content[0]
+        return remove_tag_content(completion, "thought", "tool_call") or partial
@@ -1,14 +1,23 @@
-from colorama import Fore
-from dotenv import load_dotenv
-from groq import Groq
-
-from src.agentic_patterns.utils.completions import completions_create
-from src.agentic_patterns.utils.completions import build_prompt_structure
-from src.agentic_patterns.utils.completions import FixedFirstChatHistory
-from src.agentic_patterns.utils.completions import update_chat_history
-from src.agentic_patterns.utils.logging import fancy_step_tracker
-
-load_dotenv()
+from ..utils.completions import default_client
+from ..utils.completions import build_prompt_structure
+from ..utils.completions import FixedFirstChatHistory
+from ..utils.completions import update_chat_history
+from ..utils.deadlines import Deadline
+from ..utils.deadlines import DeadlineExceeded
+from ..utils.deadlines import deadline_scope
+from ..utils.logging import fancy_step_tracker
+from ..utils.logging import Fore
+from ..utils.profiling import set_round
+from ..utils.routing import ModelRouter
+from ..utils.routing import GenerationConfig
+from ..utils.routing import Phase
+from ..utils.routing import generation_for
+from ..utils.runs import RunReport
+from ..utils.runs import report_run
+from ..utils.usage import BudgetExceeded
+from ..utils.usage import TokenBudget
+from ..utils.usage import UsageTracker
+from ..utils.usage import usage_scope
 
 #Vai trò (role)
 #Quy tắc an toàn
@@ -56,17 +65,38 @@ class ReflectionAgent:
     Attributes:
         model (str): Tên của model được sử dụng để tạo ra response và tự phản tư.
         client (str): Đối thực thể của client Groq() để tương tác với các Language Model.
+        router (ModelRouter): Chọn mô hình cho giai đoạn generation và critique. Mặc định dùng `model` cho cả hai.
+        budget (TokenBudget | None): Giới hạn token / số lần gọi / chi phí cho mỗi lần `run`.
+        generation_config (GenerationConfig | dict[str, GenerationConfig] | None): Thiết lập sinh văn bản (max_tokens,
+            temperature, stop, seed) cho mọi giai đoạn, hoặc theo từng giai đoạn (Phase.GENERATION, Phase.CRITIQUE).
+        usage (UsageTracker): Tổng token và chi phí của mọi lần chạy.
+        last_usage (UsageTracker | None): Token và chi phí của lần chạy gần nhất. Bị ghi đè bởi các lần chạy đồng thời;
+            khi agent được dùng chung giữa nhiều thread, đọc `utils.runs.last_run()` ngay sau `run`.
     """
-    def __init__(self, model:str = "llama-3.1-8b-instant"):
-        self.client = Groq()
+    def __init__(
+            self,
+            model:str = "llama-3.1-8b-instant",
+            router: ModelRouter | None = None,
+            client=None,
+            budget: TokenBudget | None = None,
+            generation: GenerationConfig | dict[str, GenerationConfig] | None = None,
+    ):
+        # client: bất kỳ client nào có `chat.completions.create` (vd. MultiBackendClient). Mặc định là client Groq dùng chung.
+        self.client = client or default_client()
         self.model = model
+        self.router = router or ModelRouter(model)
+        self.budget = budget
+        self.generation_config = generation
+        self.usage = UsageTracker("ReflectionAgent")
+        self.last_usage: UsageTracker | None = None
 
     def _request_completion(
             self,
             history: list,
             verbose: int = 0,
             log_title: str = "****************COMPLETION****************",
-            log_color: str = ""
+            log_color: str = "",
+            phase: str = Phase.GENERATION,
     ) -> str:
         """
         Một phương thưc private để request Groq model tạo ra một completion
@@ -76,12 +106,15 @@ class ReflectionAgent:
             + verbose (int, optional): Mức độ chi tiết của log, dùng để kiểm soát việc in thông tin ra màn hình. Mặc định là 0.
             + log_title (str, optional): Tiêu đề của log. Default là "COMPLETION".
             + log_color (str, optional): Màu sắc hiển thị log. Mặc định là None "".
+            + phase (str, optional): Giai đoạn dùng để chọn mô hình qua router. Mặc định là Phase.GENERATION.
 
         Returns:
             + str: Response do model sinh ra. 
         """
 
-        output = completions_create(client=self.client, messages=history, model=self.model)
+        output = self.router.complete(
+            self.client, history, phase, generation_for(self.generation_config, phase)
+        )
 
         #print("OUPUT: ", output)
 
@@ -111,6 +144,7 @@ class ReflectionAgent:
             verbose=verbose,
             log_title="****************GENERATION****************",
             log_color=Fore.CYAN,
+            phase=Phase.GENERATION,
         )
     
 
@@ -133,7 +167,8 @@ class ReflectionAgent:
             history=reflection_history,
             verbose=verbose,
             log_title= "****************REFLECTION****************",
-            log_color=Fore.GREEN
+            log_color=Fore.GREEN,
+            phase=Phase.CRITIQUE,
         )
     
 
@@ -143,7 +178,8 @@ class ReflectionAgent:
             generation_system_prompt: str="",
             reflection_system_prompt: str="",
             n_steps: int=10,
-            verbose: int=0
+            verbose: int=0,
+            deadline: float | Deadline | None = None,
     ) -> str:
         """
         Chạy ReflectionAgent trong nhiều bước, luân phiên giữa việc tạo phản hồi và phản chiếu (đánh giá) phản hồi đó trong số bước được chỉ định.
@@ -154,9 +190,10 @@ class ReflectionAgent:
             + reflection_system_prompt (str, optional): Prompt hệ thống dùng để hướng dẫn quá trình phản tư/đánh giá.
             + n_steps (int, optional): Số vòng luân phiên của quá trình Agent tạo và phản tư. 
             + verbose (int, optional): Mức độ chi tiết của log, thông tin in ra màn hình. Mặc định là 0.
+            + deadline (float | Deadline | None, optional): Ngân sách thời gian (giây) hoặc một Deadline tuyệt đối.
         
         Returns:
-            + str: Response cuối cùng được tạo ra sau tất cả các vòng lặp.
+            + str: Response cuối cùng được tạo ra sau tất cả các vòng lặp. Nếu hết thời gian hoặc vượt `budget`, trả về bản generation gần nhất.
         """
         # Nhằm kết hợp prompt base và prompt từ người dùng. Nếu user không truyền thì mặc định sử dụng prompt base
         generation_system_prompt += BASE_GENERATION_SYSTEM_PROMPT   
@@ -177,29 +214,42 @@ class ReflectionAgent:
             total_length=3
         )
         
-        for step in range(n_steps):
-            if verbose > 0:
-                # Theo dõi vòng lặp
-                fancy_step_tracker(step=step, total_steps=n_steps)
-
-            generation = self.generation(generation_history=generation_history, verbose=verbose)
-
-            update_chat_history(history=generation_history, msg=generation, role="assistant")
-            update_chat_history(history=reflection_history, msg=generation, role="user")
-
-            critique = self.reflection(reflection_history=reflection_history, verbose=verbose)
-
-            if "<OK>" in critique:
-                # Nếu không có sư thay đổi, bổ sung, dừng loop
-                print(
-                    Fore.MAGENTA,
-                    "\n\nĐã tìm thấy trình tự dừng. Dừng vòng lắp ... \n\n",
-                )
-                break
-
-            update_chat_history(history=generation_history, msg=critique, role="user")
-            update_chat_history(history=reflection_history, msg=critique, role="assistant")
-
+        generation = ""
+        run_usage = self.last_usage = UsageTracker("ReflectionAgent", self.budget)
+        report = RunReport(run_usage)
+        with usage_scope(self.usage), usage_scope(run_usage):
+            with deadline_scope(deadline):
+                try:
+                    for step in range(n_steps):
+                        set_round(step)
+                        if verbose > 0:
+                            # Theo dõi vòng lặp
+                            fancy_step_tracker(step=step, total_steps=n_steps)
+
+                        generation = self.generation(generation_history=generation_history, verbose=verbose)
+
+                        update_chat_history(history=generation_history, msg=generation, role="assistant")
+                        update_chat_history(history=reflection_history, msg=generation, role="user")
+
+                        critique = self.reflection(reflection_history=reflection_history, verbose=verbose)
+
+                        if "<OK>" in critique:
+                            # Nếu không có sư thay đổi, bổ sung, dừng loop
+                            print(
+                                Fore.MAGENTA,
+                                "\n\nĐã tìm thấy trình tự dừng. Dừng vòng lắp ... \n\n",
+                            )
+                            break
+
+                        update_chat_history(history=generation_history, msg=critique, role="user")
+                        update_chat_history(history=reflection_history, msg=critique, role="assistant")
+                except (DeadlineExceeded, BudgetExceeded) as exc:
+                    # Hết thời gian / ngân sách: bản generation gần nhất là câu trả lời tốt nhất hiện có
+                    print(Fore.YELLOW, f"\n\n{exc}, returning the latest generation\n\n")
+                    report.partial = True
+
+        # Báo cáo riêng của lần chạy này, không bị các lần chạy đồng thời ghi đè (xem `last_run`)
+        report_run(report)
         return generation
 
 
@@ -0,0 +1,400 @@
+import contextvars
+import json
+import math
+import time
+from http import HTTPStatus
+
+from ..multi_agent_pattern.crew import Crew
+from ..planning_pattern.react_agent import ReactAgent
+from ..reflection_pattern.reflection_agent import ReflectionAgent
+from ..tool_pattern.tool_agent import ToolAgent
+from ..utils.runs import RunReport
+from ..utils.runs import run_with_report
+from ..utils.sessions import SessionStore
+
+
+class HTTPError(Exception):
+    """An error answered to the client with the given HTTP status."""
+
+    def __init__(self, status: int, message: str, headers: dict | None = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+class AgentServer:
+    """
+    An asyncio HTTP/1.1 server exposing agents and crews as JSON endpoints.
+
+    Endpoints are created once and shared by every request, so their LLM client, model router
+    statistics, semantic cache and session store are reused across users. Agent runs are blocking,
+    so they execute in a thread pool of `max_concurrency` workers; requests beyond that wait in a
+    FIFO queue of at most `max_queue` entries and are rejected with 503 (and `Retry-After`) when
+    the queue is full or when they waited longer than `queue_timeout`.
+
+    Routes:
+        GET  /health           Queue and worker occupancy.
+        GET  /endpoints        The configured endpoints and their kind.
+        POST /endpoints/<name> Runs an endpoint. The JSON body holds `message` (agents), optional
+                               `session_id` (ToolAgent, ReactAgent), `deadline` in seconds,
+                               `max_rounds` (ReactAgent), `n_steps` and the system prompts
+                               (ReflectionAgent). Agents answer their `output`, whether it is
+                               `partial` and its `usage` (see `RunReport`). With `"stream": true`
+                               the response is a chunked stream of JSON lines (`queued`, `started`,
+                               `result` or `error` events); crews also send one `agent` event per
+                               agent as soon as it completes (see `AgentEvent`).
+
+    Crews are rebuilt from their spec for every request (see `Crew.to_spec`), so concurrent runs
+    of the same crew do not share the agents' context.
+
+    Attributes:
+        endpoints (dict): The agents (ToolAgent, ReactAgent, ReflectionAgent) and crew specs, by name.
+        host (str): The interface to listen on.
+        port (int): The port to listen on (0 picks a free port, see `port` after `start`).
+        max_concurrency (int): Maximum number of runs executing at the same time.
+        max_queue (int): Maximum number of requests waiting for a free worker.
+        queue_timeout (float | None): Maximum seconds a request may wait in the queue.
+        default_deadline (float | None): Deadline applied to runs whose request sets none.
+        session_store (SessionStore): Session store given to the agents that do not have one.
+        crew_executor (CrewExecutor): Executor used for crew endpoints.
+    """
+
+    MAX_BODY_BYTES = 1 << 20
+
+    def __init__(
+        self,
+        endpoints: dict,
+        host: str = "127.0.0.1",
+        port: int = 8000,
+        max_concurrency: int = 8,
+        max_queue: int = 64,
+        queue_timeout: float | None = 30.0,
+        default_deadline: float | None = None,
+        session_store: SessionStore | None = None,
+        crew_executor: "CrewExecutor | None" = None,
+    ):
+        self.host = host
+        self.port = port
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.default_deadline = default_deadline
+        self.session_store = session_store or SessionStore()
+        if crew_executor is None:
+            # executor kéo theo multiprocessing; chỉ import khi không được truyền vào
+            from ..multi_agent_pattern.executor import CrewExecutor
+
+            crew_executor = CrewExecutor(mode="thread")
+        self.crew_executor = crew_executor
+
+        self.endpoints = {}
+        for name, endpoint in endpoints.items():
+            if isinstance(endpoint, Crew):
+                endpoint = endpoint.to_spec()
+            elif isinstance(endpoint, (ToolAgent, ReactAgent)) and endpoint.session_store is None:
+                endpoint.session_store = self.session_store
+            elif not isinstance(endpoint, (dict, ReflectionAgent)):
+                raise TypeError(f"Unsupported endpoint {name!r}: {type(endpoint).__name__}")
+            self.endpoints[name] = endpoint
+
+        # asyncio và concurrent.futures chỉ được import khi dùng, để giữ thời gian import của package thấp
+        from concurrent.futures import ThreadPoolExecutor
+
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="agent-server")
+        self._slots: "asyncio.Semaphore | None" = None
+        self._server: "asyncio.Server | None" = None
+        self._running = 0
+        self._waiting = 0
+
+    @staticmethod
+    def _kind(endpoint) -> str:
+        return "crew" if isinstance(endpoint, dict) else type(endpoint).__name__
+
+    async def start(self) -> None:
+        """Starts listening; the actual port is stored in `port`."""
+        import asyncio
+
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        """Starts the server if needed and serves until cancelled."""
+        if self._server is None:
+            await self.start()
+        print(f"Serving {list(self.endpoints)} on http://{self.host}:{self.port}")
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        """Stops accepting connections and waits for the running agents to finish."""
+        import asyncio
+
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await asyncio.to_thread(self._pool.shutdown)
+
+    # ------------------------------------------------------------------ HTTP
+
+    async def _handle_connection(self, reader: "asyncio.StreamReader", writer: "asyncio.StreamWriter"):
+        import asyncio
+
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    await self._dispatch(method, path, body, writer)
+                except HTTPError as exc:
+                    await self._send_json(writer, exc.status, {"error": exc.message}, exc.headers)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except HTTPError as exc:   # Request không đọc được: trả lỗi rồi đóng kết nối
+            await self._send_json(writer, exc.status, {"error": exc.message})
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: "asyncio.StreamReader"):
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+        try:
+            method, target, _ = request_line.decode("latin-1").split()
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line") from None
+
+        headers = {}
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length header")
+        if length > self.MAX_BODY_BYTES:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target.split("?", 1)[0], headers, body
+
+    async def _send_json(self, writer, status: int, payload: dict, headers: dict | None = None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = self._status_line(status, {
+            "Content-Type": "application/json; charset=utf-8",
+            "Content-Length": str(len(body)),
+            **(headers or {}),
+        })
+        writer.write(head + body)
+        await writer.drain()
+
+    @staticmethod
+    def _status_line(status: int, headers: dict) -> bytes:
+        lines = [f"HTTP/1.1 {int(status)} {HTTPStatus(status).phrase}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    async def _send_event(self, writer, event: dict) -> None:
+        data = (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+        writer.write(f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n")
+        await writer.drain()
+
+    async def _dispatch(self, method: str, path: str, body: bytes, writer) -> None:
+        parts = [part for part in path.split("/") if part]
+
+        if method == "GET" and parts == ["health"]:
+            await self._send_json(writer, HTTPStatus.OK, {
+                "status": "ok",
+                "running": self._running,
+                "queued": self._waiting,
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+            })
+        elif method == "GET" and parts == ["endpoints"]:
+            await self._send_json(writer, HTTPStatus.OK, {
+                name: self._kind(endpoint) for name, endpoint in self.endpoints.items()
+            })
+        elif len(parts) == 2 and parts[0] == "endpoints":
+            if method != "POST":
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Use POST to run an endpoint")
+            if parts[1] not in self.endpoints:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown endpoint {parts[1]!r}")
+            try:
+                payload = json.loads(body or b"{}")
+            except ValueError:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "The body must be a JSON object") from None
+            if not isinstance(payload, dict):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "The body must be a JSON object")
+            await self._run_endpoint(self.endpoints[parts[1]], payload, writer)
+        else:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No route for {method} {path}")
+
+    # ------------------------------------------------------------ execution
+
+    def _deadline(self, payload: dict) -> float | None:
+        """Returns the deadline of a request, in seconds, or raises 400 if it is not a positive number."""
+        deadline = payload.get("deadline")
+        if deadline is None:
+            return self.default_deadline
+        if isinstance(deadline, bool) or not isinstance(deadline, (int, float)) or not math.isfinite(deadline) or deadline <= 0:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "'deadline' must be a positive number of seconds")
+        return deadline
+
+    @staticmethod
+    def _positive_int(payload: dict, key: str) -> int:
+        """Returns `payload[key]`, or raises 400 if it is not a positive integer."""
+        value = payload[key]
+        if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"{key!r} must be a positive integer")
+        return value
+
+    def _make_call(self, endpoint, payload: dict):
+        """Validates the payload and returns the blocking call that runs the endpoint."""
+        deadline = self._deadline(payload)
+
+        if isinstance(endpoint, dict):
+            return lambda: self._run_crew(endpoint, deadline)
+
+        message = payload.get("message")
+        if not isinstance(message, str):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "'message' must be a string")
+
+        if isinstance(endpoint, ReflectionAgent):
+            kwargs = {}
+            for key in ("generation_system_prompt", "reflection_system_prompt"):
+                if key in payload:
+                    if not isinstance(payload[key], str):
+                        raise HTTPError(HTTPStatus.BAD_REQUEST, f"{key!r} must be a string")
+                    kwargs[key] = payload[key]
+            if "n_steps" in payload:
+                kwargs["n_steps"] = self._positive_int(payload, "n_steps")
+            return lambda: self._agent_result(*run_with_report(endpoint.run, message, deadline=deadline, **kwargs))
+
+        session_id = payload.get("session_id")
+        if session_id is not None and not isinstance(session_id, str):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "'session_id' must be a string")
+        kwargs = {"deadline": deadline, "session_id": session_id}
+        if isinstance(endpoint, ReactAgent) and "max_rounds" in payload:
+            kwargs["max_rounds"] = self._positive_int(payload, "max_rounds")
+        return lambda: self._agent_result(*run_with_report(endpoint.run, message, **kwargs))
+
+    @staticmethod
+    def _agent_result(output: str, report: RunReport | None) -> dict:
+        # Agent được dùng chung giữa các request: báo cáo của chính lần chạy này, không đọc từ thuộc tính của agent
+        return {"output": output, **(report.to_dict() if report is not None else {})}
+
+    def _run_crew(self, spec: dict, deadline: float | None) -> dict:
+        # Tạo crew mới cho mỗi request để các lần chạy song song không dùng chung context
+        events = list(Crew.from_spec(spec).stream(self.crew_executor, deadline))
+        return {
+            "outputs": {event.agent: event.output for event in events if event.output is not None},
+            "agents": [event.to_dict() for event in events],
+        }
+
+    async def _stream_crew(self, spec: dict, deadline: float | None, writer) -> dict:
+        """Runs a crew (the slot is already acquired), sending an `agent` event as each agent completes."""
+        import asyncio
+
+        self._running += 1
+        outputs = {}
+        try:
+            # Dựng crew (resolve tool, tạo client) và chạy nó trong pool của server, không trên event loop
+            crew = await asyncio.get_running_loop().run_in_executor(self._pool, Crew.from_spec, spec)
+            async for event in crew.astream(self.crew_executor, deadline, thread_pool=self._pool):
+                await self._send_event(writer, {"event": "agent", **event.to_dict()})
+                if event.output is not None:
+                    outputs[event.agent] = event.output
+        finally:
+            self._running -= 1
+            self._slots.release()
+        return {"outputs": outputs}
+
+    async def _acquire_slot(self) -> None:
+        """Admission control: waits for a free worker, or raises 503 if the queue is full or too slow."""
+        import asyncio
+
+        if self._waiting >= self.max_queue:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Server busy", {"Retry-After": "1"})
+
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except TimeoutError:
+            raise HTTPError(
+                HTTPStatus.SERVICE_UNAVAILABLE, "Timed out waiting for a worker", {"Retry-After": "1"}
+            ) from None
+        finally:
+            self._waiting -= 1
+
+    async def _execute(self, call) -> dict:
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        self._running += 1
+        try:
+            return await loop.run_in_executor(self._pool, contextvars.copy_context().run, call)
+        finally:
+            self._running -= 1
+            self._slots.release()
+
+    async def _run_endpoint(self, endpoint, payload: dict, writer) -> None:
+        call = self._make_call(endpoint, payload)
+
+        if not payload.get("stream"):
+            await self._acquire_slot()
+            try:
+                result = await self._execute(call)
+            except Exception as exc:
+                raise HTTPError(HTTPStatus.INTERNAL_SERVER_ERROR, f"{type(exc).__name__}: {exc}") from exc
+            await self._send_json(writer, HTTPStatus.OK, result)
+            return
+
+        writer.write(self._status_line(HTTPStatus.OK, {
+            "Content-Type": "application/x-ndjson; charset=utf-8",
+            "Transfer-Encoding": "chunked",
+        }))
+        await self._send_event(writer, {"event": "queued", "position": self._waiting})
+        started = time.perf_counter()
+        try:
+            await self._acquire_slot()
+            await self._send_event(writer, {"event": "started", "queued_s": time.perf_counter() - started})
+            if isinstance(endpoint, dict):
+                result = await self._stream_crew(endpoint, self._deadline(payload), writer)
+            else:
+                result = await self._execute(call)
+            await self._send_event(writer, {
+                "event": "result", "elapsed_s": time.perf_counter() - started, **result
+            })
+        except HTTPError as exc:
+            await self._send_event(writer, {"event": "error", "status": int(exc.status), "error": exc.message})
+        except Exception as exc:
+            await self._send_event(writer, {"event": "error", "status": 500, "error": f"{type(exc).__name__}: {exc}"})
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+
+def serve(endpoints: dict, host: str = "127.0.0.1", port: int = 8000, **kwargs) -> None:
+    """
+    Serves agents and crews over HTTP until interrupted (see `AgentServer`).
+
+    Args:
+        endpoints (dict): The agents and crews to expose, keyed by endpoint name.
+        host (str, optional): The interface to listen on.
+        port (int, optional): The port to listen on.
+        **kwargs: Other `AgentServer` options (max_concurrency, max_queue, queue_timeout...).
+    """
+    import asyncio
+
+    server = AgentServer(endpoints, host=host, port=port, **kwargs)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,257 @@
+import contextvars
+import json
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+import weakref
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from .tool import tool
+
+
+@dataclass
+class ObservationPolicy:
+    """
+    Size limits applied to tool results before they are added to the chat history.
+
+    Attributes:
+        max_bytes (int): Results whose UTF-8 rendering is larger than this are truncated.
+        max_tokens (int | None): Optional token cap, converted to bytes at ~4 bytes per token.
+            The smaller of the two caps applies.
+        head_fraction (float): Share of the kept bytes taken from the start of the result; the
+            rest comes from its end.
+        spill_dir (str | None): Directory where full results are spilled. None uses a temporary
+            directory created on first spill.
+    """
+
+    max_bytes: int = 4000
+    max_tokens: int | None = None
+    head_fraction: float = 0.7
+    spill_dir: str | None = None
+
+    @property
+    def limit(self) -> int:
+        if self.max_tokens is None:
+            return self.max_bytes
+        return min(self.max_bytes, self.max_tokens * 4)
+
+
+# Handle của các kết quả bị spill trong lần chạy agent hiện tại (xem `ObservationStore.run_scope`)
+_run_spills: contextvars.ContextVar[list | None] = contextvars.ContextVar("run_spills", default=None)
+
+
+def render(result) -> str:
+    """
+    Renders a tool result as text: strings as-is, JSON when possible, `str()` otherwise.
+
+    Args:
+        result: The tool result.
+
+    Returns:
+        str: The text sent to the model.
+    """
+    if isinstance(result, str):
+        return result
+    try:
+        return json.dumps(result, ensure_ascii=False, default=str)
+    except (TypeError, ValueError):
+        return str(result)
+
+
+def results_text(observations: dict) -> str:
+    """
+    Joins the results of the tool calls that succeeded as text, e.g. to return them to the user as
+    a partial answer. Rejected or failed calls ("Error: ..." observations) are left out.
+
+    Args:
+        observations (dict): Tool results keyed by tool call id.
+
+    Returns:
+        str: The rendered results, separated by blank lines.
+    """
+    return "\n\n".join(
+        text for text in map(render, observations.values()) if not text.startswith("Error:")
+    )
+
+
+def summarize(result) -> str:
+    """
+    Describes the shape of a tool result in one line, e.g. "list of 20000 dict (keys: id, name)".
+
+    Args:
+        result: The tool result.
+
+    Returns:
+        str: The structured summary.
+    """
+    if isinstance(result, str):
+        return f"str of {len(result)} chars, {result.count(chr(10)) + 1} lines"
+    if isinstance(result, dict):
+        keys = ", ".join(map(str, list(result)[:10]))
+        return f"dict with {len(result)} keys ({keys}{', ...' if len(result) > 10 else ''})"
+    if isinstance(result, (list, tuple)):
+        if not result:
+            return f"empty {type(result).__name__}"
+        first = result[0]
+        item = type(first).__name__
+        if isinstance(first, dict):
+            item += f" (keys: {', '.join(map(str, list(first)[:10]))})"
+        return f"{type(result).__name__} of {len(result)} {item}"
+    return type(result).__name__
+
+
+class ObservationStore:
+    """
+    Bounds tool results and spills the oversized ones to local files referenced by handle.
+
+    A large result is replaced in the observation by its structured summary, its head and its
+    tail, and a handle. The model can then fetch only the slices it needs with the paging tool
+    returned by `paging_tool`. Agents that cannot page (no further round, or no paging tool)
+    use `spill=False`: large results are then only truncated, and nothing is written to disk.
+
+    Spilled files live until the end of the agent run that produced them (see `run_scope`), or
+    until `clear`; a temporary spill directory is also removed when the store is garbage
+    collected or at interpreter exit.
+
+    Attributes:
+        policy (ObservationPolicy): The size limits.
+        spill (bool): Whether full results are spilled to files that the paging tool can read.
+        paging_tool (Tool): The `read_observation(handle, offset, length)` tool.
+    """
+
+    def __init__(self, policy: ObservationPolicy | None = None, spill: bool = True):
+        self.policy = policy or ObservationPolicy()
+        self.spill = spill
+        self._spill_dir = self.policy.spill_dir
+        self._owns_dir = False
+        self._paths: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.paging_tool = self._make_paging_tool()
+
+    def _path(self, handle: str) -> str:
+        with self._lock:
+            if self._spill_dir is None:
+                self._spill_dir = tempfile.mkdtemp(prefix="agentic-observations-")
+                self._owns_dir = True
+                # Xoá thư mục tạm khi store bị thu hồi hoặc khi interpreter thoát
+                weakref.finalize(self, shutil.rmtree, self._spill_dir, ignore_errors=True)
+            os.makedirs(self._spill_dir, exist_ok=True)
+            path = self._paths[handle] = os.path.join(self._spill_dir, f"{handle}.txt")
+        return path
+
+    def bound(self, result):
+        """
+        Applies the policy to one tool result.
+
+        Args:
+            result: The raw tool result.
+
+        Returns:
+            The result unchanged if it fits within the limit, otherwise a truncated text that
+            references the spilled full result by handle (if `spill`).
+        """
+        text = render(result)
+        data = text.encode("utf-8")
+        limit = self.policy.limit
+        if len(data) <= limit:
+            return result
+
+        head_size = int(limit * self.policy.head_fraction)
+        tail_size = limit - head_size
+        head = data[:head_size].decode("utf-8", errors="ignore")
+        tail = data[len(data) - tail_size :].decode("utf-8", errors="ignore") if tail_size else ""
+        omitted = len(data) - head_size - tail_size
+
+        if not self.spill:
+            return (
+                f"[truncated observation size={len(data)} bytes; {summarize(result)}]\n"
+                f"{head}\n... [{omitted} bytes omitted] ...\n{tail}"
+            )
+
+        handle = f"obs-{uuid.uuid4().hex[:12]}"
+        with open(self._path(handle), "wb") as f:
+            f.write(data)
+        spills = _run_spills.get()
+        if spills is not None:
+            spills.append(handle)
+
+        return (
+            f"[truncated observation handle={handle} size={len(data)} bytes; {summarize(result)}]\n"
+            f"{head}\n... [{omitted} bytes omitted] ...\n{tail}\n"
+            f'[call read_observation(handle="{handle}", offset=<byte offset>, length=<bytes>) '
+            f"to read other parts]"
+        )
+
+    def read(self, handle: str, offset: int = 0, length: int | None = None) -> str:
+        """
+        Reads a slice of a spilled result.
+
+        Args:
+            handle (str): The handle given in the truncated observation.
+            offset (int, optional): Byte offset to start reading at.
+            length (int | None, optional): Number of bytes to read, capped to the policy limit.
+
+        Returns:
+            str: The requested slice, or an error message for an unknown handle.
+        """
+        path = self._paths.get(handle)
+        if path is None:
+            return f"Unknown observation handle: {handle}"
+
+        length = min(length or self.policy.limit, self.policy.limit)
+        with open(path, "rb") as f:
+            f.seek(max(offset, 0))
+            return f.read(length).decode("utf-8", errors="ignore")
+
+    def _make_paging_tool(self):
+        store = self
+
+        def read_observation(handle: str, offset: int, length: int) -> str:
+            """
+            Reads `length` bytes starting at byte `offset` of a truncated tool observation,
+            identified by the handle shown in it.
+            """
+            return store.read(handle, offset, length)
+
+        return tool(read_observation)
+
+    @contextmanager
+    def run_scope(self):
+        """
+        Scopes spilled files to one agent run: the files spilled inside the block are deleted when
+        it exits. Concurrent runs sharing the store only delete their own files.
+        """
+        handles: list[str] = []
+        token = _run_spills.set(handles)
+        try:
+            yield
+        finally:
+            _run_spills.reset(token)
+            self.discard(handles)
+
+    def discard(self, handles: list[str]) -> None:
+        """
+        Deletes the files of the given spilled results; their handles become unknown.
+
+        Args:
+            handles (list[str]): Handles given in truncated observations.
+        """
+        with self._lock:
+            paths = [self._paths.pop(handle) for handle in handles if handle in self._paths]
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def clear(self) -> None:
+        """Deletes every spilled file (and the temporary directory, if the store created it)."""
+        with self._lock:
+            paths, self._paths = list(self._paths.values()), {}
+            for path in paths:
+                if os.path.exists(path):
+                    os.remove(path)
+            if self._owns_dir and self._spill_dir:
+                shutil.rmtree(self._spill_dir, ignore_errors=True)
+                self._spill_dir, self._owns_dir = None, False
@@ -0,0 +1,212 @@
+import multiprocessing
+import os
+import threading
+import time
+
+from ..utils.deadlines import DeadlineExceeded
+from ..utils.deadlines import current_deadline
+
+
+class ToolTimeoutError(TimeoutError):
+    """Raised when a tool running in the process pool exceeds its timeout."""
+
+
+class ToolCrashedError(RuntimeError):
+    """Raised when the worker process running a tool dies (segfault, OOM kill, os._exit...)."""
+
+
+_resolved_tools: dict = {}
+
+
+def _call_tool(reference: str, kwargs: dict):
+    """Runs inside a worker: resolves the tool once per worker, then calls its function."""
+    fn = _resolved_tools.get(reference)
+    if fn is None:
+        from .tool import resolve_tool
+
+        fn = _resolved_tools[reference] = resolve_tool(reference).fn
+    return fn(**kwargs)
+
+
+def _worker_main(conn) -> None:
+    """Main loop of a worker process: runs the tool calls received on `conn` one at a time."""
+    while True:
+        try:
+            reference, kwargs = conn.recv()
+        except EOFError:
+            return
+        try:
+            reply = (True, _call_tool(reference, kwargs))
+        except BaseException as exc:
+            reply = (False, exc)
+        try:
+            conn.send(reply)
+        except Exception as exc:
+            # Kết quả hoặc exception không pickle được
+            conn.send((False, RuntimeError(f"Tool {reference} returned an unpicklable value: {exc!r}")))
+
+
+class _Worker:
+    """A warm worker process, and the parent end of its pipe."""
+
+    def __init__(self):
+        self.conn, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_worker_main, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join(timeout=1)
+        self.conn.close()
+
+
+class ProcessPool:
+    """
+    A pool of warm worker processes that run one tool call at a time each.
+
+    Unlike `ProcessPoolExecutor`, every call knows which worker runs it: a call that times out
+    only kills its own worker, and calls running in the other workers are not affected.
+
+    Attributes:
+        max_workers (int): Maximum number of worker processes.
+    """
+
+    def __init__(self, max_workers: int | None = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+        self._idle: list[_Worker] = []
+        self._lock = threading.Lock()
+
+    def _acquire(self, timeout: float | None) -> _Worker | None:
+        if not self._slots.acquire(timeout=timeout):
+            return None
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        try:
+            return _Worker()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, worker: _Worker, healthy: bool) -> None:
+        if healthy:
+            with self._lock:
+                self._idle.append(worker)
+        else:
+            worker.kill()
+        self._slots.release()
+
+    def call(self, reference: str, kwargs: dict, timeout: float | None = None):
+        """
+        Runs a tool in a worker of the pool.
+
+        Args:
+            reference (str): The tool reference produced by `tool_reference`.
+            kwargs (dict): Keyword arguments of the tool.
+            timeout (float | None, optional): Maximum seconds to wait, including the wait for a free worker.
+
+        Returns:
+            The result of the tool.
+
+        Raises:
+            ToolTimeoutError: If the tool does not return within `timeout`. Its worker is killed.
+            ToolCrashedError: If the worker process dies while running the tool.
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+        worker = self._acquire(timeout)
+        if worker is None:
+            raise ToolTimeoutError(f"No free worker to run tool {reference}")
+
+        healthy = False
+        try:
+            try:
+                worker.conn.send((reference, kwargs))
+                remaining = None if end is None else max(0.0, end - time.monotonic())
+                ready = worker.conn.poll(remaining)
+                if ready:
+                    ok, value = worker.conn.recv()
+            except (EOFError, OSError) as exc:
+                raise ToolCrashedError(f"The worker running tool {reference} crashed") from exc
+            if not ready:
+                raise ToolTimeoutError(f"Tool {reference} timed out after {timeout}s")
+            healthy = True
+        finally:
+            # Chỉ worker đang kẹt (hoặc đã chết) bị dừng; các worker khác tiếp tục chạy
+            self._release(worker, healthy)
+
+        if not ok:
+            raise value
+        return value
+
+    def shutdown(self) -> None:
+        """Stops the idle workers. Workers running a call are stopped when the call returns."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.kill()
+
+
+_pool: ProcessPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPool:
+    """
+    Returns the process pool shared by all process-executed tools, starting it on first use.
+
+    The pool stays warm between tool calls, so workers only pay the interpreter startup and
+    the tool module import once.
+
+    Returns:
+        ProcessPool: The shared pool, with at most one worker per CPU.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPool()
+        return _pool
+
+
+def shutdown_process_pool() -> None:
+    """Shuts the shared pool down; the next process-executed tool call starts a new one."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+def run_in_process(reference: str, kwargs: dict, timeout: float | None = None):
+    """
+    Runs a tool in the shared process pool.
+
+    Only the tool reference and its (already validated) arguments are sent to the worker, and
+    only the result comes back: the function itself is never pickled.
+
+    Args:
+        reference (str): The tool reference produced by `tool_reference`.
+        kwargs (dict): Keyword arguments of the tool.
+        timeout (float | None, optional): Maximum seconds to wait for the tool. It is shortened
+            to the time left before the current deadline, if any.
+
+    Returns:
+        The result of the tool.
+
+    Raises:
+        ToolTimeoutError: If the tool runs longer than `timeout`. Only its own worker is terminated.
+        DeadlineExceeded: If the deadline of the current run passes first.
+        ToolCrashedError: If the worker process dies while running the tool.
+    """
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.check()
+        timeout = deadline.remaining() if timeout is None else min(timeout, deadline.remaining())
+
+    try:
+        return get_process_pool().call(reference, kwargs, timeout)
+    except ToolTimeoutError:
+        if deadline is not None and deadline.expired:
+            raise DeadlineExceeded("Deadline exceeded while running a tool") from None
+        raise
@@ -1,6 +1,23 @@
+import importlib
 import json
+from functools import cached_property
 from typing import Callable
 
+from ..utils.aio import run_sync
+from ..utils.deadlines import DeadlineExceeded
+from ..utils.deadlines import current_deadline
+from ..utils.deadlines import run_with_deadline
+
+# Kiểu Python trong chữ ký -> kiểu JSON Schema dùng cho function calling gốc của provider
+JSON_SCHEMA_TYPES = {
+    "int": "integer",
+    "float": "number",
+    "str": "string",
+    "bool": "boolean",
+    "list": "array",
+    "dict": "object",
+}
+
 
 def get_fn_signature(fn: Callable) -> dict:
     """
@@ -54,13 +71,24 @@ def validate_arguments(tool_call: dict, tool_signature: dict) -> dict:
         "str": str,
         "bool": bool,
         "float": float,
+        "list": list,
+        "dict": dict,
     }
 
     for arg_name, arg_value in tool_call["arguments"].items():
         expected_type = properties[arg_name].get("type")
+        expected = type_mapping[expected_type]
 
-        if not isinstance(arg_value, type_mapping[expected_type]):
-            tool_call["arguments"][arg_name] = type_mapping[expected_type](arg_value)
+        if isinstance(arg_value, expected):
+            continue
+        if expected in (list, dict):
+            # Model đôi khi gửi mảng / đối tượng dưới dạng chuỗi JSON; không ép kiểu giá trị khác
+            value = json.loads(arg_value) if isinstance(arg_value, str) else None
+            if not isinstance(value, expected):
+                raise ValueError(f"'{arg_name}' must be a JSON {JSON_SCHEMA_TYPES[expected_type]}")
+            tool_call["arguments"][arg_name] = value
+        else:
+            tool_call["arguments"][arg_name] = expected(arg_value)
 
     return tool_call
 
@@ -74,46 +102,200 @@ class Tool:
         name (str): The name of the tool (function).
         fn (Callable): The function that the tool represents. Chức năng mà công cụ đó thể hiện.
         fn_signature (str): JSON string representation of the function's signature. Chuỗi JSON biểu diễn chữ ký của hàm.
+        executor (str): Where the function runs: "inline" (in the agent's thread) or "process" (in a
+            warm process pool, for CPU-bound tools). Nơi hàm được thực thi.
+        timeout (float | None): Maximum seconds a "process" tool may run before its worker is killed.
+        is_async (bool): Whether `fn` is a coroutine function or an async generator function.
     """
 
-    def __init__(self, name: str, fn: Callable, fn_signature: str):
+    EXECUTORS = ("inline", "process")
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable,
+        fn_signature: str,
+        executor: str = "inline",
+        timeout: float | None = None,
+    ):
+        if executor not in self.EXECUTORS:
+            raise ValueError(f"Unknown executor {executor!r}, expected one of {self.EXECUTORS}")
+
         self.name = name
         self.fn = fn
         self.fn_signature = fn_signature
+        self.executor = executor
+        self.timeout = timeout
+        if executor == "process" and self.is_async:
+            raise ValueError("Async tools run on the event loop and cannot use the process executor")
 
     def __str__(self):
         return self.fn_signature
 
+    @cached_property
+    def is_async(self) -> bool:
+        # inspect và asyncio chỉ được import khi cần, để giữ thời gian import của package thấp
+        import inspect
+
+        return inspect.iscoroutinefunction(self.fn) or inspect.isasyncgenfunction(self.fn)
+
+    def schema(self) -> dict:
+        """
+        Describes the tool in the format of the provider's native `tools` parameter
+        (OpenAI-compatible function calling).
+
+        Returns:
+            dict: The function tool definition, with JSON Schema parameter types.
+        """
+        signature = json.loads(self.fn_signature)
+        properties = {
+            name: {"type": JSON_SCHEMA_TYPES.get(spec.get("type"), "string")}
+            for name, spec in signature["parameters"]["properties"].items()
+        }
+        return {
+            "type": "function",
+            "function": {
+                "name": self.name,
+                "description": (signature.get("description") or "").strip(),
+                "parameters": {
+                    "type": "object",
+                    "properties": properties,
+                    "required": list(properties),
+                },
+            },
+        }
+
     def run(self, **kwargs):
         """
         Executes the tool (function) with provided arguments.
 
+        If a deadline is active (see `deadline_scope`), the call is abandoned when it passes.
+        "process" tools run in the shared process pool (see `run_in_process`).
+
+        Args:
+            **kwargs: Keyword arguments passed to the function.
+
+        Returns:
+            The result of the function call.
+
+        Raises:
+            DeadlineExceeded: If the deadline of the current run passes before the tool returns.
+            ToolTimeoutError: If a "process" tool runs longer than its timeout.
+            ToolCrashedError: If the worker process running a "process" tool dies.
+        """
+        if self.is_async:
+            return run_sync(self.arun(**kwargs))
+        if self.executor == "process":
+            from .process_pool import run_in_process
+
+            return run_in_process(tool_reference(self), kwargs, self.timeout)
+        return run_with_deadline(self.fn, **kwargs)
+
+    async def arun(self, **kwargs):
+        """
+        Executes the tool from async code.
+
+        Coroutine functions are awaited and async generators are collected into a list, directly on
+        the event loop; synchronous tools run in a worker thread so they don't block it.
+
         Args:
             **kwargs: Keyword arguments passed to the function.
 
         Returns:
             The result of the function call.
+
+        Raises:
+            DeadlineExceeded: If the deadline of the current run passes before the tool returns.
         """
-        return self.fn(**kwargs)
+        import asyncio
+        import inspect
+
+        if not self.is_async:
+            return await asyncio.to_thread(self.run, **kwargs)
 
+        if inspect.isasyncgenfunction(self.fn):
+            awaitable = self._collect(self.fn(**kwargs))
+        else:
+            awaitable = self.fn(**kwargs)
 
-def tool(fn: Callable):
+        deadline = current_deadline()
+        if deadline is None:
+            return await awaitable
+
+        deadline.check()
+        try:
+            return await asyncio.wait_for(awaitable, timeout=deadline.remaining())
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded("Deadline exceeded while running a tool") from None
+
+    @staticmethod
+    async def _collect(agen) -> list:
+        return [item async for item in agen]
+
+
+def tool(fn: Callable | None = None, *, executor: str = "inline", timeout: float | None = None):
     """
     A decorator that wraps a function into a Tool object.
     Giúp bạn đỡ phải viết nhiều code
+
+    Can be used bare (`@tool`) or with an execution policy, e.g. `@tool(executor="process", timeout=30)`
+    for CPU-bound tools. Process-executed functions must be defined at module level.
+
     Args:
         fn (Callable): The function to be wrapped.
+        executor (str, optional): "inline" (default) or "process".
+        timeout (float | None, optional): Maximum seconds a "process" tool may run.
 
     Returns:
         Tool: A Tool object containing the function, its name, and its signature.
     """
 
-    def wrapper():
+    def wrapper(fn: Callable):
         fn_signature = get_fn_signature(fn)
         return Tool(
             name=str(fn_signature.get("name")),
             fn=fn,
-            fn_signature=json.dumps(fn_signature)
+            fn_signature=json.dumps(fn_signature),
+            executor=executor,
+            timeout=timeout,
         )
 
-    return wrapper()
\ No newline at end of file
+    return wrapper(fn) if fn is not None else wrapper
+
+
+def tool_reference(tool: Tool) -> str:
+    """
+    Builds an importable reference ("module:name") for a Tool so it can be
+    re-created in another process or on another host.
+
+    Args:
+        tool (Tool): The tool to reference. Its function must be defined at module level.
+
+    Returns:
+        str: The reference string, e.g. "my_tools:get_current_weather".
+    """
+    return f"{tool.fn.__module__}:{tool.fn.__qualname__}"
+
+
+def resolve_tool(reference: str) -> Tool:
+    """
+    Resolves a reference produced by `tool_reference` back into a Tool object.
+
+    Args:
+        reference (str): The "module:name" reference of the tool.
+
+    Returns:
+        Tool: The resolved tool. Plain functions are wrapped with the `tool` decorator.
+
+    Raises:
+        ValueError: If the reference is malformed.
+    """
+    module_name, _, attr_path = reference.partition(":")
+    if not module_name or not attr_path:
+        raise ValueError(f"Invalid tool reference: {reference!r}")
+
+    obj = importlib.import_module(module_name)
+    for attr in attr_path.split("."):
+        obj = getattr(obj, attr)
+
+    return obj if isinstance(obj, Tool) else tool(obj)
@@ -1,19 +1,34 @@
-import json
-import re
-
-from colorama import Fore
-from dotenv import load_dotenv
-from groq import Groq
-
-from src.agentic_patterns.tool_pattern.tool import Tool
-from src.agentic_patterns.tool_pattern.tool import validate_arguments
-from src.agentic_patterns.utils.completions import build_prompt_structure
-from src.agentic_patterns.utils.completions import ChatHistory
-from src.agentic_patterns.utils.completions import completions_create
-from src.agentic_patterns.utils.completions import update_chat_history
-from src.agentic_patterns.utils.extractions import extract_tag_content
-
-load_dotenv()
+from .observations import ObservationPolicy
+from .observations import ObservationStore
+from .observations import results_text
+from .tool import Tool
+from .tool_calls import native_tool_calls
+from .tool_calls import run_tool_calls
+from .tool_calls import tool_call_messages
+from .tool_index import ToolIndex
+from ..utils.completions import default_client
+from ..utils.completions import build_prompt_structure
+from ..utils.completions import ChatHistory
+from ..utils.completions import update_chat_history
+from ..utils.extractions import close_open_tags
+from ..utils.extractions import extract_tag_content
+from ..utils.deadlines import Deadline
+from ..utils.deadlines import DeadlineExceeded
+from ..utils.deadlines import deadline_scope
+from ..utils.logging import Fore
+from ..utils.routing import ModelRouter
+from ..utils.routing import GenerationConfig
+from ..utils.routing import Phase
+from ..utils.routing import generation_for
+from ..utils.runs import RunReport
+from ..utils.runs import report_run
+from ..utils.semantic_cache import SemanticCache
+from ..utils.semantic_cache import cache_namespace
+from ..utils.sessions import SessionStore
+from ..utils.usage import BudgetExceeded
+from ..utils.usage import TokenBudget
+from ..utils.usage import UsageTracker
+from ..utils.usage import usage_scope
 
 # TOOL_SYSTEM_PROMPT = """
 # You are a function calling AI model. You are provided with function signatures within <tools></tools> XML tags.You may call one or more functions to assist with the user query. Don't make assumptions about what values to plug
@@ -44,6 +59,8 @@ Với mỗi lần gọi hàm, hãy trả về một đối tượng JSON với t
 
 </tool_call>
 
+Nếu có thể trả lời trực tiếp mà không cần công cụ nào, hãy trả lời người dùng ngay và không tạo thẻ <tool_call>.
+
 Đây là các công cụ có sẵn:
 
 <tools>
@@ -58,113 +75,243 @@ class ToolAgent:
     Attributes:
         tools (Tool | list[Tool]): A list of tools available to the agent.
         model (str): The model to be used for generating tool calls and responses.
-        client (Groq): The Groq client used to interact with the language model.
+        client (Groq): The client used to interact with the language model: the shared Groq client by
+            default, or any client with a `chat.completions.create` method (e.g. MultiBackendClient).
         tools_dict (dict): A dictionary mapping tool names to their corresponding Tool objects.
+        router (ModelRouter): Chooses the model of the tool selection and final response phases.
+            Defaults to `model` for both.
+        tool_top_k (int | None): If set, only the signatures of the `tool_top_k` tools most relevant
+            to the user message (according to `tool_index`) are rendered in the system prompt.
+        tool_index (ToolIndex): Local BM25 index over the tools' names and docstrings.
+        cache (SemanticCache | None): Opt-in cache of final responses; a user message similar enough
+            to a cached one is answered without calling the model or any tool.
+        observation_store (ObservationStore | None): Truncates tool results larger than the
+            `observation_policy` limits before they are sent back to the model. ToolAgent makes a
+            single tool round, so the model cannot page through the full results: nothing is spilled.
+        session_store (SessionStore | None): Keeps conversations by session id, so that
+            `run(..., session_id=...)` continues a previous conversation.
+        native_tools (bool): If True, tools are passed through the provider's native function-calling
+            parameters (see `Tool.schema`) and the structured tool calls of the response are executed,
+            instead of embedding signatures in `TOOL_SYSTEM_PROMPT` and parsing <tool_call> tags.
+        budget (TokenBudget | None): Hard limits (tokens, calls, cost) of each `run`. Once exceeded,
+            the run stops and returns its best partial answer.
+        generation_config (GenerationConfig | dict[str, GenerationConfig] | None): Generation settings
+            (max_tokens, temperature, stop, seed...) for every phase, or keyed by phase
+            (Phase.TOOL_SELECTION, Phase.FINAL_RESPONSE). They override the router's settings.
+        usage (UsageTracker): Tokens and cost of all the runs of the agent.
+        last_usage (UsageTracker | None): Tokens and cost of the most recent run. Concurrent runs of a
+            shared agent overwrite it; read `utils.runs.last_run()` right after `run` instead.
     """
 
     def __init__(
             self,
             tools: Tool | list[Tool],
             model: str = "llama-3.3-70b-versatile",
+            router: ModelRouter | None = None,
+            tool_top_k: int | None = None,
+            cache: SemanticCache | None = None,
+            observation_policy: ObservationPolicy | None = None,
+            session_store: SessionStore | None = None,
+            native_tools: bool = False,
+            client=None,
+            budget: TokenBudget | None = None,
+            generation: GenerationConfig | dict[str, GenerationConfig] | None = None,
     ) -> None:
         
-        self.client = Groq()
+        self.client = client or default_client()
         self.model = model
+        self.router = router or ModelRouter(model)
         self.tools = tools if isinstance(tools, list) else [tools]  # Nếu không phải list thì chuyển thành list
         self.tools_dict = {tool.name: tool for tool in self.tools}
+        self.tool_top_k = tool_top_k
+        self.tool_index = ToolIndex(self.tools)
+        self.cache = cache
+        self.observation_store = ObservationStore(observation_policy, spill=False) if observation_policy else None
+        self.session_store = session_store
+        self.native_tools = native_tools
+        self.budget = budget
+        self.generation_config = generation
+        self.usage = UsageTracker("ToolAgent")
+        self.last_usage: UsageTracker | None = None
+
+    def _cache_namespace(self) -> str:
+        # Câu trả lời phụ thuộc vào model, công cụ và tham số sinh, không chỉ vào câu hỏi
+        return cache_namespace(
+            self.router.default, self.router.routes, self.generation_config,
+            [tool.fn_signature for tool in self.tools], self.native_tools,
+        )
+
+    def select_tools(self, query: str | None = None) -> list[Tool]:
+        """Selects the tools offered to the model.
+
+        Args:
+            query (str | None, optional): Text used to select the most relevant tools when `tool_top_k`
+                is set. If None, or if there are no more tools than `tool_top_k`, all tools are included.
+
+        Returns:
+            list[Tool]: The selected tools.
+        """
+        if query and self.tool_top_k and len(self.tools) > self.tool_top_k:
+            return self.tool_index.search(query, self.tool_top_k)
+        return self.tools
     
-    def add_tool_signatures(self)->str:
-        """Collects the function signatures of all available tools.
+    def add_tool_signatures(self, query: str | None = None)->str:
+        """Collects the function signatures of the available tools.
+
+        Args:
+            query (str | None, optional): Text used to select the tools (see `select_tools`).
 
         Returns:
-            str: A concatenated string of all tool function signatures in JSON format.
+            str: A concatenated string of the tool function signatures in JSON format.
         """
-        return "".join([tool.fn_signature for tool in self.tools])
+        return "".join([tool.fn_signature for tool in self.select_tools(query)])
     
-    def process_tool_calls(self, tool_calls_content: list) -> dict:
+    def process_tool_calls(self, tool_calls_content: list, ids: list | None = None) -> dict:
         """
         Processes each tool call, validates arguments, executes the tools, and collects results.
         Xử lý mỗi lần gọi tool, xử lý các tools và thu thập kết quả.
 
         Args:
-            tool_calls_content (list): List of strings, each representing a tool call in JSON format.
+            tool_calls_content (list): List of strings, each representing a tool call in JSON format
+                                       (or tool call dicts in native function-calling mode).
                                        Danh sách các strings, mỗi cái biểu diễn một tool call ở dạng JSON
+            ids (list | None, optional): The ids of the calls (see `prepare_tool_calls`).
 
         Returns:
             dict: A dictionary where the keys are tool call IDs and values are the results from the tools.
             dict: Một dict ở đó các key là những ID của tool call và các giá trị là kết quả từ tool
         """
-        observations = {} # KHởi tạo một dict
-        for tool_call_str in tool_calls_content:    # Vòng lặp qua danh sách gọi tool
-            tool_call = json.loads(tool_call_str)   # Đọc JSON để đưa về dict như Python
-            tool_name = tool_call["name"]           # Lấy tên của tool
-            tool = self.tools_dict[tool_name]       # Lấy instance Tool tương ứng với tên tool
-
-            print(Fore.GREEN + f"\nUsing Tool: {tool_name}")    # In ra xem đang dùng tool gì
-
-            # Validate and execute the tool call
-            # Validate arguments của tool call dựa trên tool signature (schema)
-
-            validated_tool_call = validate_arguments(
-                tool_call, json.loads(tool.fn_signature)
-            )
-            # In ra Tool dict
-            print(Fore.GREEN + f"\nTool call dict: \n{validated_tool_call}")
-
-            result = tool.run(**validated_tool_call["arguments"])   # Giải nén để lấy tham số truyền vào phương thức run
-            print(Fore.GREEN + f"\nTool result: \n{result}")
-
-            # Store the result using the tool call ID
-            observations[validated_tool_call["id"]] = result 
-
-        return observations
+        return run_tool_calls(self.tools_dict, tool_calls_content, self.observation_store, ids)
 
     def run(
         self,
         user_msg: str,
+        deadline: float | Deadline | None = None,
+        session_id: str | None = None,
     ) -> str:
         """
         Handles the full process of interacting with the language model and executing a tool based on user input.
 
+        If the model answers without calling any tool, that first response is returned directly,
+        so the query costs a single round-trip.
+
         Args:
             user_msg (str): The user's message that prompts the tool agent to act.
+            deadline (float | Deadline | None, optional): Wall-clock budget in seconds (or an absolute
+                Deadline). Completions and tool executions still in flight when it passes are abandoned.
+            session_id (str | None, optional): Conversation id in `session_store`. The previous messages
+                of the session are prepended to the context, and this turn's user message and answer are
+                appended to the session. The semantic cache is bypassed, since the answer depends on them.
 
         Returns:
             str: The final output after executing the tool and generating a response from the model.
+                If the deadline passes or the budget is exceeded, the best partial answer so far: the
+                results of the tools that succeeded, as text (empty if none returned in time).
+                Whether it is partial, and the usage of the run, are in `utils.runs.last_run()`.
         """
+        run_usage = self.last_usage = UsageTracker("ToolAgent", self.budget)
+        report = RunReport(run_usage)
+        try:
+            return self._run(user_msg, deadline, session_id, report)
+        finally:
+            # Báo cáo riêng của lần chạy này, không bị các lần chạy đồng thời ghi đè (xem `last_run`)
+            report_run(report)
+
+    def _run(
+        self, user_msg: str, deadline: float | Deadline | None, session_id: str | None, report: RunReport
+    ) -> str:
+        """Body of `run`: sets `report.partial` when the deadline or the budget stops it."""
+        history = []
+        if session_id is not None:
+            if self.session_store is None:
+                raise ValueError("session_id requires a session_store")
+            history = self.session_store.get(session_id)
+        elif self.cache is not None:
+            cached = self.cache.get(user_msg, self._cache_namespace())
+            if cached is not None:
+                return cached
+
         # Khởi tạo prompt có cấu trúc từ message của người dùng với role là user
         user_prompt = build_prompt_structure(prompt=user_msg, role="user")
 
-        # Khởi tạo lịch sử hội thoại” (chat history)
-        # Mục đích chính của ChatHistory là: giữ ngữ cảnh suy nghĩ của LLM qua nhiều lượt
-        tool_chat_history = ChatHistory(    # tool_chat_history: dùng cho LLM quyết định CÓ GỌI TOOL HAY KHÔNG
-            [
-                build_prompt_structure(
-                    prompt=TOOL_SYSTEM_PROMPT % self.add_tool_signatures(), # Là string formatting kiểu cũ của Python → nhét tool signatures vào system prompt.prompt = prompt từ hệ thống (hướng dẫn LLM cách dùng tool)
-                    role="system",
-                ),
-                user_prompt,    # câu hỏi / yêu cầu của người dùng
-            ]
-        )
-        agent_chat_history = ChatHistory([user_prompt]) # agent_chat_history: dùng cho LLM trả lời cuối cùng (KHÔNG chứa system tool prompt)
-
-
-        # Lấy ra phản hội theo phương thức comletions_create
-        tool_call_response = completions_create(
-            self.client, messages=tool_chat_history, model=self.model
-        )
-
-        # Lấy content bên trong các thẻ
-        tool_calls = extract_tag_content(str(tool_call_response), "tool_call")
-
-        # Để đảm bảo chỉ gọi tool khi cần thiết
-        if tool_calls.found:
-            observations = self.process_tool_calls(tool_calls.content)
-            update_chat_history(
-                agent_chat_history,
-                f"Observation: {observations}",
-                "user" 
+        agent_chat_history = ChatHistory([*history, user_prompt]) # agent_chat_history: dùng cho LLM trả lời cuối cùng (KHÔNG chứa system tool prompt)
+
+        partial = ""    # Câu trả lời tốt nhất hiện có, trả về nếu hết thời gian
+        with usage_scope(self.usage), usage_scope(report.usage):
+            with deadline_scope(deadline):
+                try:
+                    if self.native_tools:
+                        # Function calling gốc: schema đi qua tham số `tools`, tool call trả về có cấu trúc
+                        schemas = [tool.schema() for tool in self.select_tools(user_msg)]
+                        message = self.router.complete_message(
+                            self.client,
+                            agent_chat_history,
+                            Phase.TOOL_SELECTION,
+                            generation_for(self.generation_config, Phase.TOOL_SELECTION),
+                            tools=schemas,
+                        )
+                        tool_call_response = message.content or ""
+                        tool_calls = native_tool_calls(message)
+                    else:
+                        # Khởi tạo lịch sử hội thoại” (chat history)
+                        # Mục đích chính của ChatHistory là: giữ ngữ cảnh suy nghĩ của LLM qua nhiều lượt
+                        tool_chat_history = ChatHistory(    # tool_chat_history: dùng cho LLM quyết định CÓ GỌI TOOL HAY KHÔNG
+                            [
+                                build_prompt_structure(
+                                    prompt=TOOL_SYSTEM_PROMPT % self.add_tool_signatures(user_msg), # Là string formatting kiểu cũ của Python → nhét tool signatures vào system prompt.prompt = prompt từ hệ thống (hướng dẫn LLM cách dùng tool)
+                                    role="system",
+                                ),
+                                *history,       # các lượt trước của phiên (nếu có)
+                                user_prompt,    # câu hỏi / yêu cầu của người dùng
+                            ]
+                        )
+                        # Lấy ra phản hội theo phương thức comletions_create
+                        tool_call_response = self.router.complete(
+                            self.client,
+                            tool_chat_history,
+                            Phase.TOOL_SELECTION,
+                            generation_for(self.generation_config, Phase.TOOL_SELECTION),
+                        )
+                        # Lấy content bên trong các thẻ; bản đã đóng thẻ chỉ dùng để trích tool call,
+                        # câu trả lời trực tiếp được trả về nguyên văn
+                        tool_calls = extract_tag_content(close_open_tags(str(tool_call_response)), "tool_call").content
+
+                    # Để đảm bảo chỉ gọi tool khi cần thiết
+                    if tool_calls:
+                        observations = self.process_tool_calls(tool_calls)
+                        # Câu trả lời tạm cho người dùng: kết quả các tool thành công, không phải repr của dict
+                        partial = results_text(observations)
+                        # Lượt trả lời cuối thấy cả tool call của model lẫn kết quả quan sát
+                        if self.native_tools:
+                            agent_chat_history.extend(tool_call_messages(message, observations))
+                            params = {"tools": schemas, "tool_choice": "none"}
+                        else:
+                            update_chat_history(agent_chat_history, tool_call_response, "assistant")
+                            update_chat_history(
+                                agent_chat_history,
+                                f"Observation: {observations}",
+                                "user" 
+                            )
+                            params = {}
+                        output = str(self.router.complete_message(
+                            self.client,
+                            agent_chat_history,
+                            Phase.FINAL_RESPONSE,
+                            generation_for(self.generation_config, Phase.FINAL_RESPONSE),
+                            **params,
+                        ).content)
+                    else:
+                        # Không gọi tool: phản hồi đầu tiên đã là câu trả lời, bỏ qua lượt gọi LLM thứ hai
+                        output = tool_call_response
+                except (DeadlineExceeded, BudgetExceeded) as exc:
+                    print(Fore.YELLOW + f"\n{exc}, returning the partial answer")
+                    output, report.partial = partial, True
+
+        if session_id is not None:
+            # Chỉ ghi thêm các tin nhắn mới của lượt này
+            self.session_store.append(
+                session_id, [user_prompt, build_prompt_structure(prompt=str(output), role="assistant")]
             )
-
-        # Trả về response
-        return completions_create(self.client, agent_chat_history, self.model)
\ No newline at end of file
+        elif self.cache is not None and not report.partial:
+            self.cache.put(user_msg, output, self._cache_namespace())
+        return output
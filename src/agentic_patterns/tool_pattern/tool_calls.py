@@ -0,0 +1,360 @@
+import ast
+import json
+import re
+
+from .observations import ObservationStore
+from .observations import render
+from .tool import Tool
+from .tool import validate_arguments
+from ..utils.aio import run_sync
+from ..utils.logging import Fore
+from ..utils.profiling import profile
+from ..utils.single_flight import request_key
+
+
+class ToolCallError(ValueError):
+    """Raised when a tool call emitted by the model cannot be parsed, even after repair."""
+
+
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_PYTHON_LITERALS = {"true": "True", "false": "False", "null": "None"}
+
+
+def _python_literals(text: str) -> str:
+    """Rewrites the JSON literals true/false/null as Python literals, outside string literals only."""
+    import io
+    import tokenize
+
+    lines = text.splitlines(keepends=True)
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(text).readline):
+            if token.type == tokenize.NAME and token.string in _PYTHON_LITERALS:
+                (row, col), line = token.start, lines[token.start[0] - 1]
+                # Literal Python có cùng độ dài nên vị trí các token sau không đổi
+                lines[row - 1] = line[:col] + _PYTHON_LITERALS[token.string] + line[col + len(token.string):]
+    except (tokenize.TokenError, SyntaxError):
+        pass  # Để ast.literal_eval báo lỗi cú pháp
+    return "".join(lines)
+
+
+def _loads_lenient(text: str):
+    """Parses JSON, repairing the usual model mistakes (fences, trailing commas, Python syntax)."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.strip("`").removeprefix("json").strip()
+
+    # Bỏ phần văn bản thừa quanh đối tượng ngoài cùng
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        text = text[start : end + 1]
+
+    candidates = [text, _TRAILING_COMMA.sub(r"\1", text)]
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            pass
+
+    # Cú pháp dict của Python: nháy đơn, True/False/None (và true/false/null lẫn vào)
+    try:
+        return ast.literal_eval(_python_literals(candidates[1]))
+    except (ValueError, SyntaxError) as exc:
+        raise ToolCallError(f"could not parse {text!r} as JSON ({exc})") from None
+
+
+def parse_tool_call(tool_call_content) -> dict:
+    """
+    Parses one tool call, repairing malformed JSON when possible.
+
+    Besides strict JSON, the parser accepts code fences, surrounding text, trailing commas,
+    single quotes and Python literals, and arguments given as a JSON string.
+
+    Args:
+        tool_call_content (str | dict): The body of a <tool_call> tag, or an already parsed tool call.
+
+    Returns:
+        dict: The tool call, with a "name" string and an "arguments" dictionary.
+
+    Raises:
+        ToolCallError: If the tool call cannot be repaired.
+    """
+    tool_call = tool_call_content
+    if isinstance(tool_call, str):
+        tool_call = _loads_lenient(tool_call)
+    if not isinstance(tool_call, dict) or not isinstance(tool_call.get("name"), str):
+        raise ToolCallError('a tool call must be an object with a "name" string')
+
+    arguments = tool_call.get("arguments") or {}
+    if isinstance(arguments, str):
+        arguments = _loads_lenient(arguments)
+    if not isinstance(arguments, dict):
+        raise ToolCallError('"arguments" must be an object')
+
+    return {**tool_call, "arguments": arguments}
+
+
+def assign_tool_call_ids(tool_calls: list) -> list:
+    """
+    Gives every tool call of a round a distinct id, so that no observation overwrites another.
+
+    Explicit ids are kept (the first call wins when several share one). The other calls get their
+    index in the round, or the next integer used by no other call if that index is taken.
+
+    Args:
+        tool_calls (list): The tool calls of the round: parsed dictionaries, or anything else for
+            calls that could not be parsed.
+
+    Returns:
+        list: The id of every tool call, in order.
+    """
+    explicit = [
+        tool_call.get("id") if isinstance(tool_call, dict) and isinstance(tool_call.get("id"), (str, int)) else None
+        for tool_call in tool_calls
+    ]
+    reserved = {tool_call_id for tool_call_id in explicit if tool_call_id is not None}
+    used = set()
+    ids = []
+    for i, tool_call_id in enumerate(explicit):
+        if tool_call_id is None or tool_call_id in used:
+            tool_call_id = i
+            while tool_call_id in used or tool_call_id in reserved:
+                tool_call_id += 1
+        used.add(tool_call_id)
+        ids.append(tool_call_id)
+    return ids
+
+
+def prepare_tool_calls(
+    tools_dict: dict[str, Tool], tool_calls_content: list, ids: list | None = None
+) -> tuple[list[tuple[Tool, dict]], dict]:
+    """
+    Parses and validates the tool calls emitted by the model.
+
+    Malformed tool calls are repaired when possible (see `parse_tool_call`). Those that still
+    cannot be run - unparseable, unknown tool, bad arguments - do not abort the run: they get an
+    error observation telling the model what to fix, so a bad output costs at most one round.
+    Every call gets a distinct id (see `assign_tool_call_ids`).
+
+    Args:
+        tools_dict (dict[str, Tool]): The available tools, keyed by name.
+        tool_calls_content (list): List of strings, each representing a tool call in JSON format,
+            or tool call dictionaries already parsed (see `native_tool_calls`).
+        ids (list | None, optional): The ids of the calls, when they were assigned over a larger
+            round (e.g. before `LoopDetector.split`). Defaults to assigning them here.
+
+    Returns:
+        tuple[list[tuple[Tool, dict]], dict]: Each runnable tool paired with its validated tool call
+            dictionary, and the error observations of the rejected calls, keyed by tool call id.
+    """
+    # Đọc JSON (có sửa lỗi) để đưa về dict như Python
+    parsed = []
+    for tool_call_str in tool_calls_content:
+        try:
+            parsed.append(parse_tool_call(tool_call_str))
+        except ToolCallError as exc:
+            parsed.append(exc)
+    if ids is None:
+        ids = assign_tool_call_ids([
+            tool_call if isinstance(tool_call, dict) else tool_call_str
+            for tool_call, tool_call_str in zip(parsed, tool_calls_content)
+        ])
+
+    calls = []
+    errors = {}
+    for tool_call, tool_call_id in zip(parsed, ids):
+        try:
+            if isinstance(tool_call, ToolCallError):
+                raise tool_call
+            tool_call = {**tool_call, "id": tool_call_id}
+            tool_name = tool_call["name"]
+
+            tool = tools_dict.get(tool_name)   # Lấy instance Tool tương ứng với tên tool
+            if tool is None:
+                raise ToolCallError(
+                    f"unknown tool {tool_name!r}; available tools: {', '.join(tools_dict)}"
+                )
+
+            # Validate arguments của tool call dựa trên tool signature (schema)
+            signature = json.loads(tool.fn_signature)
+            unknown = set(tool_call["arguments"]) - set(signature["parameters"]["properties"])
+            if unknown:
+                raise ToolCallError(f"unknown arguments {sorted(unknown)} for tool {tool_name!r}")
+            validated_tool_call = validate_arguments(tool_call, signature)
+            # inspect chỉ được import khi cần, để giữ thời gian import của package thấp
+            import inspect
+
+            inspect.signature(tool.fn).bind(**validated_tool_call["arguments"])
+        except (ToolCallError, TypeError, ValueError, KeyError) as exc:
+            errors[tool_call_id] = (
+                f"Error: invalid tool call ({exc}). Fix it and call the tool again with "
+                f'{{"name": <function-name>, "arguments": <args-dict>, "id": {tool_call_id!r}}}.'
+            )
+            print(Fore.YELLOW + f"\nRejected tool call {tool_call_id!r}: {exc}")
+            continue
+
+        print(Fore.GREEN + f"\nUsing Tool: {tool_name}")
+        print(Fore.GREEN + f"\nTool call dict: \n{validated_tool_call}")
+        calls.append((tool, validated_tool_call))
+    return calls, errors
+
+
+def _unique_calls(calls: list[tuple[Tool, dict]]) -> tuple[list[tuple[Tool, dict]], list[int]]:
+    """Dedupes the calls of a round with the same tool and validated arguments.
+
+    Returns the unique calls and, for every call, the index of the unique call answering it.
+    """
+    unique = []
+    positions = {}
+    index = []
+    for tool, tool_call in calls:
+        key = request_key(tool.name, tool_call["arguments"])
+        if key not in positions:
+            positions[key] = len(unique)
+            unique.append((tool, tool_call))
+        index.append(positions[key])
+    return unique, index
+
+
+async def _gather_tool_calls(calls: list[tuple[Tool, dict]]) -> list:
+    import asyncio
+
+    unique, index = _unique_calls(calls)
+    results = await asyncio.gather(
+        *(tool.arun(**tool_call["arguments"]) for tool, tool_call in unique)
+    )
+    return [results[i] for i in index]
+
+
+async def arun_tool_calls(
+    tools_dict: dict[str, Tool],
+    tool_calls_content: list,
+    observation_store: ObservationStore | None = None,
+    ids: list | None = None,
+) -> dict:
+    """
+    Async counterpart of `run_tool_calls`: every call of the round runs concurrently.
+
+    Args:
+        tools_dict (dict[str, Tool]): The available tools, keyed by name.
+        tool_calls_content (list): List of strings, each representing a tool call in JSON format.
+        observation_store (ObservationStore | None, optional): Bounds (and spills) large results.
+        ids (list | None, optional): The ids of the calls (see `prepare_tool_calls`).
+
+    Returns:
+        dict: A dictionary where the keys are tool call IDs and values are the results from the tools.
+    """
+    calls, errors = prepare_tool_calls(tools_dict, tool_calls_content, ids)
+    with profile("tool", tools=[tool.name for tool, _ in calls]):
+        results = await _gather_tool_calls(calls)
+    return _collect_observations(calls, results, observation_store, errors)
+
+
+def run_tool_calls(
+    tools_dict: dict[str, Tool],
+    tool_calls_content: list,
+    observation_store: ObservationStore | None = None,
+    ids: list | None = None,
+) -> dict:
+    """
+    Processes each tool call, validates arguments, executes the tools, and collects results.
+    Xử lý mỗi lần gọi tool, xử lý các tools và thu thập kết quả.
+
+    When the round contains async tools and more than one call, all the calls of the round run
+    concurrently on an event loop (synchronous tools in worker threads). Otherwise the calls run
+    one after the other, as before. Calls of the same tool with identical validated arguments
+    run once and share the result.
+
+    Args:
+        tools_dict (dict[str, Tool]): The available tools, keyed by name.
+        tool_calls_content (list): List of strings, each representing a tool call in JSON format.
+        observation_store (ObservationStore | None, optional): Bounds (and spills) large results
+            according to its policy. None keeps the raw results.
+        ids (list | None, optional): The ids of the calls (see `prepare_tool_calls`).
+
+    Returns:
+        dict: A dictionary where the keys are tool call IDs and values are the results from the tools.
+    """
+    calls, errors = prepare_tool_calls(tools_dict, tool_calls_content, ids)
+
+    with profile("tool", tools=[tool.name for tool, _ in calls]):
+        if len(calls) > 1 and any(tool.is_async for tool, _ in calls):
+            results = run_sync(_gather_tool_calls(calls))
+        else:
+            unique, index = _unique_calls(calls)
+            unique_results = [tool.run(**tool_call["arguments"]) for tool, tool_call in unique]
+            results = [unique_results[i] for i in index]
+
+    return _collect_observations(calls, results, observation_store, errors)
+
+
+def _collect_observations(
+    calls: list[tuple[Tool, dict]],
+    results: list,
+    observation_store: ObservationStore | None,
+    errors: dict,
+) -> dict:
+    observations = dict(errors)
+    for (_, tool_call), result in zip(calls, results):
+        if observation_store is not None:
+            result = observation_store.bound(result)
+        print(Fore.GREEN + f"\nTool result: \n{result}")
+        # Store the result using the tool call ID
+        observations[tool_call["id"]] = result
+    return observations
+
+
+def native_tool_calls(message) -> list[dict]:
+    """
+    Converts the structured tool calls of a response message (native function-calling mode)
+    into the tool call dictionaries accepted by `run_tool_calls`.
+
+    Args:
+        message: The response message, as returned by `ModelRouter.complete_message`.
+
+    Returns:
+        list[dict]: One {"name", "arguments", "id"} dictionary per tool call (empty if none).
+    """
+    return [
+        {
+            "name": tool_call.function.name,
+            "arguments": tool_call.function.arguments or "{}",   # Chuỗi JSON, được parse_tool_call đọc (và sửa lỗi)
+            "id": tool_call.id,
+        }
+        for tool_call in getattr(message, "tool_calls", None) or []
+    ]
+
+
+def tool_call_messages(message, observations: dict) -> list[dict]:
+    """
+    Builds the chat history entries of a native function-calling round: the assistant message
+    carrying the tool calls, followed by one "tool" message per result.
+
+    Args:
+        message: The response message that requested the tool calls.
+        observations (dict): The results returned by `run_tool_calls`, keyed by tool call id.
+
+    Returns:
+        list[dict]: The messages to append to the chat history.
+    """
+    messages = [
+        {
+            "role": "assistant",
+            "content": message.content or "",
+            "tool_calls": [
+                {
+                    "id": tool_call.id,
+                    "type": "function",
+                    "function": {
+                        "name": tool_call.function.name,
+                        "arguments": tool_call.function.arguments,
+                    },
+                }
+                for tool_call in message.tool_calls
+            ],
+        }
+    ]
+    messages += [
+        {"role": "tool", "tool_call_id": tool_call_id, "content": render(result)}
+        for tool_call_id, result in observations.items()
+    ]
+    return messages
@@ -0,0 +1,94 @@
+import json
+import math
+import re
+from collections import Counter
+
+from .tool import Tool
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Splits a text into lowercase word tokens, breaking snake_case and camelCase identifiers.
+
+    Args:
+        text (str): The text to tokenize (a query, tool name or docstring).
+
+    Returns:
+        list[str]: The tokens, e.g. "getCurrent_weather" -> ["get", "current", "weather"].
+    """
+    text = re.sub(r"(?<=[a-z0-9])(?=[A-Z])", " ", text)
+    return re.findall(r"[^\W_]+", text.lower())
+
+
+class ToolIndex:
+    """
+    A local BM25 index over tool names, docstrings and parameter names.
+
+    It selects the tools relevant to a user message so that only their signatures are rendered
+    in the system prompt, which keeps the prompt prefix small for agents with many tools.
+    Everything runs locally: no embeddings model, no network.
+
+    Attributes:
+        tools (list[Tool]): The indexed tools, in their original order.
+        k1 (float): BM25 term frequency saturation.
+        b (float): BM25 document length normalization.
+    """
+
+    def __init__(self, tools: list[Tool], k1: float = 1.5, b: float = 0.75):
+        self.tools = tools
+        self.k1 = k1
+        self.b = b
+
+        self.term_freqs = [Counter(tokenize(self._document(tool))) for tool in tools]
+        self.doc_lengths = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_length = sum(self.doc_lengths) / len(tools) if tools else 0.0
+
+        doc_freqs = Counter(term for tf in self.term_freqs for term in tf)
+        n = len(tools)
+        self.idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freqs.items()
+        }
+
+    @staticmethod
+    def _document(tool: Tool) -> str:
+        signature = json.loads(tool.fn_signature)
+        parameters = " ".join(signature.get("parameters", {}).get("properties", {}))
+        return f"{tool.name} {signature.get('description') or ''} {parameters}"
+
+    def scores(self, query: str) -> list[float]:
+        """
+        Computes the BM25 score of every tool for a query.
+
+        Args:
+            query (str): The user message (or any text describing what is needed).
+
+        Returns:
+            list[float]: One score per tool, in the order of `tools`.
+        """
+        terms = [term for term in tokenize(query) if term in self.idf]
+        scores = []
+        for tf, length in zip(self.term_freqs, self.doc_lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / (self.avg_length or 1))
+            scores.append(
+                sum(
+                    self.idf[term] * tf[term] * (self.k1 + 1) / (tf[term] + norm)
+                    for term in terms
+                    if term in tf
+                )
+            )
+        return scores
+
+    def search(self, query: str, top_k: int) -> list[Tool]:
+        """
+        Returns the `top_k` most relevant tools for a query.
+
+        Args:
+            query (str): The user message (or any text describing what is needed).
+            top_k (int): The maximum number of tools to return.
+
+        Returns:
+            list[Tool]: The selected tools, kept in their original order so the prompt is stable.
+        """
+        scores = self.scores(query)
+        ranked = sorted(range(len(self.tools)), key=lambda i: (-scores[i], i))[:top_k]
+        return [self.tools[i] for i in sorted(ranked)]
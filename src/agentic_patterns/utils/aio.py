@@ -0,0 +1,41 @@
+import contextvars
+import threading
+
+
+def run_sync(coro):
+    """
+    Runs a coroutine to completion from synchronous code and returns its result.
+
+    Works both when no event loop is running (plain scripts) and when one is already running
+    in the current thread (Jupyter notebooks, async servers calling sync agents): in the latter
+    case the coroutine runs on a fresh event loop in a helper thread, with the caller's context.
+
+    Args:
+        coro (Coroutine): The coroutine to run.
+
+    Returns:
+        The result of the coroutine.
+    """
+    import asyncio
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    result = {}
+    context = contextvars.copy_context()
+
+    def target():
+        try:
+            result["value"] = context.run(asyncio.run, coro)
+        except BaseException as exc:  # Chuyển lỗi về thread gọi
+            result["error"] = exc
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
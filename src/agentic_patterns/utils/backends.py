@@ -0,0 +1,303 @@
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from types import SimpleNamespace
+
+from .deadlines import remaining_timeout
+
+
+def _to_namespace(value):
+    """Turns a decoded JSON response into attribute-access objects, like the SDK responses."""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{key: _to_namespace(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [_to_namespace(item) for item in value]
+    return value
+
+
+class OpenAICompatibleClient:
+    """
+    A minimal client for any OpenAI-compatible `/chat/completions` endpoint (vLLM, llama.cpp,
+    Ollama, LM Studio, OpenRouter...), exposing the same `chat.completions.create` call as the
+    Groq SDK.
+
+    Attributes:
+        base_url (str): Base URL of the API, e.g. "http://localhost:8080/v1".
+        api_key (str | None): Bearer token sent with every request, if any.
+        timeout (float): Default request timeout in seconds.
+    """
+
+    def __init__(self, base_url: str, api_key: str | None = None, timeout: float = 60.0):
+        import httpx
+
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self._http = httpx.Client(headers=headers, timeout=timeout)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, messages: list, model: str, timeout: float | None = None, **params):
+        response = self._http.post(
+            f"{self.base_url}/chat/completions",
+            json={"model": model, "messages": messages, **params},
+            timeout=timeout or self.timeout,
+        )
+        response.raise_for_status()
+        return _to_namespace(response.json())
+
+
+class Backend:
+    """
+    One completion provider.
+
+    Attributes:
+        name (str): Name used in the statistics and logs.
+        client: Any object with a Groq/OpenAI-style `chat.completions.create` method.
+        models (dict[str, str]): Maps the model names used by the agents to this backend's own
+            model names (e.g. "llama-3.3-70b-versatile" -> "llama3.3:70b" on a local server).
+            Models missing from the map are sent unchanged.
+    """
+
+    def __init__(self, name: str, client, models: dict[str, str] | None = None):
+        self.name = name
+        self.client = client
+        self.models = models or {}
+
+    @classmethod
+    def groq(cls, name: str = "groq", models: dict[str, str] | None = None, **client_kwargs) -> "Backend":
+        """
+        Creates a Groq backend (`client_kwargs` are passed to `groq.Groq`).
+
+        Returns:
+            Backend: The backend.
+        """
+        from dotenv import load_dotenv
+        from groq import Groq
+
+        load_dotenv()
+        return cls(name, Groq(**client_kwargs), models)
+
+    @classmethod
+    def openai_compatible(
+        cls,
+        name: str,
+        base_url: str,
+        api_key: str | None = None,
+        models: dict[str, str] | None = None,
+        timeout: float = 60.0,
+    ) -> "Backend":
+        """
+        Creates a backend for an OpenAI-compatible endpoint, such as a local inference server.
+
+        Returns:
+            Backend: The backend.
+        """
+        return cls(name, OpenAICompatibleClient(base_url, api_key, timeout), models)
+
+    def create(self, messages: list, model: str, **params):
+        return self.client.chat.completions.create(
+            messages=messages, model=self.models.get(model, model), **params
+        )
+
+
+class BackendStats:
+    """
+    Health and latency of one backend.
+
+    Attributes:
+        calls (int): Number of successful requests.
+        errors (int): Number of failed requests.
+        consecutive_errors (int): Failures since the last success.
+        unhealthy_until (float): `time.monotonic()` value until which the backend is skipped.
+        latencies (deque[float]): Latencies of the most recent successful requests, in seconds.
+    """
+
+    def __init__(self, window: int = 100):
+        self.calls = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+        self.unhealthy_until = 0.0
+        self.latencies: deque[float] = deque(maxlen=window)
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.unhealthy_until
+
+    def quantile(self, q: float) -> float | None:
+        """Returns the `q` quantile of the recent latencies, or None without enough samples."""
+        if len(self.latencies) < 5:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class MultiBackendClient:
+    """
+    A completion client that spreads requests over several backends, with hedging and failover.
+
+    It exposes the same `chat.completions.create` call as the Groq SDK, so it can be given to any
+    agent (`client=...`) or router in place of the default client.
+
+    A request goes to the first healthy backend. If it has not answered after that backend's p95
+    latency (`hedge_quantile`), counted from when the request actually started running, the same
+    request is sent to the next backend and the first answer wins; the slower call finishes in the
+    background and only updates the statistics. A failed request fails over to the next backend.
+    After `failure_threshold` consecutive errors, a backend is skipped for `cooldown` seconds
+    (unless every backend is unhealthy).
+
+    Attributes:
+        backends (list[Backend]): The backends, in order of preference.
+        hedge (bool): Whether slow requests are hedged.
+        hedge_quantile (float): Latency quantile after which a request is hedged.
+        default_hedge_delay (float): Hedge delay in seconds while a backend has too few samples.
+        failure_threshold (int): Consecutive errors after which a backend is marked unhealthy.
+        cooldown (float): Seconds an unhealthy backend is skipped.
+        max_workers (int): Size of the thread pool running the requests (including hedges and the
+            slower calls finishing in the background).
+        stats (dict[str, BackendStats]): Health and latency of each backend, by name.
+    """
+
+    def __init__(
+        self,
+        backends: list[Backend],
+        hedge: bool = True,
+        hedge_quantile: float = 0.95,
+        default_hedge_delay: float = 2.0,
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        max_workers: int = 32,
+    ):
+        if not backends:
+            raise ValueError("MultiBackendClient needs at least one backend")
+
+        self.backends = backends
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.default_hedge_delay = default_hedge_delay
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_workers = max_workers
+        self.stats = {backend.name: BackendStats() for backend in backends}
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix="completion-backend")
+
+    def _ordered_backends(self) -> list[Backend]:
+        # Bỏ qua backend đang cooldown, giữ thứ tự ưu tiên đã cấu hình; nếu tất cả đều lỗi thì thử hết
+        healthy = [backend for backend in self.backends if self.stats[backend.name].healthy]
+        return healthy or list(self.backends)
+
+    def _hedge_delay(self, backend: Backend) -> float:
+        p95 = self.stats[backend.name].quantile(self.hedge_quantile)
+        return self.default_hedge_delay if p95 is None else p95
+
+    def _call(self, backend: Backend, messages: list, model: str, params: dict, started: Future):
+        started.set_result(time.monotonic())
+        start = time.perf_counter()
+        try:
+            response = backend.create(messages, model, **params)
+        except Exception:
+            with self._lock:
+                stats = self.stats[backend.name]
+                stats.errors += 1
+                stats.consecutive_errors += 1
+                if stats.consecutive_errors >= self.failure_threshold:
+                    stats.unhealthy_until = time.monotonic() + self.cooldown
+            raise
+
+        with self._lock:
+            stats = self.stats[backend.name]
+            stats.calls += 1
+            stats.consecutive_errors = 0
+            stats.unhealthy_until = 0.0
+            stats.latencies.append(time.perf_counter() - start)
+        return response
+
+    def _submit(self, backend: Backend, messages: list, model: str, params: dict) -> tuple[Future, Future]:
+        """Submits a request; the second future resolves to its start time once a worker picks it up."""
+        context = contextvars.copy_context()
+        started = Future()
+        return self._pool.submit(context.run, self._call, backend, messages, model, params, started), started
+
+    def create(self, messages: list, model: str, **params):
+        """
+        Sends a chat completion request (same signature as `client.chat.completions.create`).
+
+        Returns:
+            The response of the first backend that answered successfully.
+
+        Raises:
+            Exception: The error of the last backend tried, if every backend failed.
+        """
+        pending = self._ordered_backends()
+        running = {}
+        last_error = None
+
+        backend = pending.pop(0)
+        future, started = self._submit(backend, messages, model, params)
+        running[future] = backend
+
+        while running:
+            timeout = None
+            waiting = list(running)
+            if self.hedge and pending:
+                if started.done():
+                    # Đếm thời gian hedge từ lúc yêu cầu thực sự chạy, không tính thời gian chờ trong pool
+                    timeout = max(started.result() + self._hedge_delay(backend) - time.monotonic(), 0.0)
+                else:
+                    waiting.append(started)
+                # Không chờ quá deadline của lần chạy hiện tại
+                timeout = remaining_timeout(timeout)
+
+            done, _ = wait(waiting, timeout=timeout, return_when=FIRST_COMPLETED)
+            if done == {started}:
+                # Yêu cầu mới nhất vừa được worker nhận: tính lại thời điểm hedge
+                continue
+            done.discard(started)
+            if not done:
+                # Quá p95 mà chưa có kết quả: gửi thêm yêu cầu dự phòng tới backend kế tiếp
+                backend = pending.pop(0)
+                future, started = self._submit(backend, messages, model, params)
+                running[future] = backend
+                continue
+
+            for future in done:
+                running.pop(future)
+                try:
+                    return future.result()
+                except Exception as exc:
+                    last_error = exc
+
+            # Lỗi: chuyển sang backend kế tiếp nếu không còn yêu cầu nào đang chạy
+            if not running and pending:
+                backend = pending.pop(0)
+                future, started = self._submit(backend, messages, model, params)
+                running[future] = backend
+
+        raise last_error
+
+    def health(self) -> dict[str, dict]:
+        """
+        Summarizes the health and latency of every backend.
+
+        Returns:
+            dict[str, dict]: Per backend: healthy flag, calls, errors and p50/p95 latency in seconds.
+        """
+        with self._lock:
+            return {
+                name: {
+                    "healthy": stats.healthy,
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "p50": stats.quantile(0.5),
+                    "p95": stats.quantile(0.95),
+                }
+                for name, stats in self.stats.items()
+            }
@@ -1,4 +1,97 @@
-def completions_create(client, messages: list, model: str) -> str:
+from functools import cache
+
+from .deadlines import DeadlineExceeded
+from .deadlines import current_deadline
+from .deadlines import is_timeout
+from .deadlines import remaining_timeout
+from .single_flight import SingleFlight
+from .single_flight import request_key
+from .usage import check_budget
+from .usage import record_usage
+
+# Các request giống hệt nhau đang chạy đồng thời chỉ gửi tới provider một lần
+_in_flight = SingleFlight()
+
+
+@cache
+def default_client():
+    """
+    Returns the Groq client shared by every agent of the process, creating it on first use.
+
+    `groq` and `dotenv` are imported (and `.env` is loaded) here rather than at import time,
+    so importing the package stays cheap for code paths that never talk to a model.
+
+    Returns:
+        Groq: The shared Groq client.
+    """
+    from dotenv import load_dotenv
+    from groq import Groq
+
+    load_dotenv()
+    return Groq()
+
+
+def chat_completion(
+    client,
+    messages: list,
+    model: str,
+    timeout: float | None = None,
+    coalesce: bool = True,
+    **params,
+):
+    """
+    Sends a chat completion request and returns the response message itself.
+
+    Unlike `completions_create`, the message keeps its structured fields, such as the
+    `tool_calls` requested through the native function-calling API.
+
+    Concurrent byte-identical requests (same client, model, messages and parameters), e.g. from
+    parallel crew agents with the same task, share one in-flight call and its response.
+
+    The `usage` of the response is recorded in the active usage trackers (see `usage_scope`). A
+    coalesced request is charged to the trackers of every caller sharing it, but only once to a
+    tracker they have in common (e.g. their crew's).
+
+    Args:
+        client (Groq): The Groq client object.
+        messages (list[dict]): The chat history sent to the model.
+        model (str): The model to use.
+        timeout (float | None, optional): Request timeout in seconds, shortened to the time left
+            before the current deadline, if any.
+        coalesce (bool, optional): Share the in-flight call of an identical concurrent request.
+            Disable it to get independent samples of the same prompt.
+        **params: Extra request parameters, e.g. `tools` and `tool_choice`.
+
+    Returns:
+        The message of the first choice (with `content` and, possibly, `tool_calls`).
+
+    Raises:
+        DeadlineExceeded: If the current deadline passes before or during the request.
+        BudgetExceeded: If an active usage tracker is already over its budget.
+    """
+    check_budget()
+    key = request_key(id(client), model, messages, params) if coalesce else None
+    timeout = remaining_timeout(timeout)
+    if timeout is not None:
+        params["timeout"] = timeout
+
+    def send():
+        response = client.chat.completions.create(messages=messages, model=model, **params)
+        return response, record_usage(model, getattr(response, "usage", None))
+
+    try:
+        response, charged = send() if key is None else _in_flight.do(key, send)
+    except Exception as exc:
+        deadline = current_deadline()
+        if deadline is not None and deadline.expired and is_timeout(exc):
+            raise DeadlineExceeded("Deadline exceeded during a completion") from exc
+        raise
+    # Request dùng chung: tính vào các tracker của caller này mà leader chưa tính
+    record_usage(model, getattr(response, "usage", None), exclude=charged)
+    return response.choices[0].message
+
+
+def completions_create(client, messages: list, model: str, timeout: float | None = None) -> str:
     """
     Sends a request to client's `completions.create` method to interact with the language model
 
@@ -6,9 +99,14 @@ def completions_create(client, messages: list, model: str) -> str:
         client (Groq): The Groq client object
         messages (list[dict]): A list of message objects containing chat history for the model.
         model (str): The model to use for generating tool calls and responses.
+        timeout (float | None, optional): Request timeout in seconds. None uses the client's default.
+            The timeout is shortened to the time left before the current deadline, if any.
     
     Returns:
         str: The content of the model's response
+
+    Raises:
+        DeadlineExceeded: If the current deadline passes before or during the request.
     """
 
     """
@@ -22,9 +120,7 @@ def completions_create(client, messages: list, model: str) -> str:
     Returns:
         str: Nội dung response của model.
     """
-    response = client.chat.completions.create(messages=messages, model=model)
-    #print("Response: ", response)
-    return str(response.choices[0].message.content)
+    return str(chat_completion(client, messages, model, timeout).content)
 
 
 def build_prompt_structure(prompt: str, role: str, tag: str = ""):
@@ -0,0 +1,176 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when the wall-clock deadline of an agent run has passed."""
+
+
+class Deadline:
+    """
+    An absolute point in time (on the monotonic clock) by which a run must finish.
+
+    Attributes:
+        expires_at (float): The `time.monotonic()` value at which the deadline expires.
+    """
+
+    def __init__(self, expires_at: float):
+        self.expires_at = expires_at
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        """
+        Creates a deadline `seconds` from now.
+
+        Args:
+            seconds (float): The time budget, in seconds.
+
+        Returns:
+            Deadline: The new deadline.
+        """
+        return cls(time.monotonic() + seconds)
+
+    def remaining(self) -> float:
+        """Returns the seconds left before the deadline (never negative)."""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def check(self) -> None:
+        """
+        Raises:
+            DeadlineExceeded: If the deadline has passed.
+        """
+        if self.expired:
+            raise DeadlineExceeded("Deadline exceeded")
+
+
+# Deadline của lần chạy hiện tại, riêng cho từng thread / asyncio task
+_current_deadline: contextvars.ContextVar[Deadline | None] = contextvars.ContextVar(
+    "current_deadline", default=None
+)
+
+
+def current_deadline() -> Deadline | None:
+    """Returns the deadline of the current run, if any."""
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(deadline: float | Deadline | None):
+    """
+    Sets the deadline for everything run inside the `with` block.
+
+    Completions, tool executions and crew runs started inside the block read it through
+    `current_deadline`. Nested scopes can only shorten the deadline, never extend it.
+
+    Args:
+        deadline (float | Deadline | None): A time budget in seconds, an absolute Deadline,
+            or None to keep the enclosing deadline.
+
+    Yields:
+        Deadline | None: The effective deadline inside the block.
+    """
+    if isinstance(deadline, (int, float)):
+        deadline = Deadline.after(deadline)
+
+    parent = _current_deadline.get()
+    if deadline is None or (parent is not None and parent.expires_at <= deadline.expires_at):
+        deadline = parent
+
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def remaining_timeout(timeout: float | None = None) -> float | None:
+    """
+    Combines a per-request timeout with the current deadline.
+
+    Args:
+        timeout (float | None, optional): The per-request timeout, in seconds.
+
+    Returns:
+        float | None: The smaller of `timeout` and the time left before the deadline.
+
+    Raises:
+        DeadlineExceeded: If the current deadline has already passed.
+    """
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return timeout
+
+    deadline.check()
+    remaining = deadline.remaining()
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+def is_timeout(exc: BaseException) -> bool:
+    """
+    Tells whether an exception raised by a client is a timeout.
+
+    Matches the builtin TimeoutError as well as client-specific classes such as
+    `groq.APITimeoutError` or `httpx.ReadTimeout`, without importing those libraries.
+
+    Args:
+        exc (BaseException): The raised exception.
+
+    Returns:
+        bool: True if the exception represents a timeout.
+    """
+    return isinstance(exc, TimeoutError) or any(
+        "Timeout" in cls.__name__ for cls in type(exc).__mro__
+    )
+
+
+def run_with_deadline(fn, *args, **kwargs):
+    """
+    Calls `fn(*args, **kwargs)`, giving up on it when the current deadline passes.
+
+    Without a deadline the function is simply called inline. With one, it runs in its own
+    daemon thread and the caller stops waiting at the deadline; the thread cannot be killed, so
+    its result is discarded when it eventually finishes. Since every call has its own thread,
+    abandoned calls that never return cannot block later ones, and they do not keep the
+    interpreter alive at exit.
+
+    Args:
+        fn (Callable): The function to call.
+        *args: Positional arguments of `fn`.
+        **kwargs: Keyword arguments of `fn`.
+
+    Returns:
+        The result of `fn`.
+
+    Raises:
+        DeadlineExceeded: If the deadline passes before `fn` returns.
+    """
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return fn(*args, **kwargs)
+
+    deadline.check()
+    context = contextvars.copy_context()
+    result = {}
+
+    def target():
+        try:
+            result["value"] = context.run(fn, *args, **kwargs)
+        except BaseException as exc:  # Chuyển lỗi về thread gọi
+            result["error"] = exc
+
+    # Mỗi lệnh gọi một thread daemon riêng: tool bị bỏ dở không chiếm chỗ của các lệnh gọi sau
+    thread = threading.Thread(target=target, name="tool-deadline", daemon=True)
+    thread.start()
+    thread.join(deadline.remaining())
+    if thread.is_alive():
+        raise DeadlineExceeded("Deadline exceeded while running a tool")
+
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
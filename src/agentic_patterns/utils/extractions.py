@@ -56,4 +56,47 @@ def extract_tag_content(text: str, tag: str) -> TagContentResult:
     return TagContentResult(
         content = [content.strip() for content in matched_contents],
         found = bool(matched_contents),
-    )
\ No newline at end of file
+    )
+
+def remove_tag_content(text: str, *tags: str) -> str:
+    """
+    Removes the given tags and everything they enclose (e.g. the <thought> and <tool_call> markup
+    of a completion), keeping the text around them.
+
+    Args:
+        text (str): The input string.
+        *tags (str): The names of the tags to remove.
+
+    Returns:
+        str: The remaining text, stripped.
+    """
+    for tag in tags:
+        text = re.sub(rf"<{tag}>.*?</{tag}>", "", text, flags=re.DOTALL)
+    return text.strip()
+
+def close_open_tags(text: str, tags: tuple[str, ...] = ("tool_call", "response")) -> str:
+    """
+    Closes the tags left open at the end of a completion (e.g. "<response>Hi" -> "<response>Hi</response>").
+
+    Providers strip the matched stop sequence from the output, so a completion stopped at
+    "</tool_call>" or "</response>" ends with an unclosed tag that `extract_tag_content` would miss.
+    Only `tags` are closed: other angle brackets of the text (e.g. "List<String>", "<br>") are left as is.
+
+    Args:
+        text (str): The completion text.
+        tags (tuple[str, ...], optional): The tags a stop sequence can leave open.
+
+    Returns:
+        str: The text with the missing closing tags appended, innermost first.
+    """
+    # Duyệt các thẻ theo thứ tự xuất hiện, thẻ đóng loại bỏ thẻ mở tương ứng gần nhất
+    open_tags: list[str] = []
+    for closing, tag in re.findall(r"<(/?)([A-Za-z_][\w-]*)>", text):
+        if tag not in tags:
+            continue
+        if not closing:
+            open_tags.append(tag)
+        elif tag in open_tags:
+            del open_tags[len(open_tags) - 1 - open_tags[::-1].index(tag)]
+
+    return text.rstrip() + "".join(f"</{tag}>" for tag in reversed(open_tags)) if open_tags else text
@@ -1,14 +1,36 @@
+import importlib
 import time
-from colorama import Fore
-from colorama import Style
 
 
-def fancy_print(message: str) -> None:
+class _LazyAttribute:
+    """
+    A stand-in for a module attribute that is only imported on first use.
+
+    Lets modules write `Fore.GREEN` without paying for the `colorama` import until
+    something is actually printed.
+    """
+
+    def __init__(self, module: str, attribute: str):
+        self._module = module
+        self._attribute = attribute
+
+    def __getattr__(self, name: str):
+        target = getattr(importlib.import_module(self._module), self._attribute)
+        return getattr(target, name)
+
+
+Fore = _LazyAttribute("colorama", "Fore")
+Style = _LazyAttribute("colorama", "Style")
+
+
+def fancy_print(message: str, pause: float = 0.5) -> None:
     """
     Displays a fancy print message.
 
     Args:
         message (str): The message to display.
+        pause (float, optional): Seconds to sleep after printing. Pass 0 from schedulers and other
+            code whose latency matters.
     """
 
     """
@@ -16,11 +38,13 @@ def fancy_print(message: str) -> None:
 
     Args:
         message (str): Message được hiển 
+        pause (float, optional): Số giây dừng sau khi in
     """
     print(Style.BRIGHT + Fore.CYAN + f"\n{'=' * 50}")
     print(Fore.MAGENTA + f"{message}")
     print(Style.BRIGHT + Fore.CYAN + f"{'=' * 50}\n")
-    time.sleep(0.5)
+    if pause:
+        time.sleep(pause)
 
 
 
@@ -0,0 +1,77 @@
+import contextvars
+import time
+from contextlib import contextmanager
+
+
+class ProfilingScope:
+    """
+    What the spans recorded in the current context belong to.
+
+    Attributes:
+        recorder: Any object with a `record(agent, kind, start, end, **meta)` method (e.g. a Timeline).
+        agent (str): Name of the agent running in this context.
+        round (int | None): Current round of the agent's loop, if it has one.
+    """
+
+    def __init__(self, recorder, agent: str):
+        self.recorder = recorder
+        self.agent = agent
+        self.round = None
+
+
+# Scope của agent đang chạy, riêng cho từng thread / asyncio task
+_current_scope: contextvars.ContextVar[ProfilingScope | None] = contextvars.ContextVar(
+    "profiling_scope", default=None
+)
+
+
+@contextmanager
+def profiling_scope(recorder, agent: str):
+    """
+    Records the LLM and tool spans of the code run inside the block (and of the threads or tasks
+    started with a copy of its context) to `recorder`, on behalf of `agent`.
+
+    Args:
+        recorder: The span recorder, e.g. a Timeline.
+        agent (str): The agent name.
+
+    Yields:
+        ProfilingScope: The active scope.
+    """
+    scope = ProfilingScope(recorder, agent)
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+
+
+def set_round(round: int) -> None:
+    """Tags the spans recorded from now on with the given loop round (no-op outside a scope)."""
+    scope = _current_scope.get()
+    if scope is not None:
+        scope.round = round
+
+
+@contextmanager
+def profile(kind: str, **meta):
+    """
+    Records the duration of the block as a `kind` span ("llm", "tool"...) of the current scope.
+    Does nothing (and costs nothing) when no profiling scope is active.
+
+    Args:
+        kind (str): The span kind.
+        **meta: Extra attributes stored with the span (model, phase, tools...).
+    """
+    scope = _current_scope.get()
+    if scope is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        scope.recorder.record(
+            scope.agent, kind, start, time.perf_counter(), round=scope.round, **meta
+        )
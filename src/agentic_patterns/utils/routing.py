@@ -0,0 +1,301 @@
+import threading
+import time
+from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
+from dataclasses import fields
+
+from .completions import chat_completion
+from .deadlines import DeadlineExceeded
+from .deadlines import is_timeout
+from .profiling import profile
+
+
+class Phase:
+    """
+    Names of the agent phases a model can be routed for.
+
+    Attributes:
+        TOOL_SELECTION (str): ToolAgent deciding which tools to call.
+        REACT_THOUGHT (str): A thought / tool-call round of ReactAgent.
+        FINAL_RESPONSE (str): Writing the final answer to the user.
+        GENERATION (str): ReflectionAgent generating (or revising) content.
+        CRITIQUE (str): ReflectionAgent critiquing the generated content.
+    """
+
+    TOOL_SELECTION = "tool_selection"
+    REACT_THOUGHT = "react_thought"
+    FINAL_RESPONSE = "final_response"
+    GENERATION = "generation"
+    CRITIQUE = "critique"
+
+
+@dataclass
+class GenerationConfig:
+    """
+    Sampling and length settings of a completion request. None means "inherit" (from the less
+    specific level, or the provider's default).
+
+    Attributes:
+        max_tokens (int | None): Maximum number of generated tokens.
+        temperature (float | None): Sampling temperature.
+        top_p (float | None): Nucleus sampling probability mass.
+        stop (list[str] | None): Stop sequences. The provider strips the matched sequence from the
+            output (see `close_open_tags`). An empty list removes inherited stop sequences.
+        seed (int | None): Seed for best-effort deterministic sampling.
+    """
+
+    max_tokens: int | None = None
+    temperature: float | None = None
+    top_p: float | None = None
+    stop: list[str] | None = None
+    seed: int | None = None
+
+    def merge(self, override: "GenerationConfig | None") -> "GenerationConfig":
+        """Returns a copy of this config with the fields set in `override` replaced."""
+        if override is None:
+            return self
+        values = {f.name: getattr(self, f.name) for f in fields(self)}
+        values.update({f.name: getattr(override, f.name) for f in fields(override) if getattr(override, f.name) is not None})
+        return GenerationConfig(**values)
+
+    def to_params(self) -> dict:
+        """Returns the request parameters of the fields that are set."""
+        params = {f.name: getattr(self, f.name) for f in fields(self) if getattr(self, f.name) is not None}
+        if not params.get("stop", True):
+            del params["stop"]
+        return params
+
+
+# Thiết lập mặc định theo giai đoạn: dừng sau thẻ của vòng ReAct, giới hạn độ dài bản nhận xét
+DEFAULT_GENERATION: dict[str, GenerationConfig] = {
+    Phase.REACT_THOUGHT: GenerationConfig(stop=["</tool_call>", "</response>"]),
+    Phase.CRITIQUE: GenerationConfig(max_tokens=512),
+}
+
+
+def generation_for(generation: "GenerationConfig | dict[str, GenerationConfig] | None", phase: str) -> GenerationConfig | None:
+    """
+    Picks the settings of `phase` from an agent's `generation` argument.
+
+    Args:
+        generation (GenerationConfig | dict[str, GenerationConfig] | None): One config for every
+            phase, or configs keyed by phase (see `Phase`).
+        phase (str): The phase of the request.
+
+    Returns:
+        GenerationConfig | None: The settings of the phase, if any.
+    """
+    if isinstance(generation, dict):
+        return generation.get(phase)
+    return generation
+
+
+@dataclass
+class ModelRoute:
+    """
+    The model (and fallbacks) used for one phase.
+
+    Attributes:
+        model (str): The preferred model.
+        fallbacks (list[str]): Models tried in order when the previous one times out.
+        timeout (float | None): Per-request timeout in seconds before falling back. None means
+            the client's default timeout.
+        generation (GenerationConfig | None): Generation settings of the phase on this route.
+    """
+
+    model: str
+    fallbacks: list[str] = field(default_factory=list)
+    timeout: float | None = None
+    generation: GenerationConfig | None = None
+
+
+@dataclass
+class RouteStats:
+    """
+    Latency statistics of one (phase, model) route.
+
+    Attributes:
+        calls (int): Number of successful requests.
+        timeouts (int): Number of requests that timed out.
+        total_latency (float): Sum of the latencies of successful requests, in seconds.
+        last_latency (float): Latency of the most recent successful request, in seconds.
+    """
+
+    calls: int = 0
+    timeouts: int = 0
+    total_latency: float = 0.0
+    last_latency: float = 0.0
+
+    @property
+    def mean_latency(self) -> float:
+        return self.total_latency / self.calls if self.calls else 0.0
+
+
+class ModelRouter:
+    """
+    Chooses the model of each completion from the phase of the agent that requests it.
+
+    A small fast model can handle tool selection and critique while a large one writes the
+    final answers, for example:
+
+        router = ModelRouter(
+            default="llama-3.3-70b-versatile",
+            routes={
+                Phase.TOOL_SELECTION: "llama-3.1-8b-instant",
+                Phase.CRITIQUE: ModelRoute("llama-3.1-8b-instant", fallbacks=["llama-3.3-70b-versatile"], timeout=10),
+            },
+        )
+
+    Generation settings (`GenerationConfig`) are resolved per request, the most specific level
+    winning: the phase defaults (`DEFAULT_GENERATION`, e.g. stop sequences for ReAct rounds), the
+    route, then the settings of the agent making the request.
+
+    Attributes:
+        default (ModelRoute): The route of phases without an explicit route.
+        routes (dict[str, ModelRoute]): The route of each phase.
+        stats (dict[tuple[str, str], RouteStats]): Latency statistics keyed by (phase, model).
+    """
+
+    def __init__(
+        self,
+        default: str | ModelRoute,
+        routes: dict[str, str | ModelRoute] | None = None,
+    ):
+        self.default = self._as_route(default)
+        self.routes = {phase: self._as_route(route) for phase, route in (routes or {}).items()}
+        self.stats: dict[tuple[str, str], RouteStats] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _as_route(route: str | ModelRoute) -> ModelRoute:
+        return route if isinstance(route, ModelRoute) else ModelRoute(model=route)
+
+    def to_spec(self) -> dict:
+        """
+        Serializes the routes into plain data (see `Agent.to_spec`). Latency statistics are not kept.
+
+        Returns:
+            dict: The default route and the route of each phase.
+        """
+        return {
+            "default": asdict(self.default),
+            "routes": {phase: asdict(route) for phase, route in self.routes.items()},
+        }
+
+    @classmethod
+    def from_spec(cls, spec: dict) -> "ModelRouter":
+        """
+        Re-creates a router serialized by `to_spec`.
+
+        Args:
+            spec (dict): The serialized routes.
+
+        Returns:
+            ModelRouter: The new router.
+        """
+        def route(data: dict) -> ModelRoute:
+            generation = data.get("generation")
+            return ModelRoute(**{**data, "generation": GenerationConfig(**generation) if generation else None})
+
+        return cls(route(spec["default"]), {phase: route(data) for phase, data in spec.get("routes", {}).items()})
+
+    def route(self, phase: str) -> ModelRoute:
+        """
+        Returns the route configured for a phase.
+
+        Args:
+            phase (str): One of the `Phase` names.
+
+        Returns:
+            ModelRoute: The phase's route, or the default route.
+        """
+        return self.routes.get(phase, self.default)
+
+    def _stats(self, phase: str, model: str) -> RouteStats:
+        return self.stats.setdefault((phase, model), RouteStats())
+
+    def generation(self, phase: str, override: GenerationConfig | None = None) -> GenerationConfig:
+        """
+        Resolves the generation settings of a request.
+
+        Args:
+            phase (str): One of the `Phase` names.
+            override (GenerationConfig | None, optional): The settings of the requesting agent.
+
+        Returns:
+            GenerationConfig: The phase defaults, merged with the route's then the agent's settings.
+        """
+        config = DEFAULT_GENERATION.get(phase, GenerationConfig())
+        return config.merge(self.route(phase).generation).merge(override)
+
+    def complete(
+        self, client, messages: list, phase: str, generation: GenerationConfig | None = None, **params
+    ) -> str:
+        """
+        Requests a completion with the model routed for `phase`, falling back on timeouts.
+
+        Args:
+            client (Groq): The client used to send the request.
+            messages (list[dict]): The chat history sent to the model.
+            phase (str): The phase requesting the completion (see `Phase`).
+            generation (GenerationConfig | None, optional): The agent's generation settings for the phase.
+            **params: Extra request parameters.
+
+        Returns:
+            str: The content of the model's response.
+
+        Raises:
+            DeadlineExceeded: If the deadline of the current run passes.
+            Exception: The timeout of the last fallback, or any non-timeout error of the client.
+        """
+        return str(self.complete_message(client, messages, phase, generation, **params).content)
+
+    def complete_message(
+        self, client, messages: list, phase: str, generation: GenerationConfig | None = None, **params
+    ):
+        """
+        Like `complete`, but returns the whole response message, so that structured tool calls
+        requested through the native function-calling API (`tools=...`) can be read.
+
+        Args:
+            client (Groq): The client used to send the request.
+            messages (list[dict]): The chat history sent to the model.
+            phase (str): The phase requesting the completion (see `Phase`).
+            generation (GenerationConfig | None, optional): The agent's generation settings for the phase.
+            **params: Extra request parameters, e.g. `tools` and `tool_choice`. They take precedence
+                over the generation settings.
+
+        Returns:
+            The message of the model's response.
+
+        Raises:
+            DeadlineExceeded: If the deadline of the current run passes.
+            Exception: The timeout of the last fallback, or any non-timeout error of the client.
+        """
+        route = self.route(phase)
+        models = [route.model, *route.fallbacks]
+        params = {**self.generation(phase, generation).to_params(), **params}
+
+        for i, model in enumerate(models):
+            start = time.perf_counter()
+            try:
+                with profile("llm", model=model, phase=phase):
+                    output = chat_completion(client, messages, model, timeout=route.timeout, **params)
+            except Exception as exc:
+                # Hết deadline thì thử model khác cũng vô ích
+                if isinstance(exc, DeadlineExceeded) or not is_timeout(exc):
+                    raise
+                with self._lock:
+                    self._stats(phase, model).timeouts += 1
+                if i == len(models) - 1:
+                    raise
+                continue
+
+            latency = time.perf_counter() - start
+            with self._lock:
+                stats = self._stats(phase, model)
+                stats.calls += 1
+                stats.total_latency += latency
+                stats.last_latency = latency
+            return output
@@ -0,0 +1,62 @@
+import contextvars
+from dataclasses import dataclass
+
+from .usage import UsageTracker
+
+
+@dataclass
+class RunReport:
+    """
+    What an agent run returns besides its output.
+
+    Attributes:
+        usage (UsageTracker | None): Token usage and cost of the run.
+        partial (bool): Whether the run was stopped by a deadline or a budget and returned its best
+            partial answer.
+    """
+
+    usage: UsageTracker | None = None
+    partial: bool = False
+
+    def to_dict(self) -> dict:
+        """Returns the report as plain (JSON-serializable) data."""
+        return {"partial": self.partial, "usage": self.usage.to_dict() if self.usage is not None else None}
+
+
+# Báo cáo của lần chạy gần nhất, riêng cho từng thread / asyncio task
+_last_report: contextvars.ContextVar[RunReport | None] = contextvars.ContextVar("last_run_report", default=None)
+
+
+def report_run(report: RunReport) -> None:
+    """Publishes the report of a run that just ended in the current context (see `last_run`)."""
+    _last_report.set(report)
+
+
+def last_run() -> RunReport | None:
+    """
+    Returns the report of the most recent agent run of the current thread or asyncio task.
+
+    Unlike the agents' `last_usage` and `last_partial` attributes, it is not overwritten by
+    concurrent runs of the same agent instance in other threads: read it right after `run` returns.
+
+    Returns:
+        RunReport | None: The report, or None if no agent ran in this context.
+    """
+    return _last_report.get()
+
+
+def run_with_report(fn, *args, **kwargs) -> tuple:
+    """
+    Calls an agent's `run` (or `execute`) and returns its output with the report of that call.
+
+    Args:
+        fn (Callable): The run function.
+
+    Returns:
+        tuple: The output, and the `RunReport` published by the run (None if `fn` publishes none,
+            e.g. a custom agent).
+    """
+    # Xoá báo cáo cũ để không đọc nhầm báo cáo của một lần chạy trước trong cùng context
+    _last_report.set(None)
+    output = fn(*args, **kwargs)
+    return output, _last_report.get()
@@ -0,0 +1,260 @@
+import re
+import threading
+import zlib
+
+from .single_flight import request_key
+
+# Các từ phủ định: hai câu chỉ khác nhau ở phủ định có nghĩa ngược nhau dù gần giống về từ vựng
+NEGATIONS = frozenset({"not", "no", "never", "nor", "none", "without", "không", "chẳng", "chưa", "đừng"})
+
+
+class HashingEncoder:
+    """
+    A local, network-free text encoder based on feature hashing.
+
+    Each text is mapped to a fixed-size vector from its word unigrams, word bigrams and character
+    n-grams, hashed into `dim` buckets with a random sign, then L2-normalized. Cosine similarity
+    between two vectors is then a cheap measure of lexical overlap that is robust to word order,
+    casing, punctuation and small spelling changes.
+
+    Attributes:
+        dim (int): Size of the vectors.
+        ngram_range (tuple[int, int]): Minimum and maximum length of the character n-grams.
+    """
+
+    def __init__(self, dim: int = 1024, ngram_range: tuple[int, int] = (3, 4)):
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def _features(self, text: str) -> list[str]:
+        words = re.findall(r"\w+", text.lower())
+        features = list(words)
+        features += [f"{a} {b}" for a, b in zip(words, words[1:])]
+        low, high = self.ngram_range
+        for word in words:
+            padded = f" {word} "
+            for n in range(low, high + 1):
+                features += [padded[i : i + n] for i in range(len(padded) - n + 1)]
+        return features
+
+    def encode(self, text: str):
+        """
+        Encodes a text into a unit-length vector.
+
+        Args:
+            text (str): The text to encode.
+
+        Returns:
+            numpy.ndarray: A float32 vector of shape (dim,).
+        """
+        import numpy as np
+
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in self._features(text):
+            h = zlib.crc32(feature.encode("utf-8"))
+            vector[h % self.dim] += 1.0 if (h >> 31) & 1 else -1.0
+
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class SentenceTransformerEncoder:
+    """
+    An encoder based on a sentence-embedding model (requires the optional `sentence-transformers`
+    package), which matches real paraphrases ("weather in Hanoi now" / "current Hanoi temperature")
+    that a lexical encoder such as HashingEncoder cannot.
+
+    Attributes:
+        model_name (str): The sentence-transformers model to load on first use.
+    """
+
+    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
+        self.model_name = model_name
+        self._model = None
+
+    def encode(self, text: str):
+        """
+        Encodes a text into a unit-length vector.
+
+        Args:
+            text (str): The text to encode.
+
+        Returns:
+            numpy.ndarray: A float32 vector.
+        """
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+
+            self._model = SentenceTransformer(self.model_name)
+        return self._model.encode(text, normalize_embeddings=True).astype("float32")
+
+
+def exact_terms(text: str) -> tuple:
+    """
+    Extracts the parts of a message that must match exactly for two messages to share an answer:
+    the numbers and named entities (capitalized or upper-case words, except the first word of a
+    sentence), in order, and the negations.
+
+    Args:
+        text (str): The user message.
+
+    Returns:
+        tuple: (numbers and entities in order, sorted negations).
+    """
+    terms = []
+    negations = set()
+    sentence_start = True
+    for token in re.findall(r"\d+(?:[.,]\d+)*|\w+|[.!?]", text):
+        if token in ".!?":
+            sentence_start = True
+            continue
+        if token[0].isdigit():
+            terms.append(token.replace(",", ""))
+        elif token.lower() in NEGATIONS or token.lower().endswith("n't"):
+            negations.add(token.lower())
+        elif not sentence_start and (token[0].isupper() or (len(token) > 1 and token.isupper())):
+            terms.append(token.lower())
+        elif sentence_start and len(token) > 1 and token.isupper():
+            terms.append(token.lower())
+        sentence_start = False
+    return tuple(terms), tuple(sorted(negations))
+
+
+def cache_namespace(*parts) -> str:
+    """
+    Builds the namespace of cached entries from what the answer depends on besides the message
+    (model, system prompt, tools...). Entries are only shared within a namespace.
+
+    Args:
+        *parts: JSON-serializable values; other objects are rendered with `str`.
+
+    Returns:
+        str: The namespace key.
+    """
+    return request_key(*parts)
+
+
+class SemanticCache:
+    """
+    A bounded nearest-neighbor cache mapping user messages to agent responses.
+
+    Lookups embed the message and compare it with every cached message in a single vectorized
+    matrix-vector product. The closest entry is a hit if its cosine similarity reaches `threshold`,
+    it belongs to the same namespace (model, system prompt, tools... see `cache_namespace`) and
+    its numbers, named entities and negations are exactly the same (see `exact_terms`): "weather
+    in Hanoi" never answers "weather in Hue", nor "12 times 34" "12 times 35". When the cache is
+    full, the least recently used entry is evicted.
+
+    The default HashingEncoder is lexical: it only catches near-duplicates (casing, punctuation,
+    word order, typos). Use an embedding encoder such as SentenceTransformerEncoder, with a
+    threshold tuned for it, to match real paraphrases.
+
+    Attributes:
+        threshold (float): Minimum cosine similarity for a hit, between 0 and 1.
+        max_entries (int): Maximum number of cached responses.
+        encoder: Any object with an `encode(text) -> numpy.ndarray` method returning unit vectors
+            of a fixed size. Defaults to a HashingEncoder.
+        hits (int): Number of lookups answered from the cache.
+        misses (int): Number of lookups that missed.
+    """
+
+    def __init__(self, threshold: float = 0.92, max_entries: int = 1024, encoder=None):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.encoder = encoder or HashingEncoder()
+        self.hits = 0
+        self.misses = 0
+
+        self._vectors = None  # Cấp phát khi có vector đầu tiên, để biết kích thước
+        self._keys: list[str] = []
+        self._values: list[str] = []
+        self._namespaces: list[str] = []
+        self._terms: list[tuple] = []
+        self._last_used: list[int] = []
+        self._clock = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _nearest(self, vector, namespace: str, terms: tuple) -> tuple[int, float]:
+        """Returns the most similar entry of `namespace` whose exact terms are `terms`."""
+        if not self._keys:
+            return -1, 0.0
+        similarities = self._vectors[: len(self._keys)] @ vector
+        for i in similarities.argsort()[::-1]:
+            i = int(i)
+            if self._namespaces[i] == namespace and self._terms[i] == terms:
+                return i, float(similarities[i])
+        return -1, 0.0
+
+    def get(self, text: str, namespace: str = "") -> str | None:
+        """
+        Looks up the response cached for the most similar message.
+
+        Args:
+            text (str): The user message.
+            namespace (str, optional): What the answer depends on besides the message (see `cache_namespace`).
+
+        Returns:
+            str | None: The cached response, or None on a miss.
+        """
+        vector = self.encoder.encode(text)
+        terms = exact_terms(text)
+        with self._lock:
+            i, similarity = self._nearest(vector, namespace, terms)
+            if i < 0 or similarity < self.threshold:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._clock += 1
+            self._last_used[i] = self._clock
+            return self._values[i]
+
+    def put(self, text: str, response: str, namespace: str = "") -> None:
+        """
+        Caches a response, replacing the entry of an (almost) identical message if present.
+
+        Args:
+            text (str): The user message.
+            response (str): The agent's response to it.
+            namespace (str, optional): What the answer depends on besides the message (see `cache_namespace`).
+        """
+        import numpy as np
+
+        vector = self.encoder.encode(text)
+        terms = exact_terms(text)
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+
+            self._clock += 1
+            i, similarity = self._nearest(vector, namespace, terms)
+            if i < 0 or similarity < 0.999:
+                if len(self._keys) < self.max_entries:
+                    i = len(self._keys)
+                    self._keys.append(text)
+                    self._values.append(response)
+                    self._namespaces.append(namespace)
+                    self._terms.append(terms)
+                    self._last_used.append(self._clock)
+                else:
+                    # Đầy cache: ghi đè lên phần tử ít được dùng gần đây nhất (LRU)
+                    i = min(range(len(self._last_used)), key=self._last_used.__getitem__)
+
+            self._vectors[i] = vector
+            self._keys[i] = text
+            self._values[i] = response
+            self._namespaces[i] = namespace
+            self._terms[i] = terms
+            self._last_used[i] = self._clock
+
+    def clear(self) -> None:
+        """Removes every cached entry."""
+        with self._lock:
+            self._keys.clear()
+            self._values.clear()
+            self._namespaces.clear()
+            self._terms.clear()
+            self._last_used.clear()
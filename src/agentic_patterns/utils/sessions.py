@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+class SessionStore:
+    """
+    Keeps the chat history of long-lived conversations, keyed by session id.
+
+    Recently used sessions live in an in-memory LRU. When `path` is set, every message is also
+    appended to a per-session JSON Lines log as soon as it is added, so persisting a turn only
+    writes the new messages; sessions evicted from memory are reloaded from their log on demand.
+
+    Attributes:
+        path (str | None): Directory of the session logs. None keeps sessions in memory only, in
+            which case evicted sessions are lost.
+        max_sessions (int): Maximum number of sessions kept in memory.
+    """
+
+    def __init__(self, path: str | None = None, max_sessions: int = 128):
+        self.path = path
+        self.max_sessions = max_sessions
+        self._sessions: OrderedDict[str, list[dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        if path:
+            os.makedirs(path, exist_ok=True)
+
+    def _log_path(self, session_id: str) -> str:
+        # Băm session id để luôn là tên file hợp lệ
+        name = hashlib.sha1(session_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.path, f"{name}.jsonl")
+
+    def _load(self, session_id: str) -> list[dict]:
+        messages = self._sessions.get(session_id)
+        if messages is not None:
+            self._sessions.move_to_end(session_id)
+            return messages
+
+        messages = []
+        if self.path and os.path.exists(self._log_path(session_id)):
+            with open(self._log_path(session_id), encoding="utf-8") as f:
+                messages = [json.loads(line) for line in f if line.strip()]
+
+        self._sessions[session_id] = messages
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return messages
+
+    def get(self, session_id: str) -> list[dict]:
+        """
+        Returns the messages of a session (empty for a new session).
+
+        Args:
+            session_id (str): The session id.
+
+        Returns:
+            list[dict]: A copy of the session's messages, oldest first.
+        """
+        with self._lock:
+            return list(self._load(session_id))
+
+    def append(self, session_id: str, messages: list[dict]) -> None:
+        """
+        Adds new messages to a session and appends them to its log.
+
+        Args:
+            session_id (str): The session id.
+            messages (list[dict]): The new messages, as built by `build_prompt_structure`.
+        """
+        with self._lock:
+            self._load(session_id).extend(messages)
+            if self.path:
+                with open(self._log_path(session_id), "a", encoding="utf-8") as f:
+                    f.writelines(
+                        json.dumps(message, ensure_ascii=False, separators=(",", ":")) + "\n"
+                        for message in messages
+                    )
+
+    def delete(self, session_id: str) -> None:
+        """
+        Removes a session from memory and deletes its log.
+
+        Args:
+            session_id (str): The session id.
+        """
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            if self.path and os.path.exists(self._log_path(session_id)):
+                os.remove(self._log_path(session_id))
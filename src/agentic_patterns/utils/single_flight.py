@@ -0,0 +1,103 @@
+import hashlib
+import json
+import threading
+
+from .deadlines import DeadlineExceeded
+from .deadlines import is_timeout
+from .deadlines import remaining_timeout
+from .usage import BudgetExceeded
+
+
+def request_key(*parts) -> str:
+    """
+    Hashes the parts of a request (model, messages, parameters...) into a single-flight key.
+
+    Args:
+        *parts: JSON-serializable values; other objects are rendered with `str`.
+
+    Returns:
+        str: A hex digest identifying byte-identical requests.
+    """
+    data = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def _caller_error(exc: BaseException) -> bool:
+    """Tells whether an error comes from the leader's own deadline or budget, not from the call itself."""
+    return isinstance(exc, (DeadlineExceeded, BudgetExceeded)) or is_timeout(exc)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: while a call with a given key is in flight, other
+    callers with the same key wait for it and share its result (or its exception) instead of
+    issuing their own. Nothing is cached once the call completes.
+
+    Only results and errors of the call itself are shared. If the leader stops because of its own
+    deadline or budget (`DeadlineExceeded`, `BudgetExceeded` or a timeout), the waiting callers
+    issue the call again under their own deadline, one of them becoming the new leader.
+
+    Attributes:
+        coalesced (int): Number of calls answered by another caller's in-flight call.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls: dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn, *args, **kwargs):
+        """
+        Runs `fn(*args, **kwargs)`, unless an identical call (same key) is already in flight.
+
+        Waiting callers give up when the deadline of their current run passes.
+
+        Args:
+            key (str): Identifies identical calls (see `request_key`).
+            fn (Callable): The function to run.
+
+        Returns:
+            The result of the (shared) call.
+
+        Raises:
+            DeadlineExceeded: If the current deadline passes while waiting for another caller's call.
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                else:
+                    call.waiters += 1
+
+            if leader:
+                break
+            if not call.done.wait(remaining_timeout()):
+                raise DeadlineExceeded("Deadline exceeded while waiting for a coalesced call")
+            if call.error is None or not _caller_error(call.error):
+                with self._lock:
+                    self.coalesced += 1
+                if call.error is not None:
+                    raise call.error
+                return call.result
+            # Leader dừng vì deadline / ngân sách của chính nó: gửi lại lệnh gọi với deadline của mình
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
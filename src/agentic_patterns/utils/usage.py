@@ -0,0 +1,192 @@
+import contextvars
+import threading
+from contextlib import contextmanager
+from dataclasses import asdict
+from dataclasses import dataclass
+
+# Giá (USD cho mỗi triệu token input, output) dùng để ước tính chi phí. Cập nhật theo bảng giá của provider.
+MODEL_PRICES: dict[str, tuple[float, float]] = {
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+    "llama-3.1-8b-instant": (0.05, 0.08),
+}
+
+
+class BudgetExceeded(RuntimeError):
+    """Raised before a completion request when a token, call or cost budget has been used up."""
+
+
+@dataclass
+class Usage:
+    """
+    Token usage and estimated cost.
+
+    Attributes:
+        calls (int): Number of completion requests.
+        prompt_tokens (int): Input tokens.
+        completion_tokens (int): Output tokens.
+        total_tokens (int): Input plus output tokens.
+        cost (float): Estimated cost in USD (0 for models missing from the price table).
+    """
+
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    total_tokens: int = 0
+    cost: float = 0.0
+
+
+@dataclass
+class TokenBudget:
+    """
+    Hard limits on the usage of a run. None means unlimited.
+
+    Attributes:
+        max_total_tokens (int | None): Maximum input plus output tokens.
+        max_completion_tokens (int | None): Maximum output tokens.
+        max_calls (int | None): Maximum number of completion requests.
+        max_cost (float | None): Maximum estimated cost, in USD.
+    """
+
+    max_total_tokens: int | None = None
+    max_completion_tokens: int | None = None
+    max_calls: int | None = None
+    max_cost: float | None = None
+
+    def exceeded(self, usage: Usage) -> str | None:
+        """Returns which limit `usage` has reached, or None if it is within the budget."""
+        limits = [
+            ("max_total_tokens", usage.total_tokens),
+            ("max_completion_tokens", usage.completion_tokens),
+            ("max_calls", usage.calls),
+            ("max_cost", usage.cost),
+        ]
+        for name, used in limits:
+            limit = getattr(self, name)
+            if limit is not None and used >= limit:
+                return f"{name}={limit} reached ({used})"
+        return None
+
+
+class UsageTracker:
+    """
+    Aggregates the usage of the completions made inside its `usage_scope`, per model, and
+    enforces an optional budget.
+
+    Scopes nest: a completion is counted by every tracker active in the current context (e.g. the
+    run, the agent and the crew), and is refused if any of them is over budget.
+
+    Attributes:
+        name (str): Label of what is tracked (agent or crew name).
+        budget (TokenBudget | None): The limits enforced before every request.
+        usage (Usage): The aggregated usage.
+        by_model (dict[str, Usage]): The usage broken down by model.
+    """
+
+    def __init__(self, name: str = "", budget: TokenBudget | None = None, prices: dict | None = None):
+        self.name = name
+        self.budget = budget
+        self.prices = MODEL_PRICES if prices is None else prices
+        self.usage = Usage()
+        self.by_model: dict[str, Usage] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, prompt_tokens: int, completion_tokens: int) -> None:
+        """
+        Adds one completion to the totals.
+
+        Args:
+            model (str): The model that served the request.
+            prompt_tokens (int): Input tokens of the request.
+            completion_tokens (int): Output tokens of the request.
+        """
+        input_price, output_price = self.prices.get(model, (0.0, 0.0))
+        cost = (prompt_tokens * input_price + completion_tokens * output_price) / 1e6
+        with self._lock:
+            for usage in (self.usage, self.by_model.setdefault(model, Usage())):
+                usage.calls += 1
+                usage.prompt_tokens += prompt_tokens
+                usage.completion_tokens += completion_tokens
+                usage.total_tokens += prompt_tokens + completion_tokens
+                usage.cost += cost
+
+    def check(self) -> None:
+        """
+        Raises:
+            BudgetExceeded: If the budget has been used up.
+        """
+        if self.budget is None:
+            return
+        reason = self.budget.exceeded(self.usage)
+        if reason is not None:
+            raise BudgetExceeded(f"Budget of {self.name or 'run'} exceeded: {reason}")
+
+    @property
+    def exceeded(self) -> bool:
+        return self.budget is not None and self.budget.exceeded(self.usage) is not None
+
+    def to_dict(self) -> dict:
+        """Returns the totals and per-model breakdown as plain data."""
+        with self._lock:
+            return {
+                "name": self.name,
+                **asdict(self.usage),
+                "by_model": {model: asdict(usage) for model, usage in self.by_model.items()},
+            }
+
+
+# Các tracker đang hoạt động (ngoài cùng trước), riêng cho từng thread / asyncio task
+_active_trackers: contextvars.ContextVar[tuple[UsageTracker, ...]] = contextvars.ContextVar(
+    "active_usage_trackers", default=()
+)
+
+
+@contextmanager
+def usage_scope(tracker: UsageTracker):
+    """
+    Counts the completions made inside the block (and in threads or tasks started with a copy of
+    its context) in `tracker`, in addition to the trackers already active.
+
+    Args:
+        tracker (UsageTracker): The tracker to activate.
+
+    Yields:
+        UsageTracker: The same tracker.
+    """
+    token = _active_trackers.set((*_active_trackers.get(), tracker))
+    try:
+        yield tracker
+    finally:
+        _active_trackers.reset(token)
+
+
+def check_budget() -> None:
+    """
+    Raises:
+        BudgetExceeded: If any active tracker is over its budget.
+    """
+    for tracker in _active_trackers.get():
+        tracker.check()
+
+
+def record_usage(model: str, usage, exclude: tuple[UsageTracker, ...] = ()) -> tuple[UsageTracker, ...]:
+    """
+    Records the `usage` field of a completion response in every active tracker.
+
+    Args:
+        model (str): The requested model.
+        usage: The response's usage object (with `prompt_tokens` and `completion_tokens`), or None.
+        exclude (tuple[UsageTracker, ...], optional): Trackers already charged for this response,
+            e.g. by the caller whose in-flight request was shared.
+
+    Returns:
+        tuple[UsageTracker, ...]: The trackers charged for the response, including `exclude`.
+    """
+    trackers = _active_trackers.get()
+    if usage is None:
+        return exclude
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    for tracker in trackers:
+        if tracker not in exclude:
+            tracker.record(model, prompt_tokens, completion_tokens)
+    return (*exclude, *(tracker for tracker in trackers if tracker not in exclude))